@@ -0,0 +1,113 @@
+"""Pemeriksaan anomali absensi (job malam hari)
+
+Hanya baris attendance dan breaks dengan id di atas watermark terakhir yang
+diperiksa, sehingga riwayat lama tidak pernah dipindai ulang; untuk aturan per
+hari (istirahat lewat waktu) hari yang tersentuh data baru dibaca ulang penuh.
+Temuan disimpan di tabel anomaly_findings dan watermark maju dalam transaksi
+yang sama; jika job gagal di tengah jalan, data yang sama diperiksa lagi malam
+berikutnya tanpa temuan ganda.
+"""
+from datetime import datetime
+
+import config
+
+RULE_TITLES = {
+    'short_shift': "⚡ Pulang Terlalu Cepat Setelah Masuk",
+    'odd_check_in': "🌙 Masuk di Jam Tidak Wajar",
+    'repeated_overdue_breaks': "☕ Berulang Kali Istirahat Lewat Waktu"
+}
+
+MAX_LINES_PER_SECTION = 30
+
+def shift_time(value, minutes):
+    """Geser jam "HH:MM" sekian menit, berputar melewati tengah malam"""
+    hours, mins = map(int, value.split(':')[:2])
+    total = (hours * 60 + mins + minutes) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+def check_in_window(db):
+    """Rentang jam masuk yang wajar: work_start (settings) dikurangi/ditambah margin
+
+    Untuk shift malam rentangnya bisa melewati tengah malam (awal > akhir, mis. 19:00-01:00).
+    """
+    work_start = db.get_setting('work_start') or config.DEFAULT_WORK_START
+    margin = config.ANOMALY_CHECK_IN_MARGIN_MINUTES
+    return shift_time(work_start, -margin), shift_time(work_start, margin)
+
+def detect_short_shift(row, window):
+    """Pulang hanya sebentar setelah masuk (mis. masuk 09:53, pulang 11:25)"""
+    _, _, _, _, check_in, check_out, status, worked = row
+    if status == 'auto_closed' or worked is None or worked >= config.ANOMALY_MIN_WORK_MINUTES:
+        return None
+    return f"masuk {check_in[:5]}, pulang {check_out[:5]} ({int(worked)} menit)"
+
+def detect_odd_check_in(row, window):
+    """Masuk jauh di luar jam kerja yang wajar"""
+    check_in = row[4]
+    earliest, latest = window
+    if not check_in:
+        return None
+    if earliest <= latest:
+        within = earliest <= check_in[:5] <= latest
+    else:
+        within = check_in[:5] >= earliest or check_in[:5] <= latest
+    if within:
+        return None
+    return f"masuk pukul {check_in[:5]}"
+
+# Aturan per baris attendance: (nama aturan, fungsi yang mengembalikan detail atau None)
+ATTENDANCE_RULES = (
+    ('short_shift', detect_short_shift),
+    ('odd_check_in', detect_odd_check_in)
+)
+
+def scan(db):
+    """Periksa data baru sejak watermark; kembalikan temuan baru sebagai (aturan, nama, tanggal, detail)"""
+    watermark = db.get_anomaly_watermark()
+    window = check_in_window(db)
+    findings = []
+    names = []
+
+    attendance, last_attendance = db.get_new_attendance(watermark['attendance'])
+    for row in attendance:
+        attendance_id, user_id, name, day = row[:4]
+        for rule, detect in ATTENDANCE_RULES:
+            detail = detect(row, window)
+            if detail:
+                findings.append((rule, user_id, day, detail, attendance_id))
+                names.append(name)
+
+    # Hari yang punya istirahat baru dihitung ulang penuh; temuan yang sama tidak dicatat dua kali
+    overdue, last_break = db.get_new_overdue_breaks(
+        watermark['breaks'], config.ANOMALY_OVERDUE_BREAK_MINUTES, config.ANOMALY_OVERDUE_BREAKS_PER_DAY
+    )
+    for user_id, name, day, count, over_minutes, break_id in overdue:
+        findings.append((
+            'repeated_overdue_breaks', user_id, day,
+            f"{count} kali lewat waktu, total {int(over_minutes or 0)} menit", break_id
+        ))
+        names.append(name)
+
+    inserted = db.save_anomaly_findings(findings, {'attendance': last_attendance, 'breaks': last_break})
+    return [(findings[i][0], names[i], findings[i][2], findings[i][3]) for i in inserted]
+
+def format_summary(findings):
+    """Format temuan menjadi satu pesan ringkasan untuk admin"""
+    report = "🔍 PEMERIKSAAN ANOMALI ABSENSI\n"
+    report += f"Waktu: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+    report += f"Total temuan baru: {len(findings)}\n"
+    report += "─" * 30 + "\n"
+
+    for rule, title in RULE_TITLES.items():
+        section = [finding for finding in findings if finding[0] == rule]
+        if not section:
+            continue
+
+        report += f"\n{title} ({len(section)}):\n"
+        for _, name, day, detail in section[:MAX_LINES_PER_SECTION]:
+            report += f"• {name} ({day}): {detail}\n"
+
+        if len(section) > MAX_LINES_PER_SECTION:
+            report += f"• ... dan {len(section) - MAX_LINES_PER_SECTION} lainnya\n"
+
+    return report
@@ -0,0 +1,223 @@
+"""Micro-benchmark method database.Database pada beberapa ukuran data
+
+Contoh:
+    python benchmark.py --sizes 1k,100k
+    python benchmark.py --sizes 1k,100k,10m --save-baseline
+    python benchmark.py --sizes 1k,100k --baseline benchmark_baseline.json
+
+Hasil disimpan sebagai JSON dan dibandingkan dengan baseline; method yang
+median-nya lebih lambat dari ambang batas ditandai sebagai regresi.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import database
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+ROWS_PER_EMPLOYEE = 250  # kira-kira satu tahun hari kerja per karyawan
+BREAK_TYPES = ['toilet', 'makan', 'merokok', 'sholat', 'lainnya']
+
+def fill_database(db, rows, seed=42):
+    """Isi database dengan `rows` baris attendance (dan jumlah breaks yang sama) sampai kemarin"""
+    rng = random.Random(seed)
+    employees = max(10, rows // ROWS_PER_EMPLOYEE)
+    days = -(-rows // employees)
+    yesterday = date.today() - timedelta(days=1)
+
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO employees (user_id, username, full_name, department, position)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((i, f"user{i}", f"Karyawan {i}", f"Dept {i % 20}", "Staff") for i in range(1, employees + 1)))
+
+        def attendance_rows():
+            produced = 0
+            for day_offset in range(days):
+                day = yesterday - timedelta(days=day_offset)
+                for user_id in range(1, employees + 1):
+                    if produced >= rows:
+                        return
+                    produced += 1
+                    late = max(0, int(rng.gauss(0, 10)))
+                    yield (user_id, day, f"08:{min(late, 59):02d}:00", "17:05:00", late, 5)
+
+        db.conn.executemany('''
+            INSERT INTO attendance (user_id, date, check_in, check_out, late_minutes, overtime_minutes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', attendance_rows())
+
+        def break_rows():
+            produced = 0
+            for day_offset in range(days):
+                day = yesterday - timedelta(days=day_offset)
+                for user_id in range(1, employees + 1):
+                    if produced >= rows:
+                        return
+                    produced += 1
+                    minutes = rng.randint(5, 60)
+                    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=12)
+                    yield (user_id, rng.choice(BREAK_TYPES),
+                           start.strftime('%Y-%m-%d %H:%M:%S'),
+                           (start + timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S'),
+                           30, minutes)
+
+        db.conn.executemany('''
+            INSERT INTO breaks (user_id, break_type, start_time, end_time, scheduled_duration, actual_duration)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', break_rows())
+
+    return employees
+
+def add_write_users(db, employees, count):
+    """Daftar `count` user berbeda untuk operasi tulis (absen masuk hanya sekali per hari);
+    karyawan tambahan tanpa riwayat dibuat jika data terlalu kecil"""
+    if count > employees:
+        with db.conn:
+            db.conn.executemany('''
+                INSERT INTO employees (user_id, username, full_name, department, position)
+                VALUES (?, ?, ?, ?, ?)
+            ''', ((i, f"user{i}", f"Karyawan {i}", f"Dept {i % 20}", "Staff") for i in range(employees + 1, count + 1)))
+    return list(range(1, count + 1))
+
+def measure(func, args_list):
+    """Jalankan func untuk setiap argumen, kembalikan statistik waktu dalam milidetik"""
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'ops': len(timings),
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'max_ms': round(timings[-1], 4)
+    }
+
+def run_size(label, rows, workdir, ops, seed):
+    """Bangun database satu ukuran lalu ukur setiap method"""
+    path = os.path.join(workdir, f"bench_{label}.db")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    db = database.Database(path)
+    start = time.perf_counter()
+    employees = fill_database(db, rows, seed)
+    print(f"[{label}] data {rows:,} baris siap dalam {time.perf_counter() - start:.1f} detik")
+
+    rng = random.Random(seed)
+    today = date.today()
+    month_start = today.replace(day=1) - timedelta(days=30)
+    # Baca: tepat `ops` kali dengan user diambil dengan pengembalian (data 1k hanya 10 karyawan)
+    readers = rng.choices(range(1, employees + 1), k=ops)
+    writers = add_write_users(db, employees, ops)
+    rng.shuffle(writers)
+    now = datetime.now()
+    stamp = lambda minutes: (now + timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S')
+    repeats = max(10, ops // 10)
+
+    results = {
+        'check_in': measure(db.check_in, [(user_id, "08:05:00") for user_id in writers]),
+        'start_break': measure(db.start_break, [(user_id, "toilet", stamp(0)) for user_id in writers]),
+        'end_break': measure(db.end_break, [(user_id, stamp(10)) for user_id in writers]),
+        'check_out': measure(db.check_out, [(user_id, "17:10:00") for user_id in writers]),
+        'get_today_breaks': measure(db.get_today_breaks, [(user_id,) for user_id in readers]),
+        'get_attendance_records': measure(db.get_attendance_records, [(user_id, month_start, today) for user_id in readers]),
+        'get_today_attendance_all': measure(db.get_today_attendance_all, [()] * repeats),
+        'get_system_stats': measure(db.get_system_stats, [()] * repeats),
+        'export_attendance_data': measure(db.export_attendance_data, [(month_start, today)] * max(5, ops // 20))
+    }
+
+    db.conn.close()
+    return results
+
+def compare(results, baseline, threshold):
+    """Bandingkan hasil dengan baseline, kembalikan daftar regresi"""
+    regressions = []
+    print(f"\n{'ukuran':<8}{'method':<28}{'baseline':>12}{'sekarang':>12}{'rasio':>8}")
+    for label, methods in results.items():
+        for method, stats in methods.items():
+            base = baseline.get(label, {}).get(method)
+            if not base:
+                continue
+            ratio = stats['median_ms'] / base['median_ms'] if base['median_ms'] else 1.0
+            flag = "  << REGRESI" if ratio > threshold else ""
+            print(f"{label:<8}{method:<28}{base['median_ms']:>12.4f}{stats['median_ms']:>12.4f}{ratio:>8.2f}{flag}")
+            if flag:
+                regressions.append((label, method, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark method database.Database")
+    parser.add_argument('--sizes', default='1k,100k', help="Ukuran data, contoh: 1k,100k,10m")
+    parser.add_argument('--ops', type=int, default=200, help="Jumlah operasi per method")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=None, help="Folder database sementara")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Simpan hasil sebagai baseline baru")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Rasio median yang dianggap regresi")
+    args = parser.parse_args()
+
+    labels = [label.strip().lower() for label in args.sizes.split(',') if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Ukuran tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(SIZES)})")
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='absensi_bench_'))
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    for label in labels:
+        results[label] = run_size(label, SIZES[label], workdir, args.ops, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'ops': args.ops
+        },
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil disimpan di {output}")
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline disimpan di {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("Baseline belum ada; jalankan dengan --save-baseline untuk membuatnya.")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regresi terdeteksi (ambang {args.threshold}x)")
+        return 1
+
+    print("\nTidak ada regresi.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
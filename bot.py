@@ -1,1205 +1,1746 @@
-import logging
-import asyncio
-import ast
-import json
-from datetime import datetime, timedelta
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    Application, CommandHandler, MessageHandler, 
-    CallbackQueryHandler, ContextTypes, filters
-)
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-
-import config
-import database
-import keyboards
-import utils
-
-# Setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
-logger = logging.getLogger(__name__)
-
-# Inisialisasi scheduler
-scheduler = AsyncIOScheduler()
-db = database.Database()
-
-# Dictionary untuk state pengaturan
-user_settings_state = {}
-
-def format_message_with_mention(user, message):
-    """Format pesan dengan mention ke user"""
-    user_name = user.full_name
-    if user.username:
-        mention = f"@{user.username}"
-    else:
-        mention = f"[{user_name}](tg://user?id={user.id})"
-    
-    return f"👤 {mention}\n{message}"
-
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk perintah /start"""
-    user = update.effective_user
-    # Daftarkan user ke database
-    db.add_employee(user.id, user.username, user.full_name)
-    
-    welcome_text = db.get_setting('notification_texts')
-    welcome_msg = "Selamat datang di sistem absensi!"
-    
-    try:
-        notif_texts = ast.literal_eval(welcome_text)
-        welcome_msg = notif_texts.get('welcome', welcome_msg)
-    except:
-        pass
-    
-    # Tampilkan pesan welcome khusus untuk admin/owner
-    if keyboards.has_admin_access(user.username):
-        welcome_msg += "\n\n👑 Anda login sebagai Administrator"
-    
-    message_with_mention = format_message_with_mention(user, f"👋 {welcome_msg}\n\nHalo {user.full_name}!")
-    
-    await update.message.reply_text(
-        message_with_mention,
-        reply_markup=keyboards.main_keyboard(user.id, user.username),
-        parse_mode='Markdown'
-    )
-
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk pesan teks"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    text = update.message.text
-    
-    # Cek jika user sedang dalam mode pengaturan
-    if user_id in user_settings_state:
-        await handle_settings_input(update, context)
-        return
-    
-    # Cek jika user sedang istirahat dan mencoba akses menu lain
-    active_break = db.get_user_active_break(user_id)
-    if active_break and text not in ["✅ Selesai Istirahat", "🆘 Bantuan", "/selesai_istirahat", "/help", "/start"]:
-        notif_text = db.get_setting('notification_texts')
-        blocked_msg = "⛔ Anda belum bisa melakukan aktivitas lainnya sebelum menyelesaikan istirahat yang sedang berlangsung."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            blocked_msg = notif_texts.get('action_blocked', blocked_msg)
-        except:
-            pass
-        
-        message_with_mention = format_message_with_mention(user, blocked_msg)
-        await update.message.reply_text(message_with_mention)
-        return
-    
-    # Handle menu berdasarkan text
-    if text == "🟢 Masuk Kerja":
-        await check_in(update, context)
-    elif text == "💼 Pulang Kerja":
-        await check_out(update, context)
-    elif text == "☕ Istirahat":
-        await start_break_menu(update, context)
-    elif text == "✅ Selesai Istirahat":
-        await end_break_command(update, context)
-    elif text == "📊 Lihat Absensi":
-        await view_attendance(update, context)
-    elif text == "⚙️ Admin Panel":
-        await admin_panel(update, context)
-    elif text == "🆘 Bantuan":
-        await help_command(update, context)
-    else:
-        # Jika pesan tidak dikenali, kirim keyboard utama
-        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
-        await update.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.main_keyboard(user_id, username)
-        )
-
-async def check_in(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk absensi masuk"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    current_time = datetime.now().strftime("%H:%M:%S")
-    
-    success, message = db.check_in(user_id, current_time)
-    
-    if success:
-        # Hitung keterlambatan
-        work_start = db.get_setting('work_start') or config.DEFAULT_WORK_START
-        late_minutes = utils.calculate_late_minutes(current_time)
-        
-        if late_minutes > 0:
-            notif_text = db.get_setting('notification_texts')
-            late_msg = f"⏰ Anda terlambat {late_minutes} menit."
-            
-            try:
-                notif_texts = ast.literal_eval(notif_text)
-                late_msg = notif_texts.get('checkin_late', '').format(late_minutes)
-            except:
-                pass
-            
-            message += f"\n{late_msg}"
-        
-        # Update database
-        if late_minutes > 0:
-            db.conn.execute('UPDATE attendance SET late_minutes = ? WHERE user_id = ? AND date = DATE("now")', 
-                          (late_minutes, user_id))
-            db.conn.commit()
-    
-    message_with_mention = format_message_with_mention(user, message)
-    await update.message.reply_text(message_with_mention, reply_markup=keyboards.main_keyboard(user_id, username))
-
-async def check_out(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk absensi pulang"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    current_time = datetime.now().strftime("%H:%M:%S")
-    
-    success, message = db.check_out(user_id, current_time)
-    
-    if success:
-        # Hitung lembur dan pulang cepat
-        work_end = db.get_setting('work_end') or config.DEFAULT_WORK_END
-        overtime = utils.calculate_overtime(current_time)
-        early_leave = utils.calculate_early_leave(current_time)
-        
-        notif_text = db.get_setting('notification_texts')
-        
-        if overtime > 0:
-            overtime_msg = f"💪 Lembur: {overtime} menit."
-            try:
-                notif_texts = ast.literal_eval(notif_text)
-                overtime_msg = notif_texts.get('overtime', '').format(overtime)
-            except:
-                pass
-            message += f"\n{overtime_msg}"
-        
-        if early_leave > 0:
-            early_msg = f"🚪 Pulang cepat: {early_leave} menit."
-            try:
-                notif_texts = ast.literal_eval(notif_text)
-                early_msg = notif_texts.get('checkout_early', '').format(early_leave)
-            except:
-                pass
-            message += f"\n{early_msg}"
-        
-        # Update database
-        db.conn.execute('''
-            UPDATE attendance SET overtime_minutes = ?, early_leave_minutes = ? 
-            WHERE user_id = ? AND date = DATE("now")
-        ''', (overtime, early_leave, user_id))
-        db.conn.commit()
-    
-    message_with_mention = format_message_with_mention(user, message)
-    await update.message.reply_text(message_with_mention, reply_markup=keyboards.main_keyboard(user_id, username))
-
-async def start_break_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Menampilkan menu pilihan istirahat"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    
-    # Cek apakah user sudah check in hari ini
-    today_attendance = db.get_today_attendance(user_id)
-    if not today_attendance or not today_attendance[1]:  # No check-in today
-        message_with_mention = format_message_with_mention(user, "❌ Anda harus check-in terlebih dahulu sebelum melakukan istirahat.")
-        await update.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.main_keyboard(user_id, username)
-        )
-        return
-    
-    message_with_mention = format_message_with_mention(user, "Pilih jenis istirahat:")
-    await update.message.reply_text(
-        message_with_mention,
-        reply_markup=keyboards.break_types_keyboard()
-    )
-
-async def break_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk callback jenis istirahat"""
-    query = update.callback_query
-    await query.answer()
-    
-    user = query.from_user
-    user_id = user.id
-    username = user.username
-    break_type = query.data.replace("break_", "")
-    
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    success, message = db.start_break(user_id, break_type, current_time)
-    
-    if success:
-        # Dapatkan durasi istirahat dari settings
-        break_times = db.get_setting('break_times')
-        break_duration = 30  # default
-        
-        try:
-            break_settings = ast.literal_eval(break_times)
-            break_duration = break_settings.get(break_type, 30)
-        except:
-            # Fallback ke config default
-            break_duration = config.ALLOWED_BREAK_TYPES.get(break_type, 30)
-        
-        notif_text = db.get_setting('notification_texts')
-        break_msg = f"☕ Istirahat {break_type} dimulai. Durasi: {break_duration} menit."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            break_msg = notif_texts.get('break_start', '').format(break_type, break_duration)
-        except:
-            pass
-        
-        # Schedule reminder
-        scheduler.add_job(
-            send_break_reminder, 
-            'date', 
-            run_date=datetime.now() + timedelta(minutes=break_duration),
-            args=[user_id, break_type],
-            id=f"break_reminder_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        )
-        
-        message_with_mention = format_message_with_mention(user, break_msg)
-        await query.edit_message_text(message_with_mention)
-        
-        # Kirim ulang keyboard yang diperbarui
-        followup_message = format_message_with_mention(user, "Silakan klik '✅ Selesai Istirahat' ketika kembali:")
-        await query.message.reply_text(
-            followup_message, 
-            reply_markup=keyboards.main_keyboard(user_id, username)
-        )
-    else:
-        message_with_mention = format_message_with_mention(user, "❌ Gagal memulai istirahat: " + message)
-        await query.edit_message_text(message_with_mention)
-
-async def send_break_reminder(user_id, break_type):
-    """Mengirim reminder waktu istirahat habis"""
-    from telegram import Bot
-    bot = Bot(token=config.BOT_TOKEN)
-    try:
-        # Dapatkan info user dari database untuk mention
-        cursor = db.conn.execute('SELECT username, full_name FROM employees WHERE user_id = ?', (user_id,))
-        user_info = cursor.fetchone()
-        
-        if user_info:
-            username, full_name = user_info
-            if username:
-                mention = f"@{username}"
-            else:
-                mention = f"[{full_name}](tg://user?id={user_id})"
-            
-            reminder_msg = f"👤 {mention}\n⏰ Reminder: Waktu istirahat {break_type} Anda sudah habis!\nGunakan tombol '✅ Selesai Istirahat' untuk mengakhiri."
-            
-            await bot.send_message(
-                user_id,
-                reminder_msg,
-                parse_mode='Markdown'
-            )
-        else:
-            # Fallback jika tidak ada info user
-            await bot.send_message(
-                user_id,
-                f"⏰ Reminder: Waktu istirahat {break_type} Anda sudah habis!\nGunakan tombol '✅ Selesai Istirahat' untuk mengakhiri."
-            )
-    except Exception as e:
-        logger.error(f"Gagal mengirim reminder ke user {user_id}: {e}")
-
-async def end_break_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk menyelesaikan istirahat"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    success, message = db.end_break(user_id, current_time)
-    
-    if success:
-        # Hapus reminder
-        try:
-            # Cari dan hapus job reminder untuk user ini
-            jobs = scheduler.get_jobs()
-            for job in jobs:
-                if job.id.startswith(f"break_reminder_{user_id}"):
-                    scheduler.remove_job(job.id)
-        except Exception as e:
-            logger.error(f"Gagal menghapus reminder untuk user {user_id}: {e}")
-        
-        # Hitung durasi dan tampilkan detail
-        breaks_today = db.get_today_breaks(user_id)
-        total_breaks = len(breaks_today)
-        
-        # Hitung durasi istirahat terakhir
-        last_break = breaks_today[-1] if breaks_today else None
-        if last_break:
-            break_type, start_time, end_time = last_break
-            start_dt = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
-            end_dt = datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S')
-            duration = end_dt - start_dt
-            minutes = duration.total_seconds() // 60
-            seconds = duration.total_seconds() % 60
-            
-            notif_text = db.get_setting('notification_texts')
-            end_msg = f"✅ Istirahat selesai. Durasi: {int(minutes)} menit {int(seconds)} detik."
-            
-            try:
-                notif_texts = ast.literal_eval(notif_text)
-                end_msg = notif_texts.get('break_end', '').format(int(minutes), int(seconds))
-            except:
-                pass
-            
-            # Hitung total istirahat per jenis (breakdown detail)
-            break_counts = {}
-            for break_record in breaks_today:
-                br_type, _, _ = break_record
-                break_counts[br_type] = break_counts.get(br_type, 0) + 1
-            
-            # Format detail per jenis istirahat
-            break_details = []
-            for br_type, count in break_counts.items():
-                # Konversi nama jenis istirahat ke bahasa Indonesia yang lebih baik
-                type_names = {
-                    'toilet': '🚽 Toilet',
-                    'makan': '🍽️ Makan', 
-                    'merokok': '🚬 Merokok',
-                    'sholat': '🕌 Sholat',
-                    'lainnya': '📋 Lainnya'
-                }
-                display_name = type_names.get(br_type, br_type.capitalize())
-                break_details.append(f"• {display_name}: {count} kali")
-            
-            detail = f"""📊 Detail Istirahat:
-• Jenis: {break_type}
-• Mulai: {start_time.split(' ')[1]}
-• Selesai: {end_time.split(' ')[1]}
-• Durasi: {int(minutes)} menit {int(seconds)} detik
-• Total istirahat hari ini: {total_breaks} kali
-
-📈 Breakdown per Jenis:
-{chr(10).join(break_details)}"""
-            
-            message_with_mention = format_message_with_mention(user, f"{end_msg}\n{detail}")
-            await update.message.reply_text(message_with_mention)
-        else:
-            message_with_mention = format_message_with_mention(user, "✅ Istirahat selesai.")
-            await update.message.reply_text(message_with_mention)
-    else:
-        message_with_mention = format_message_with_mention(user, message)
-        await update.message.reply_text(message_with_mention)
-    
-    # Kembalikan ke keyboard normal
-    message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
-    await update.message.reply_text(
-        message_with_mention, 
-        reply_markup=keyboards.main_keyboard(user_id, username)
-    )
-
-async def view_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk melihat absensi pribadi"""
-    user = update.effective_user
-    
-    # Tampilkan opsi periode
-    keyboard = [
-        [InlineKeyboardButton("Hari Ini", callback_data="attendance_today")],
-        [InlineKeyboardButton("Minggu Ini", callback_data="attendance_week")],
-        [InlineKeyboardButton("Bulan Ini", callback_data="attendance_month")],
-        [InlineKeyboardButton("Semua Data", callback_data="attendance_all")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    message_with_mention = format_message_with_mention(user, "📊 Pilih periode laporan absensi:")
-    await update.message.reply_text(
-        message_with_mention,
-        reply_markup=reply_markup
-    )
-
-async def attendance_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Callback untuk laporan absensi"""
-    query = update.callback_query
-    await query.answer()
-    
-    user = query.from_user
-    user_id = user.id
-    username = user.username
-    period = query.data.replace("attendance_", "")
-    
-    today = datetime.now().date()
-    
-    if period == "today":
-        start_date = today
-        end_date = today
-        title = "Hari Ini"
-    elif period == "week":
-        start_date = today - timedelta(days=today.weekday())
-        end_date = start_date + timedelta(days=6)
-        title = "Minggu Ini"
-    elif period == "month":
-        start_date = today.replace(day=1)
-        if today.month == 12:
-            end_date = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            end_date = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
-        title = "Bulan Ini"
-    else:  # all
-        start_date = today - timedelta(days=30)
-        end_date = today
-        title = "30 Hari Terakhir"
-    
-    # Ambil data dari database
-    cursor = db.conn.execute('''
-        SELECT date, check_in, check_out, late_minutes, overtime_minutes, early_leave_minutes 
-        FROM attendance 
-        WHERE user_id = ? AND date BETWEEN ? AND ?
-        ORDER BY date DESC
-    ''', (user_id, start_date, end_date))
-    
-    records = cursor.fetchall()
-    
-    if not records:
-        message_with_mention = format_message_with_mention(user, f"📊 Tidak ada data absensi untuk periode {title}.")
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    # Format laporan dengan mention
-    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
-    report += f"📊 LAPORAN ABSENSI - {title.upper()}\n"
-    report += f"Periode: {start_date} sampai {end_date}\n"
-    report += "─" * 40 + "\n\n"
-    
-    total_kerja = 0
-    total_terlambat = 0
-    total_lembur = 0
-    hari_kerja = 0
-    
-    for record in records:
-        date_str, check_in, check_out, late, overtime, early_leave = record
-        
-        report += f"📅 {date_str}\n"
-        report += f"🟢 Masuk: {check_in if check_in else 'Tidak absen'}\n"
-        
-        if check_out:
-            report += f"🔴 Pulang: {check_out}\n"
-            
-            # Hitung jam kerja
-            if check_in:
-                masuk = datetime.strptime(check_in, '%H:%M:%S')
-                pulang = datetime.strptime(check_out, '%H:%M:%S')
-                jam_kerja = (pulang - masuk).total_seconds() / 3600
-                total_kerja += jam_kerja
-                hari_kerja += 1
-                report += f"⏱️ Jam kerja: {jam_kerja:.1f} jam\n"
-        
-        if late and late > 0:
-            report += f"⏰ Terlambat: {late} menit\n"
-            total_terlambat += late
-        
-        if overtime and overtime > 0:
-            report += f"💪 Lembur: {overtime} menit\n"
-            total_lembur += overtime
-            
-        if early_leave and early_leave > 0:
-            report += f"🚪 Pulang cepat: {early_leave} menit\n"
-            
-        report += "─" * 30 + "\n"
-    
-    # Total
-    report += "\n📈 TOTAL:\n"
-    report += f"• Hari kerja: {hari_kerja} hari\n"
-    report += f"• Total jam kerja: {total_kerja:.1f} jam\n"
-    if total_terlambat > 0:
-        report += f"• Total terlambat: {total_terlambat} menit\n"
-    if total_lembur > 0:
-        report += f"• Total lembur: {total_lembur} menit\n"
-    
-    # Tambahkan tombol kembali
-    back_button = InlineKeyboardButton("↩️ Kembali", callback_data="back_main")
-    reply_markup = InlineKeyboardMarkup([[back_button]])
-    
-    await query.edit_message_text(report, reply_markup=reply_markup)
-
-async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk panel admin"""
-    user = update.effective_user
-    
-    if not keyboards.has_admin_access(user.username):
-        notif_text = db.get_setting('notification_texts')
-        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
-        except:
-            pass
-        
-        message_with_mention = format_message_with_mention(user, denied_msg)
-        await update.message.reply_text(message_with_mention)
-        return
-    
-    message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
-    await update.message.reply_text(
-        message_with_mention,
-        reply_markup=keyboards.admin_keyboard(user.username)
-    )
-
-async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Callback untuk menu admin"""
-    query = update.callback_query
-    await query.answer()
-    
-    user = query.from_user
-    username = user.username
-    
-    if not keyboards.has_admin_access(username):
-        notif_text = db.get_setting('notification_texts')
-        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
-        except:
-            pass
-        
-        message_with_mention = format_message_with_mention(user, denied_msg)
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    action = query.data
-    
-    if action == "admin_settings":
-        message_with_mention = format_message_with_mention(user, "⚙️ Pengaturan Sistem\nPilih yang ingin diubah:")
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.settings_keyboard()
-        )
-    elif action == "admin_view_all":
-        await view_all_attendance(query)
-    elif action == "admin_employees":
-        await view_employees(query)
-    elif action == "admin_export":
-        await export_data(query)
-    elif action == "owner_menu":
-        await owner_panel(query)
-    elif action == "admin_back" or action == "back_main":
-        # SOLUSI: Hapus pesan inline dan kirim pesan baru dengan ReplyKeyboard
-        if user.id in user_settings_state:
-            del user_settings_state[user.id]
-        
-        # Hapus pesan inline keyboard
-        await query.delete_message()
-        
-        # Kirim pesan baru dengan ReplyKeyboardMarkup
-        message_with_mention = format_message_with_mention(user, "Kembali ke menu utama")
-        await query.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.main_keyboard(user.id, username)
-        )
-
-async def view_all_attendance(query):
-    """Melihat semua absensi (admin only)"""
-    user = query.from_user
-    username = user.username
-    today = datetime.now().date()
-    cursor = db.conn.execute('''
-        SELECT e.full_name, a.check_in, a.check_out, a.status, a.late_minutes, a.overtime_minutes
-        FROM attendance a
-        JOIN employees e ON a.user_id = e.user_id
-        WHERE a.date = ?
-        ORDER BY e.full_name
-    ''', (today,))
-    
-    records = cursor.fetchall()
-    
-    if not records:
-        message_with_mention = format_message_with_mention(user, "📊 Tidak ada data absensi hari ini.")
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
-    report += "📊 LAPORAN ABSENSI HARIAN (Admin)\n"
-    report += f"Tanggal: {today}\n"
-    report += "─" * 50 + "\n"
-    
-    for record in records:
-        nama, check_in, check_out, status, late, overtime = record
-        report += f"👤 {nama}\n"
-        report += f"   🟢 Masuk: {check_in if check_in else 'Belum'}\n"
-        report += f"   🔴 Pulang: {check_out if check_out else 'Belum'}\n"
-        report += f"   📊 Status: {status}\n"
-        
-        if late and late > 0:
-            report += f"   ⏰ Terlambat: {late} menit\n"
-            
-        if overtime and overtime > 0:
-            report += f"   💪 Lembur: {overtime} menit\n"
-            
-        report += "─" * 30 + "\n"
-    
-    await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(username))
-
-async def view_employees(query):
-    """Melihat data karyawan (admin only)"""
-    user = query.from_user
-    username = user.username
-    cursor = db.conn.execute('''
-        SELECT user_id, username, full_name, department, position, is_active
-        FROM employees
-        ORDER BY full_name
-    ''')
-    
-    employees = cursor.fetchall()
-    
-    if not employees:
-        message_with_mention = format_message_with_mention(user, "👥 Tidak ada data karyawan.")
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
-    report += "👥 DATA KARYAWAN\n"
-    report += "─" * 40 + "\n"
-    
-    for emp in employees:
-        user_id, username, full_name, department, position, is_active = emp
-        status = "Aktif" if is_active else "Non-Aktif"
-        report += f"👤 {full_name}\n"
-        report += f"   📧 Username: @{username if username else 'Tidak ada'}\n"
-        report += f"   🏢 Dept: {department or '-'}\n"
-        report += f"   💼 Posisi: {position or '-'}\n"
-        report += f"   📊 Status: {status}\n"
-        report += "─" * 30 + "\n"
-    
-    await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(username))
-
-async def export_data(query):
-    """Handler untuk export data (admin only)"""
-    user = query.from_user
-    username = user.username
-    # Simpan data ke file (contoh sederhana)
-    try:
-        today = datetime.now().date()
-        cursor = db.conn.execute('''
-            SELECT e.full_name, a.date, a.check_in, a.check_out, a.late_minutes, a.overtime_minutes
-            FROM attendance a
-            JOIN employees e ON a.user_id = e.user_id
-            WHERE a.date = ?
-            ORDER BY e.full_name
-        ''', (today,))
-        
-        records = cursor.fetchall()
-        
-        if not records:
-            message_with_mention = format_message_with_mention(user, "📊 Tidak ada data absensi hari ini untuk di-export.")
-            await query.edit_message_text(message_with_mention)
-            return
-        
-        # Format data untuk export
-        export_data = []
-        for record in records:
-            nama, date, check_in, check_out, late, overtime = record
-            export_data.append({
-                'nama': nama,
-                'tanggal': date,
-                'check_in': check_in,
-                'check_out': check_out,
-                'terlambat_menit': late,
-                'lembur_menit': overtime
-            })
-        
-        # Simpan ke file JSON
-        export_filename = f"export_absensi_{today}.json"
-        with open(export_filename, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
-        
-        message_with_mention = format_message_with_mention(user, 
-            f"✅ Export data berhasil!\n"
-            f"📁 File: {export_filename}\n"
-            f"📊 Total data: {len(export_data)} records\n\n"
-            f"File export telah disimpan di server."
-        )
-        
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.admin_keyboard(username)
-        )
-        
-    except Exception as e:
-        message_with_mention = format_message_with_mention(user, f"❌ Gagal melakukan export: {str(e)}")
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.admin_keyboard(username)
-        )
-
-async def owner_panel(query):
-    """Panel khusus owner"""
-    user = query.from_user
-    username = user.username
-    
-    if not keyboards.has_admin_access(username):
-        notif_text = db.get_setting('notification_texts')
-        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
-        except:
-            pass
-        
-        message_with_mention = format_message_with_mention(user, denied_msg)
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    message_with_mention = format_message_with_mention(user, "👑 Administrator Panel\nPilih menu:")
-    await query.edit_message_text(
-        message_with_mention,
-        reply_markup=keyboards.owner_keyboard()
-    )
-
-async def owner_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Callback untuk menu owner"""
-    query = update.callback_query
-    await query.answer()
-    
-    user = query.from_user
-    username = user.username
-    
-    if not keyboards.has_admin_access(username):
-        notif_text = db.get_setting('notification_texts')
-        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
-        
-        try:
-            notif_texts = ast.literal_eval(notif_text)
-            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
-        except:
-            pass
-        
-        message_with_mention = format_message_with_mention(user, denied_msg)
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    action = query.data
-    
-    if action == "owner_stats":
-        await show_system_stats(query)
-    elif action == "owner_manage_admins":
-        await manage_admins(query)
-    elif action == "owner_reset":
-        await confirm_system_reset(query)
-    elif action == "owner_backup":
-        await backup_data(query)
-    elif action == "owner_back":
-        message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.admin_keyboard(username)
-        )
-
-async def show_system_stats(query):
-    """Menampilkan statistik sistem"""
-    user = query.from_user
-    username = user.username
-    
-    # Hitung total karyawan
-    cursor = db.conn.execute('SELECT COUNT(*) FROM employees')
-    total_employees = cursor.fetchone()[0]
-    
-    # Hitung total absensi hari ini
-    today = datetime.now().date()
-    cursor = db.conn.execute('SELECT COUNT(*) FROM attendance WHERE date = ?', (today,))
-    today_attendance = cursor.fetchone()[0]
-    
-    # Hitung karyawan aktif
-    cursor = db.conn.execute('SELECT COUNT(*) FROM employees WHERE is_active = 1')
-    active_employees = cursor.fetchone()[0]
-    
-    # Hitung total istirahat hari ini
-    cursor = db.conn.execute('SELECT COUNT(*) FROM breaks WHERE DATE(start_time) = ?', (today,))
-    total_breaks = cursor.fetchone()[0]
-    
-    # Hitung total data dalam database
-    cursor = db.conn.execute('SELECT COUNT(*) FROM attendance')
-    total_attendance = cursor.fetchone()[0]
-    
-    cursor = db.conn.execute('SELECT COUNT(*) FROM breaks')
-    total_breaks_all = cursor.fetchone()[0]
-    
-    stats_text = f"""👤 {format_message_with_mention(user, '').split(chr(10))[0]}
-📈 **STATISTIK SISTEM** 📈
-
-👥 **Data Karyawan:**
-• Total Karyawan: {total_employees}
-• Karyawan Aktif: {active_employees}
-• Karyawan Non-Aktif: {total_employees - active_employees}
-
-📊 **Absensi Hari Ini:**
-• Total Absensi: {today_attendance}
-
-⏰ **Aktivitas Hari Ini:**
-• Total Istirahat: {total_breaks}
-
-💾 **Database:**
-• Total Absensi: {total_attendance} records
-• Total Istirahat: {total_breaks_all} records
-• Total Karyawan: {total_employees} records
-
-🔄 **Status Sistem:**
-• Database: ✅ Normal
-• Scheduler: ✅ Berjalan
-• Bot: ✅ Online"""
-    
-    await query.edit_message_text(stats_text, parse_mode='Markdown', reply_markup=keyboards.owner_keyboard())
-
-async def manage_admins(query):
-    """Kelola admin"""
-    user = query.from_user
-    username = user.username
-    
-    admin_list = "\n".join([f"• @{admin}" for admin in config.ADMIN_USERNAMES])
-    owner_list = "\n".join([f"• 👑 @{owner}" for owner in config.OWNER_USERNAMES])
-    
-    admin_text = f"""👤 {format_message_with_mention(user, '').split(chr(10))[0]}
-👥 **PENGELOLAAN ADMINISTRATOR**
-
-**Owner saat ini:**
-{owner_list}
-
-**Admin saat ini:**
-{admin_list}
-
-**Total Akses: {len(config.ADMIN_USERNAMES) + len(config.OWNER_USERNAMES)} user**
-
-**Perintah untuk menambah admin:**
-Tambahkan username ke file config.py:
-
-ADMIN_USERNAMES = ['username1', 'username2', 'username_baru']
-OWNER_USERNAMES = ['owner1', 'owner2']
-
-**Catatan:**
-- Owner dan Admin memiliki akses penuh
-- Perubahan memerlukan restart bot"""
-    
-    await query.edit_message_text(admin_text, parse_mode='Markdown', reply_markup=keyboards.owner_keyboard())
-
-async def confirm_system_reset(query):
-    """Konfirmasi reset sistem"""
-    user = query.from_user
-    username = user.username
-    
-    keyboard = [
-        [InlineKeyboardButton("❌ Batalkan", callback_data="owner_back")],
-        [InlineKeyboardButton("🔥 RESET SEMUA DATA", callback_data="owner_confirm_reset")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    message_with_mention = format_message_with_mention(user, 
-        "⚠️ **PERINGATAN: RESET SISTEM** ⚠️\n\n"
-        "Anda akan menghapus SEMUA data:\n"
-        "• Data absensi\n• Data karyawan\n• Data istirahat\n• Semua pengaturan\n\n"
-        "Tindakan ini TIDAK DAPAT DIBATALKAN!\n"
-        "Apakah Anda yakin?"
-    )
-    
-    await query.edit_message_text(
-        message_with_mention,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
-
-async def backup_data(query):
-    """Backup data"""
-    user = query.from_user
-    username = user.username
-    
-    # Simpan data ke file (contoh sederhana)
-    try:
-        # Backup data employees
-        cursor = db.conn.execute('SELECT * FROM employees')
-        employees = cursor.fetchall()
-        
-        # Backup data attendance
-        cursor = db.conn.execute('SELECT * FROM attendance')
-        attendance = cursor.fetchall()
-        
-        # Backup data breaks
-        cursor = db.conn.execute('SELECT * FROM breaks')
-        breaks = cursor.fetchall()
-        
-        # Buat data backup
-        backup_data = {
-            'timestamp': datetime.now().isoformat(),
-            'employees': employees,
-            'attendance': attendance,
-            'breaks': breaks,
-            'total_records': len(employees) + len(attendance) + len(breaks)
-        }
-        
-        # Simpan ke file
-        backup_filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(backup_filename, 'w') as f:
-            json.dump(backup_data, f, indent=2)
-        
-        message_with_mention = format_message_with_mention(user,
-            f"✅ Backup berhasil!\n"
-            f"📁 File: {backup_filename}\n"
-            f"📊 Total data: {backup_data['total_records']} records\n\n"
-            f"File backup telah disimpan di server."
-        )
-        
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.owner_keyboard()
-        )
-        
-    except Exception as e:
-        message_with_mention = format_message_with_mention(user, f"❌ Gagal melakukan backup: {str(e)}")
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.owner_keyboard()
-        )
-
-async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Callback untuk pengaturan"""
-    query = update.callback_query
-    await query.answer()
-    
-    user = query.from_user
-    username = user.username
-    
-    if not keyboards.has_admin_access(username):
-        message_with_mention = format_message_with_mention(user, "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses pengaturan.")
-        await query.edit_message_text(message_with_mention)
-        return
-    
-    action = query.data
-    
-    if action == "set_work_start":
-        user_settings_state[user.id] = {'action': 'set_work_start'}
-        message_with_mention = format_message_with_mention(user, "🕐 Masukkan jam mulai kerja (format: HH:MM):\nContoh: 08:00")
-        await query.edit_message_text(message_with_mention)
-    elif action == "set_work_end":
-        user_settings_state[user.id] = {'action': 'set_work_end'}
-        message_with_mention = format_message_with_mention(user, "🕔 Masukkan jam selesai kerja (format: HH:MM):\nContoh: 17:00")
-        await query.edit_message_text(message_with_mention)
-    elif action == "set_break_times":
-        user_settings_state[user.id] = {'action': 'set_break_times'}
-        message_with_mention = format_message_with_mention(user, 
-            "⏱️ Masukkan durasi istirahat (format JSON):\n"
-            'Contoh: {"toilet": 15, "makan": 30, "merokok": 10, "sholat": 15, "lainnya": 20}'
-        )
-        await query.edit_message_text(message_with_mention)
-    elif action == "set_notif_texts":
-        user_settings_state[user.id] = {'action': 'set_notif_texts'}
-        message_with_mention = format_message_with_mention(user,
-            "📝 Masukkan teks notifikasi (format JSON):\n"
-            'Contoh: {"welcome": "Selamat datang!", "checkin_late": "Anda terlambat {0} menit"}'
-        )
-        await query.edit_message_text(message_with_mention)
-    elif action == "settings_back":
-        message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
-        await query.edit_message_text(
-            message_with_mention,
-            reply_markup=keyboards.admin_keyboard(username)
-        )
-
-async def handle_settings_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk input pengaturan"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    text = update.message.text
-    
-    if user_id not in user_settings_state:
-        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
-        await update.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.main_keyboard(user_id, username)
-        )
-        return
-    
-    action = user_settings_state[user_id]['action']
-    success = False
-    
-    try:
-        if action == "set_work_start":
-            # Validasi format waktu
-            if len(text) == 5 and text[2] == ':':
-                hours, minutes = text.split(':')
-                if hours.isdigit() and minutes.isdigit() and 0 <= int(hours) <= 23 and 0 <= int(minutes) <= 59:
-                    db.update_setting('work_start', text)
-                    success = True
-                    message = f"✅ Jam mulai kerja diubah menjadi: {text}"
-                else:
-                    message = "❌ Format waktu tidak valid. Gunakan HH:MM (contoh: 08:00)"
-            else:
-                message = "❌ Format tidak valid. Gunakan HH:MM (contoh: 08:00)"
-                
-        elif action == "set_work_end":
-            if len(text) == 5 and text[2] == ':':
-                hours, minutes = text.split(':')
-                if hours.isdigit() and minutes.isdigit() and 0 <= int(hours) <= 23 and 0 <= int(minutes) <= 59:
-                    db.update_setting('work_end', text)
-                    success = True
-                    message = f"✅ Jam selesai kerja diubah menjadi: {text}"
-                else:
-                    message = "❌ Format waktu tidak valid. Gunakan HH:MM (contoh: 17:00)"
-            else:
-                message = "❌ Format tidak valid. Gunakan HH:MM (contoh: 17:00)"
-                
-        elif action == "set_break_times":
-            try:
-                # Validasi JSON
-                break_times = json.loads(text)
-                if isinstance(break_times, dict):
-                    db.update_setting('break_times', text)
-                    success = True
-                    message = "✅ Durasi istirahat berhasil diubah"
-                else:
-                    message = "❌ Format JSON tidak valid. Harus berupa object/dictionary"
-            except json.JSONDecodeError:
-                message = "❌ Format JSON tidak valid. Gunakan format yang benar"
-                
-        elif action == "set_notif_texts":
-            try:
-                notif_texts = json.loads(text)
-                if isinstance(notif_texts, dict):
-                    db.update_setting('notification_texts', text)
-                    success = True
-                    message = "✅ Teks notifikasi berhasil diubah"
-                else:
-                    message = "❌ Format JSON tidak valid. Harus berupa object/dictionary"
-            except json.JSONDecodeError:
-                message = "❌ Format JSON tidak valid. Gunakan format yang benar"
-                
-        else:
-            message = "❌ Aksi tidak dikenali"
-            
-    except Exception as e:
-        message = f"❌ Error: {str(e)}"
-    
-    # Hapus state pengaturan
-    if user_id in user_settings_state:
-        del user_settings_state[user_id]
-    
-    message_with_mention = format_message_with_mention(user, message)
-    await update.message.reply_text(message_with_mention)
-    
-    if success:
-        # Kembali ke menu pengaturan
-        message_with_mention = format_message_with_mention(user, "⚙️ Pengaturan Sistem\nPilih yang ingin diubah:")
-        await update.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.settings_keyboard()
-        )
-    else:
-        # Kembali ke menu utama
-        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
-        await update.message.reply_text(
-            message_with_mention,
-            reply_markup=keyboards.main_keyboard(user_id, username)
-        )
-
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk perintah /help"""
-    user = update.effective_user
-    user_id = user.id
-    username = user.username
-    
-    help_text = """🆘 **BANTUAN SISTEM ABSENSI** 🆘
-
-**Fitur Utama:**
-🟢 **Masuk Kerja** - Absensi saat datang kerja
-💼 **Pulang Kerja** - Absensi saat pulang kerja  
-☕ **Istirahat** - Mulai istirahat (toilet, makan, dll)
-✅ **Selesai Istirahat** - Akhiri istirahat
-📊 **Lihat Absensi** - Lihat riwayat absensi pribadi
-
-**Jenis Istirahat:**
-🚽 **Toilet** - Keperluan toilet (15 menit)
-🍽️ **Makan** - Istirahat makan (30 menit)  
-🚬 **Merokok** - Istirahat merokok (10 menit)
-🕌 **Sholat** - Istirahat sholat (15 menit)
-📋 **Lainnya** - Keperluan lainnya (20 menit)
-
-**Perintah:**
-/start - Memulai bot
-/help - Menampilkan bantuan ini
-/selesai_istirahat - Menyelesaikan istirahat
-
-**Admin/Owner:**
-⚙️ **Admin Panel** - Menu khusus administrator
-
-**Tips:**
-- Pastikan terkoneksi internet saat absensi
-- Gunakan tombol sesuai urutan aktivitas
-- Hubungi admin jika ada kendala"""
-    
-    message_with_mention = format_message_with_mention(user, help_text)
-    await update.message.reply_text(message_with_mention, parse_mode='Markdown')
-
-async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler untuk error"""
-    logger.error(f"Error: {context.error}", exc_info=context.error)
-    
-    if update and update.effective_user:
-        user = update.effective_user
-        user_id = user.id
-        try:
-            message_with_mention = format_message_with_mention(user, "❌ Terjadi kesalahan sistem. Silakan coba lagi atau hubungi admin.")
-            await context.bot.send_message(
-                user_id,
-                message_with_mention,
-                parse_mode='Markdown'
-            )
-        except:
-            # Fallback tanpa mention jika error
-            await context.bot.send_message(
-                user_id,
-                "❌ Terjadi kesalahan sistem. Silakan coba lagi atau hubungi admin."
-            )
-
-def main():
-    """Fungsi utama untuk menjalankan bot"""
-    
-    # Setup bot - FIX: Gunakan approach yang lebih kompatibel
-    try:
-        # Cara yang lebih kompatibel untuk berbagai versi
-        application = Application.builder().token(config.BOT_TOKEN).build()
-    except Exception as e:
-        logger.error(f"Error creating application: {e}")
-        # Fallback untuk versi yang lebih lama
-        from telegram.ext import Updater
-        updater = Updater(token=config.BOT_TOKEN, use_context=True)
-        application = updater.application
-    
-    # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("selesai_istirahat", end_break_command))
-    
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    
-    # Callback handlers
-    application.add_handler(CallbackQueryHandler(break_callback, pattern="^break_"))
-    application.add_handler(CallbackQueryHandler(attendance_callback, pattern="^attendance_"))
-    application.add_handler(CallbackQueryHandler(admin_callback, pattern="^admin_"))
-    application.add_handler(CallbackQueryHandler(owner_callback, pattern="^owner_"))
-    application.add_handler(CallbackQueryHandler(settings_callback, pattern="^set_"))
-    application.add_handler(CallbackQueryHandler(admin_callback, pattern="^back_"))
-    
-    # Error handler
-    application.add_error_handler(error_handler)
-    
-    # Start scheduler
-    scheduler.start()
-    
-    # Jalankan bot
-    print("🤖 Bot absensi sedang berjalan...")
-    print("Tekan Ctrl+C untuk menghentikan")
-    
-    try:
-        application.run_polling()
-    except Exception as e:
-        logger.error(f"Error running bot: {e}")
-
-if __name__ == "__main__":
-    main()
+import logging
+import asyncio
+import ast
+import json
+import os
+from datetime import datetime, timedelta
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from telegram.ext import (
+    Application, CommandHandler, MessageHandler, 
+    CallbackQueryHandler, ContextTypes, TypeHandler, filters
+)
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+import anomalies
+import config
+import database
+import keyboards
+import logging_setup
+import middleware
+import payroll
+import recorder
+import tenants
+import utils
+import health
+from dashboard import live_dashboard
+from digest import admin_digest
+from outbox import outbox_sender
+from presence import presence_board
+
+logger = logging.getLogger(__name__)
+
+# Inisialisasi scheduler
+scheduler = AsyncIOScheduler()
+db = database.db
+
+# Nama jenis istirahat untuk ditampilkan ke user
+BREAK_TYPE_NAMES = {
+    'toilet': '🚽 Toilet',
+    'makan': '🍽️ Makan',
+    'merokok': '🚬 Merokok',
+    'sholat': '🕌 Sholat',
+    'lainnya': '📋 Lainnya'
+}
+
+# Dictionary untuk state pengaturan
+user_settings_state = {}
+# Balasan user yang sedang ditunggu (pengaturan, file /import) tidak kena debounce/load shedding
+middleware.conversation_states.append(user_settings_state)
+
+def format_message_with_mention(user, message):
+    """Format pesan dengan mention ke user"""
+    user_name = user.full_name
+    if user.username:
+        mention = f"@{user.username}"
+    else:
+        mention = f"[{user_name}](tg://user?id={user.id})"
+    
+    return f"👤 {mention}\n{message}"
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /start"""
+    user = update.effective_user
+    # Daftarkan user ke database
+    db.add_employee(user.id, user.username, user.full_name)
+    db.bootstrap_roles(user.id)
+    
+    welcome_text = db.get_setting('notification_texts')
+    welcome_msg = "Selamat datang di sistem absensi!"
+    
+    try:
+        notif_texts = ast.literal_eval(welcome_text)
+        welcome_msg = notif_texts.get('welcome', welcome_msg)
+    except:
+        pass
+    
+    # Tampilkan pesan welcome khusus untuk admin/owner
+    if keyboards.has_admin_access(user.id):
+        welcome_msg += "\n\n👑 Anda login sebagai Administrator"
+    
+    message_with_mention = format_message_with_mention(user, f"👋 {welcome_msg}\n\nHalo {user.full_name}!")
+    
+    await update.message.reply_text(
+        message_with_mention,
+        reply_markup=keyboards.main_keyboard(user.id),
+        parse_mode='Markdown'
+    )
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk pesan teks"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    text = update.message.text
+    
+    # Cek jika user sedang dalam mode pengaturan
+    if user_id in user_settings_state:
+        await handle_settings_input(update, context)
+        return
+    
+    # Cek jika user sedang istirahat dan mencoba akses menu lain
+    active_break = db.get_user_active_break(user_id)
+    if active_break and text not in ["✅ Selesai Istirahat", "🆘 Bantuan", "/selesai_istirahat", "/help", "/start"]:
+        notif_text = db.get_setting('notification_texts')
+        blocked_msg = "⛔ Anda belum bisa melakukan aktivitas lainnya sebelum menyelesaikan istirahat yang sedang berlangsung."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            blocked_msg = notif_texts.get('action_blocked', blocked_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, blocked_msg)
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    # Handle menu berdasarkan text
+    if text == "🟢 Masuk Kerja":
+        await check_in(update, context)
+    elif text == "💼 Pulang Kerja":
+        await check_out(update, context)
+    elif text == "☕ Istirahat":
+        await start_break_menu(update, context)
+    elif text == "✅ Selesai Istirahat":
+        await end_break_command(update, context)
+    elif text == "📊 Lihat Absensi":
+        await view_attendance(update, context)
+    elif text == "⚙️ Admin Panel":
+        await admin_panel(update, context)
+    elif text == "🆘 Bantuan":
+        await help_command(update, context)
+    else:
+        # Jika pesan tidak dikenali, kirim keyboard utama
+        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
+        await update.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.main_keyboard(user_id)
+        )
+
+async def check_in(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk absensi masuk"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    current_time = datetime.now().strftime("%H:%M:%S")
+    
+    # Keterlambatan dihitung database dari jam mulai kerja di settings
+    success, message, late_minutes, employee = db.check_in(user_id, current_time)
+    
+    if success:
+        full_name, department = employee
+        presence_board.check_in(user_id, full_name or user.full_name, department)
+        
+        if late_minutes > 0:
+            notif_text = db.get_setting('notification_texts')
+            late_msg = f"⏰ Anda terlambat {late_minutes} menit."
+            
+            try:
+                notif_texts = ast.literal_eval(notif_text)
+                late_msg = notif_texts.get('checkin_late', '').format(late_minutes)
+            except:
+                pass
+            
+            message += f"\n{late_msg}"
+            admin_digest.add('late', f"{user.full_name}: {late_minutes} menit ({current_time})")
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(message_with_mention, reply_markup=keyboards.main_keyboard(user_id))
+
+async def check_out(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk absensi pulang"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    current_time = datetime.now().strftime("%H:%M:%S")
+    
+    # Lembur dan pulang cepat dihitung database dari jam selesai kerja di settings
+    success, message, overtime, early_leave = db.check_out(user_id, current_time)
+    
+    if success:
+        presence_board.check_out(user_id)
+        
+        notif_text = db.get_setting('notification_texts')
+        
+        if overtime > 0:
+            overtime_msg = f"💪 Lembur: {overtime} menit."
+            try:
+                notif_texts = ast.literal_eval(notif_text)
+                overtime_msg = notif_texts.get('overtime', '').format(overtime)
+            except:
+                pass
+            message += f"\n{overtime_msg}"
+        
+        if early_leave > 0:
+            early_msg = f"🚪 Pulang cepat: {early_leave} menit."
+            try:
+                notif_texts = ast.literal_eval(notif_text)
+                early_msg = notif_texts.get('checkout_early', '').format(early_leave)
+            except:
+                pass
+            message += f"\n{early_msg}"
+            admin_digest.add('early_leave', f"{user.full_name}: {early_leave} menit ({current_time})")
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(message_with_mention, reply_markup=keyboards.main_keyboard(user_id))
+
+async def start_break_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Menampilkan menu pilihan istirahat"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    
+    # Cek apakah user sudah check in hari ini
+    today_attendance = db.get_today_attendance(user_id)
+    if not today_attendance or not today_attendance[1]:  # No check-in today
+        message_with_mention = format_message_with_mention(user, "❌ Anda harus check-in terlebih dahulu sebelum melakukan istirahat.")
+        await update.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.main_keyboard(user_id)
+        )
+        return
+    
+    message_with_mention = format_message_with_mention(user, "Pilih jenis istirahat:")
+    await update.message.reply_text(
+        message_with_mention,
+        reply_markup=keyboards.break_types_keyboard()
+    )
+
+async def break_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk callback jenis istirahat"""
+    query = update.callback_query
+    await query.answer()
+    
+    user = query.from_user
+    user_id = user.id
+    username = user.username
+    break_type = query.data.replace("break_", "")
+    
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    success, message = db.start_break(user_id, break_type, current_time)
+    
+    if success:
+        # Dapatkan durasi istirahat dari settings
+        break_duration = db.get_break_duration(break_type)
+        
+        notif_text = db.get_setting('notification_texts')
+        break_msg = f"☕ Istirahat {break_type} dimulai. Durasi: {break_duration} menit."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            break_msg = notif_texts.get('break_start', '').format(break_type, break_duration)
+        except:
+            pass
+        
+        due = datetime.now() + timedelta(minutes=break_duration)
+        presence_board.start_break(user_id, break_type, due, user.full_name)
+        
+        # Schedule reminder (satu reminder per user, menggantikan yang lama)
+        scheduler.add_job(
+            send_break_reminder, 
+            'date', 
+            run_date=due,
+            args=[user_id, break_type, tenants.current_tenant_id()],
+            id=f"break_reminder_{user_id}",
+            replace_existing=True
+        )
+        
+        message_with_mention = format_message_with_mention(user, break_msg)
+        await query.edit_message_text(message_with_mention)
+        
+        # Kirim ulang keyboard yang diperbarui
+        followup_message = format_message_with_mention(user, "Silakan klik '✅ Selesai Istirahat' ketika kembali:")
+        await query.message.reply_text(
+            followup_message, 
+            reply_markup=keyboards.main_keyboard(user_id)
+        )
+    else:
+        message_with_mention = format_message_with_mention(user, "❌ Gagal memulai istirahat: " + message)
+        await query.edit_message_text(message_with_mention)
+
+async def send_break_reminder(user_id, break_type, tenant_id=None):
+    """Memasukkan reminder waktu istirahat habis ke outbox"""
+    with tenants.use_tenant(tenant_id):
+        active_break = db.get_user_active_break(user_id)
+        if not active_break:
+            return  # istirahat sudah selesai
+        break_id = active_break[0]
+        
+        # Dapatkan info user dari database untuk mention
+        cursor = db.conn.execute('SELECT username, full_name FROM employees WHERE user_id = ?', (user_id,))
+        user_info = cursor.fetchone()
+        
+        if user_info:
+            username, full_name = user_info
+            admin_digest.add('overdue_break', f"{full_name}: istirahat {break_type} belum selesai")
+            
+            if username:
+                mention = f"@{username}"
+            else:
+                mention = f"[{full_name}](tg://user?id={user_id})"
+            
+            reminder_msg = f"👤 {mention}\n⏰ Reminder: Waktu istirahat {break_type} Anda sudah habis!\nGunakan tombol '✅ Selesai Istirahat' untuk mengakhiri."
+            parse_mode = 'Markdown'
+        else:
+            # Fallback jika tidak ada info user
+            reminder_msg = f"⏰ Reminder: Waktu istirahat {break_type} Anda sudah habis!\nGunakan tombol '✅ Selesai Istirahat' untuk mengakhiri."
+            parse_mode = None
+        
+        db.enqueue_messages([(user_id, reminder_msg, f"break_reminder:{break_id}", parse_mode)])
+        outbox_sender.wake()
+
+async def auto_close_job(tenant_id=None):
+    """Job akhir hari: menutup absensi dan istirahat yang lupa diselesaikan"""
+    with tenants.use_tenant(tenant_id):
+        now = datetime.now()
+        work_end = db.get_setting('work_end') or config.DEFAULT_WORK_END
+        
+        notif_text = db.get_setting('notification_texts')
+        closed_msg = config.NOTIFICATION_TEXTS['auto_closed']
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            closed_msg = notif_texts.get('auto_closed', closed_msg)
+        except:
+            pass
+        
+        # Pemberitahuan ke user masuk outbox dalam transaksi penutupan yang sama
+        user_ids = db.auto_close_open_records(now.date(), work_end, now.strftime("%Y-%m-%d %H:%M:%S"), closed_msg)
+        if not user_ids:
+            return
+        
+        logger.info("Penutupan otomatis: %s user terdampak", len(user_ids), extra={'tenant': tenant_id})
+        outbox_sender.wake()
+        
+        for user_id in user_ids:
+            presence_board.check_out(user_id)
+        
+        # Hapus reminder istirahat yang sudah tidak relevan
+        for user_id in user_ids:
+            if scheduler.get_job(f"break_reminder_{user_id}"):
+                scheduler.remove_job(f"break_reminder_{user_id}")
+
+async def send_admin_digest():
+    """Job berkala: mengirim satu ringkasan kejadian ke setiap admin"""
+    window_start, events = admin_digest.drain()
+    if not events:
+        return
+    
+    # Kirim ringkasan terpisah untuk setiap tenant ke admin tenant tersebut
+    events_by_tenant = {}
+    for kind, description, tenant_id in events:
+        events_by_tenant.setdefault(tenant_id, []).append((kind, description))
+    
+    for tenant_id, tenant_events in events_by_tenant.items():
+        with tenants.use_tenant(tenant_id):
+            admin_ids = db.get_role_user_ids()
+            if not admin_ids:
+                logger.info("Ringkasan admin dilewati: belum ada admin yang terdaftar di bot")
+                continue
+            
+            report = admin_digest.format(window_start, tenant_events)
+            window = window_start.strftime('%Y%m%d%H%M%S')
+            db.enqueue_messages([(admin_id, report, f"digest:{admin_id}:{window}", None) for admin_id in admin_ids])
+            outbox_sender.wake()
+
+async def anomaly_scan_job(tenant_id=None):
+    """Job malam hari: periksa anomali pada data baru dan kirim satu ringkasan ke admin"""
+    with tenants.use_tenant(tenant_id):
+        findings = anomalies.scan(db)
+        logger.info("Pemeriksaan anomali selesai: %s temuan baru", len(findings), extra={'tenant': tenant_id})
+        if not findings:
+            return
+        
+        admin_ids = db.get_role_user_ids()
+        if not admin_ids:
+            logger.info("Ringkasan anomali dilewati: belum ada admin yang terdaftar di bot")
+            return
+        
+        report = anomalies.format_summary(findings)
+        day = datetime.now().strftime('%Y%m%d')
+        db.enqueue_messages([(admin_id, report, f"anomaly:{admin_id}:{day}", None) for admin_id in admin_ids])
+        outbox_sender.wake()
+
+async def refresh_dashboard():
+    """Job berkala: perbarui dashboard (mis. istirahat yang baru lewat waktu); dilewati jika tidak berubah"""
+    live_dashboard.mark_dirty()
+
+async def post_init(application: Application):
+    """Dijalankan setelah bot siap: aktifkan outbox, dashboard live dan watchdog event loop"""
+    outbox_sender.start(application.bot)
+    live_dashboard.start(application.bot)
+    if config.WATCHDOG_ENABLED:
+        health.loop_watchdog.start(application, scheduler)
+
+def schedule_tenant_jobs(tenant_id=None):
+    """Menjadwalkan job harian milik satu tenant: penutupan otomatis dan pemeriksaan anomali"""
+    schedule_auto_close(tenant_id)
+    if config.ANOMALY_SCAN_ENABLED:
+        scan_at = datetime.strptime(config.ANOMALY_SCAN_TIME, "%H:%M")
+        scheduler.add_job(
+            anomaly_scan_job,
+            'cron',
+            hour=scan_at.hour,
+            minute=scan_at.minute,
+            args=[tenant_id],
+            id=f"anomaly_scan_{tenant_id}" if tenant_id else "anomaly_scan",
+            replace_existing=True
+        )
+
+async def sync_tenant_jobs():
+    """Job berkala: jadwalkan job untuk tenant yang baru ditambahkan, hapus job tenant nonaktif"""
+    active = set(tenants.tenant_ids())
+    scheduled = {job.args[0] for job in scheduler.get_jobs() if job.id.startswith('auto_close_')}
+    
+    for tenant_id in active - scheduled:
+        logger.info("Tenant baru %s: job harian dijadwalkan", tenant_id, extra={'tenant': tenant_id})
+        schedule_tenant_jobs(tenant_id)
+    
+    for tenant_id in scheduled - active:
+        logger.info("Tenant %s nonaktif: job harian dihapus", tenant_id, extra={'tenant': tenant_id})
+        for job_id in (f"auto_close_{tenant_id}", f"anomaly_scan_{tenant_id}"):
+            if scheduler.get_job(job_id):
+                scheduler.remove_job(job_id)
+
+def schedule_auto_close(tenant_id=None):
+    """Menjadwalkan job penutupan otomatis berdasarkan jam selesai kerja (per tenant)"""
+    with tenants.use_tenant(tenant_id):
+        work_end = db.get_setting('work_end') or config.DEFAULT_WORK_END
+    run_at = datetime.strptime(work_end, "%H:%M") + timedelta(minutes=config.AUTO_CLOSE_DELAY_MINUTES)
+    
+    scheduler.add_job(
+        auto_close_job,
+        'cron',
+        hour=run_at.hour,
+        minute=run_at.minute,
+        args=[tenant_id],
+        id=f"auto_close_{tenant_id}" if tenant_id else "auto_close",
+        replace_existing=True
+    )
+
+def format_break_counters(counters):
+    """Baris ringkasan per jenis istirahat: jumlah, total menit dan kuota harian jika ada"""
+    lines = []
+    for br_type, (count, minutes) in sorted(counters.items()):
+        display_name = BREAK_TYPE_NAMES.get(br_type, br_type.capitalize())
+        quota = db.get_break_quota(br_type)
+        quota_text = f" (kuota {count}/{quota})" if quota is not None else ""
+        lines.append(f"• {display_name}: {count} kali, {int(minutes)} menit{quota_text}")
+    return "\n".join(lines)
+
+async def end_break_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk menyelesaikan istirahat"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    success, message, finished = db.end_break(user_id, current_time)
+    
+    if success:
+        presence_board.end_break(user_id)
+        
+        # Hapus reminder
+        try:
+            # Hapus job reminder untuk user ini (id unik per user)
+            if scheduler.get_job(f"break_reminder_{user_id}"):
+                scheduler.remove_job(f"break_reminder_{user_id}")
+        except Exception as e:
+            logger.error("Gagal menghapus reminder untuk user %s: %s", user_id, e, extra={'user_id': user_id})
+        
+        if middleware.rate_limiter.is_overloaded():
+            # Mode overload: lewati laporan detail, cukup satu pesan beserta keyboard
+            message_with_mention = format_message_with_mention(user, "✅ Istirahat selesai.")
+            await update.message.reply_text(
+                message_with_mention,
+                reply_markup=keyboards.main_keyboard(user_id)
+            )
+            return
+        
+        # Durasi dari hasil update, ringkasan harian dari break_counters (tanpa scan istirahat hari ini)
+        break_type, start_time, actual_duration = finished
+        minutes, seconds = divmod(round(actual_duration * 60), 60)
+        counters = db.get_break_counters(user_id)
+        
+        notif_text = db.get_setting('notification_texts')
+        end_msg = f"✅ Istirahat selesai. Durasi: {minutes} menit {seconds} detik."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            end_msg = notif_texts.get('break_end', '').format(minutes, seconds)
+        except:
+            pass
+        
+        detail = f"""📊 Detail Istirahat:
+• Jenis: {break_type}
+• Mulai: {start_time.split(' ')[1]}
+• Selesai: {current_time.split(' ')[1]}
+• Durasi: {minutes} menit {seconds} detik
+• Total istirahat hari ini: {sum(count for count, _ in counters.values())} kali
+
+📈 Breakdown per Jenis:
+{format_break_counters(counters)}"""
+        
+        message_with_mention = format_message_with_mention(user, f"{end_msg}\n{detail}")
+        await update.message.reply_text(message_with_mention)
+    else:
+        message_with_mention = format_message_with_mention(user, message)
+        await update.message.reply_text(message_with_mention)
+    
+    # Kembalikan ke keyboard normal
+    message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
+    await update.message.reply_text(
+        message_with_mention, 
+        reply_markup=keyboards.main_keyboard(user_id)
+    )
+
+async def view_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk melihat absensi pribadi"""
+    user = update.effective_user
+    
+    # Tampilkan opsi periode
+    keyboard = [
+        [InlineKeyboardButton("Hari Ini", callback_data="attendance_today")],
+        [InlineKeyboardButton("Minggu Ini", callback_data="attendance_week")],
+        [InlineKeyboardButton("Bulan Ini", callback_data="attendance_month")],
+        [InlineKeyboardButton("Semua Data", callback_data="attendance_all")]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    message_with_mention = format_message_with_mention(user, "📊 Pilih periode laporan absensi:")
+    await update.message.reply_text(
+        message_with_mention,
+        reply_markup=reply_markup
+    )
+
+async def attendance_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Callback untuk laporan absensi"""
+    query = update.callback_query
+    await query.answer()
+    
+    user = query.from_user
+    user_id = user.id
+    username = user.username
+    period = query.data.replace("attendance_", "")
+    
+    today = datetime.now().date()
+    
+    if period == "today":
+        start_date = today
+        end_date = today
+        title = "Hari Ini"
+    elif period == "week":
+        start_date = today - timedelta(days=today.weekday())
+        end_date = start_date + timedelta(days=6)
+        title = "Minggu Ini"
+    elif period == "month":
+        start_date = today.replace(day=1)
+        if today.month == 12:
+            end_date = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
+        else:
+            end_date = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
+        title = "Bulan Ini"
+    else:  # all
+        start_date = today - timedelta(days=30)
+        end_date = today
+        title = "30 Hari Terakhir"
+    
+    # Ambil data dari database
+    cursor = db.conn.execute('''
+        SELECT date, check_in, check_out, late_minutes, overtime_minutes, early_leave_minutes 
+        FROM attendance 
+        WHERE user_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date DESC
+    ''', (user_id, start_date, end_date))
+    
+    records = cursor.fetchall()
+    
+    if not records:
+        message_with_mention = format_message_with_mention(user, f"📊 Tidak ada data absensi untuk periode {title}.")
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    # Format laporan dengan mention
+    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
+    report += f"📊 LAPORAN ABSENSI - {title.upper()}\n"
+    report += f"Periode: {start_date} sampai {end_date}\n"
+    report += "─" * 40 + "\n\n"
+    
+    total_kerja = 0
+    total_terlambat = 0
+    total_lembur = 0
+    hari_kerja = 0
+    
+    for record in records:
+        date_str, check_in, check_out, late, overtime, early_leave = record
+        
+        report += f"📅 {date_str}\n"
+        report += f"🟢 Masuk: {check_in if check_in else 'Tidak absen'}\n"
+        
+        if check_out:
+            report += f"🔴 Pulang: {check_out}\n"
+            
+            # Hitung jam kerja
+            if check_in:
+                masuk = datetime.strptime(check_in, '%H:%M:%S')
+                pulang = datetime.strptime(check_out, '%H:%M:%S')
+                jam_kerja = (pulang - masuk).total_seconds() / 3600
+                total_kerja += jam_kerja
+                hari_kerja += 1
+                report += f"⏱️ Jam kerja: {jam_kerja:.1f} jam\n"
+        
+        if late and late > 0:
+            report += f"⏰ Terlambat: {late} menit\n"
+            total_terlambat += late
+        
+        if overtime and overtime > 0:
+            report += f"💪 Lembur: {overtime} menit\n"
+            total_lembur += overtime
+            
+        if early_leave and early_leave > 0:
+            report += f"🚪 Pulang cepat: {early_leave} menit\n"
+            
+        report += "─" * 30 + "\n"
+    
+    # Total
+    report += "\n📈 TOTAL:\n"
+    report += f"• Hari kerja: {hari_kerja} hari\n"
+    report += f"• Total jam kerja: {total_kerja:.1f} jam\n"
+    if total_terlambat > 0:
+        report += f"• Total terlambat: {total_terlambat} menit\n"
+    if total_lembur > 0:
+        report += f"• Total lembur: {total_lembur} menit\n"
+    
+    # Tambahkan tombol kembali
+    back_button = InlineKeyboardButton("↩️ Kembali", callback_data="back_main")
+    reply_markup = InlineKeyboardMarkup([[back_button]])
+    
+    await query.edit_message_text(report, reply_markup=reply_markup)
+
+async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk panel admin"""
+    user = update.effective_user
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
+    await update.message.reply_text(
+        message_with_mention,
+        reply_markup=keyboards.admin_keyboard(user.id)
+    )
+
+async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Callback untuk menu admin"""
+    query = update.callback_query
+    await query.answer()
+    
+    user = query.from_user
+    username = user.username
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    action = query.data
+    
+    if action == "admin_settings":
+        message_with_mention = format_message_with_mention(user, "⚙️ Pengaturan Sistem\nPilih yang ingin diubah:")
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.settings_keyboard()
+        )
+    elif action == "admin_view_all":
+        await view_all_attendance(query)
+    elif action == "admin_presence":
+        await query.edit_message_text(presence_board.format(), reply_markup=keyboards.admin_keyboard(user.id))
+    elif action == "admin_departments":
+        # Default: awal bulan sampai hari ini
+        today = datetime.now().date()
+        report = await build_department_report(today.replace(day=1), today)
+        await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(user.id))
+    elif action == "admin_employees":
+        await view_employees(query)
+    elif action == "admin_export":
+        await export_data(query)
+    elif action.startswith("admin_emp_"):
+        await view_employee_attendance(query, int(action.replace("admin_emp_", "")))
+    elif action == "admin_import":
+        user_settings_state[user.id] = {'action': 'import_employees'}
+        message_with_mention = format_message_with_mention(user,
+            "📥 Kirim file CSV atau JSON berisi data karyawan.\n"
+            "Kolom: user_id, username, full_name, department, position, is_active\n"
+            "Hanya user_id yang wajib; kolom kosong tidak mengubah data lama."
+        )
+        await query.edit_message_text(message_with_mention)
+    elif action == "owner_menu":
+        await owner_panel(query)
+    elif action == "admin_back" or action == "back_main":
+        # SOLUSI: Hapus pesan inline dan kirim pesan baru dengan ReplyKeyboard
+        if user.id in user_settings_state:
+            del user_settings_state[user.id]
+        
+        # Hapus pesan inline keyboard
+        await query.delete_message()
+        
+        # Kirim pesan baru dengan ReplyKeyboardMarkup
+        message_with_mention = format_message_with_mention(user, "Kembali ke menu utama")
+        await query.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.main_keyboard(user.id)
+        )
+
+async def view_all_attendance(query):
+    """Melihat semua absensi (admin only)"""
+    user = query.from_user
+    username = user.username
+    today = datetime.now().date()
+    records = await db.reports.get_today_attendance_all()
+    
+    if not records:
+        message_with_mention = format_message_with_mention(user, "📊 Tidak ada data absensi hari ini.")
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
+    report += "📊 LAPORAN ABSENSI HARIAN (Admin)\n"
+    report += f"Tanggal: {today}\n"
+    report += "─" * 50 + "\n"
+    
+    for record in records:
+        nama, check_in, check_out, status, late, overtime = record
+        report += f"👤 {nama}\n"
+        report += f"   🟢 Masuk: {check_in if check_in else 'Belum'}\n"
+        report += f"   🔴 Pulang: {check_out if check_out else 'Belum'}\n"
+        report += f"   📊 Status: {status}\n"
+        
+        if late and late > 0:
+            report += f"   ⏰ Terlambat: {late} menit\n"
+            
+        if overtime and overtime > 0:
+            report += f"   💪 Lembur: {overtime} menit\n"
+            
+        report += "─" * 30 + "\n"
+    
+    counters = await db.reports.get_break_counters_all()
+    if counters:
+        report += "☕ ISTIRAHAT HARI INI\n"
+        per_user = {}
+        for emp_id, nama, break_type, count, minutes in counters:
+            per_user.setdefault((emp_id, nama), []).append(f"{break_type} {count}x/{int(minutes)}m")
+        for (emp_id, nama), items in per_user.items():
+            report += f"👤 {nama}: {', '.join(items)}\n"
+    
+    await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(user.id))
+
+async def view_employees(query):
+    """Melihat data karyawan (admin only)"""
+    user = query.from_user
+    username = user.username
+    employees = await db.reports.get_all_employees()
+    
+    if not employees:
+        message_with_mention = format_message_with_mention(user, "👥 Tidak ada data karyawan.")
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    report = f"👤 {format_message_with_mention(user, '').split(chr(10))[0]}\n"
+    report += "👥 DATA KARYAWAN\n"
+    report += "─" * 40 + "\n"
+    
+    for emp in employees:
+        user_id, username, full_name, department, position, is_active = emp
+        status = "Aktif" if is_active else "Non-Aktif"
+        report += f"👤 {full_name}\n"
+        report += f"   📧 Username: @{username if username else 'Tidak ada'}\n"
+        report += f"   🏢 Dept: {department or '-'}\n"
+        report += f"   💼 Posisi: {position or '-'}\n"
+        report += f"   📊 Status: {status}\n"
+        report += "─" * 30 + "\n"
+    
+    await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(user.id))
+
+async def presence_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /kehadiran: siapa yang hadir/istirahat saat ini (admin only)"""
+    user = update.effective_user
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    # Dibaca dari papan kehadiran di memori, tanpa query database
+    await update.message.reply_text(presence_board.format())
+
+async def build_department_report(start_date, end_date):
+    """Laporan perbandingan departemen; agregasi dilakukan di SQLite (worker read-only)"""
+    rows, totals = await db.reports.get_department_report(start_date, end_date)
+    break_rows = await db.reports.get_department_breaks(start_date, end_date)
+    
+    if not rows:
+        return "🏢 Belum ada data karyawan aktif."
+    
+    breaks = {}
+    for department, break_type, count, minutes in break_rows:
+        breaks.setdefault(department, []).append(f"{break_type} {int(minutes)}m/{count}x")
+    
+    report = "🏢 LAPORAN PER DEPARTEMEN\n"
+    report += f"Periode: {start_date} sampai {end_date}\n"
+    report += "─" * 30 + "\n"
+    
+    for department, employees, present, rate, late_days, avg_late, overtime, rank in rows + [totals]:
+        title = f"#{rank} {department}" if department is not None else "📊 SEMUA DEPARTEMEN"
+        report += f"\n{title} ({employees} karyawan)\n"
+        report += f"   ✅ Kehadiran: {rate or 0}% ({present} hari hadir)\n"
+        report += f"   ⏰ Terlambat: {late_days} kali, rata-rata {avg_late or 0} menit\n"
+        report += f"   💪 Lembur: {overtime} menit\n"
+        if breaks.get(department):
+            report += f"   ☕ Istirahat: {', '.join(breaks[department])}\n"
+    
+    if len(report) > 4000:
+        report = report[:4000] + "\n..."
+    return report
+
+async def department_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /laporan_departemen [YYYY-MM-DD YYYY-MM-DD] (admin only)"""
+    user = update.effective_user
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    try:
+        if context.args:
+            start_date = datetime.strptime(context.args[0], "%Y-%m-%d").date()
+            end_date = datetime.strptime(context.args[1], "%Y-%m-%d").date() if len(context.args) > 1 else datetime.now().date()
+        else:
+            end_date = datetime.now().date()
+            start_date = end_date.replace(day=1)
+    except ValueError:
+        message_with_mention = format_message_with_mention(user, "❌ Format: /laporan_departemen YYYY-MM-DD [YYYY-MM-DD]\nContoh: /laporan_departemen 2025-09-01 2025-09-30")
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    await update.message.reply_text(await build_department_report(start_date, end_date))
+
+async def search_employees_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /cari <kata kunci> (admin only)"""
+    user = update.effective_user
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    if not context.args:
+        message_with_mention = format_message_with_mention(user, "❌ Format: /cari <nama/username/departemen/posisi>")
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    keyword = " ".join(context.args)
+    employees = db.search_employees(keyword)
+    
+    if not employees:
+        message_with_mention = format_message_with_mention(user, f"🔍 Tidak ada karyawan yang cocok dengan \"{keyword}\".")
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    report = f"🔍 HASIL PENCARIAN: {keyword}\n"
+    report += "─" * 30 + "\n"
+    keyboard = []
+    
+    for emp_id, emp_username, full_name, department, position, is_active in employees:
+        status = "Aktif" if is_active else "Non-Aktif"
+        report += f"👤 {full_name}"
+        report += f" (@{emp_username})\n" if emp_username else "\n"
+        report += f"   🏢 {department or '-'} | 💼 {position or '-'} | 📊 {status}\n"
+        keyboard.append([InlineKeyboardButton(f"📊 Absensi {full_name}", callback_data=f"admin_emp_{emp_id}")])
+    
+    message_with_mention = format_message_with_mention(user, report)
+    await update.message.reply_text(message_with_mention, reply_markup=InlineKeyboardMarkup(keyboard))
+
+async def view_employee_attendance(query, employee_id):
+    """Melihat absensi 30 hari terakhir milik satu karyawan (admin only)"""
+    user = query.from_user
+    employee = db.get_employee(employee_id)
+    
+    if not employee:
+        message_with_mention = format_message_with_mention(user, "❌ Karyawan tidak ditemukan.")
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    today = datetime.now().date()
+    start_date = today - timedelta(days=30)
+    records = await db.reports.get_attendance_records(employee_id, start_date, today)
+    
+    report = f"📊 ABSENSI: {employee[2]}\n"
+    report += f"Periode: {start_date} sampai {today}\n"
+    report += "─" * 30 + "\n"
+    
+    if not records:
+        report += "Tidak ada data absensi.\n"
+    
+    for date_str, check_in, check_out, late, overtime, early_leave in records:
+        report += f"📅 {date_str}: 🟢 {check_in or '-'} 🔴 {check_out or 'Belum'}"
+        if late and late > 0:
+            report += f" ⏰ {late}m"
+        if overtime and overtime > 0:
+            report += f" 💪 {overtime}m"
+        if early_leave and early_leave > 0:
+            report += f" 🚪 {early_leave}m"
+        report += "\n"
+    
+    await query.edit_message_text(report, reply_markup=keyboards.admin_keyboard(user.id))
+
+async def export_data(query):
+    """Handler untuk export data (admin only)"""
+    user = query.from_user
+    username = user.username
+    # Simpan data ke file (contoh sederhana)
+    try:
+        today = datetime.now().date()
+        records = await db.reports.export_attendance_data(today, today)
+        
+        if not records:
+            message_with_mention = format_message_with_mention(user, "📊 Tidak ada data absensi hari ini untuk di-export.")
+            await query.edit_message_text(message_with_mention)
+            return
+        
+        # Format data untuk export
+        export_data = []
+        for record in records:
+            nama, date, check_in, check_out, late, overtime = record
+            export_data.append({
+                'nama': nama,
+                'tanggal': date,
+                'check_in': check_in,
+                'check_out': check_out,
+                'terlambat_menit': late,
+                'lembur_menit': overtime
+            })
+        
+        # Simpan ke file JSON
+        export_filename = f"{tenants.file_prefix()}export_absensi_{today}.json"
+        with open(export_filename, 'w', encoding='utf-8') as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        
+        message_with_mention = format_message_with_mention(user, 
+            f"✅ Export data berhasil!\n"
+            f"📁 File: {export_filename}\n"
+            f"📊 Total data: {len(export_data)} records\n\n"
+            f"File export telah disimpan di server."
+        )
+        
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.admin_keyboard(user.id)
+        )
+        
+    except Exception as e:
+        message_with_mention = format_message_with_mention(user, f"❌ Gagal melakukan export: {str(e)}")
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.admin_keyboard(user.id)
+        )
+
+async def owner_panel(query):
+    """Panel khusus owner"""
+    user = query.from_user
+    username = user.username
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    message_with_mention = format_message_with_mention(user, "👑 Administrator Panel\nPilih menu:")
+    await query.edit_message_text(
+        message_with_mention,
+        reply_markup=keyboards.owner_keyboard()
+    )
+
+async def owner_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Callback untuk menu owner"""
+    query = update.callback_query
+    await query.answer()
+    
+    user = query.from_user
+    username = user.username
+    
+    if not keyboards.has_admin_access(user.id):
+        notif_text = db.get_setting('notification_texts')
+        denied_msg = "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini."
+        
+        try:
+            notif_texts = ast.literal_eval(notif_text)
+            denied_msg = notif_texts.get('admin_access_denied', denied_msg)
+        except:
+            pass
+        
+        message_with_mention = format_message_with_mention(user, denied_msg)
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    action = query.data
+    
+    if action == "owner_stats":
+        await show_system_stats(query)
+    elif action == "owner_manage_admins":
+        await manage_admins(query)
+    elif action == "owner_reset":
+        await confirm_system_reset(query)
+    elif action == "owner_backup":
+        await backup_data(query)
+    elif action == "owner_back":
+        message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.admin_keyboard(user.id)
+        )
+
+async def show_system_stats(query):
+    """Menampilkan statistik sistem"""
+    user = query.from_user
+    username = user.username
+    
+    # Semua hitungan diambil dari satu snapshot di koneksi laporan
+    stats = await db.reports.get_system_stats()
+    total_employees = stats['total_employees']
+    active_employees = stats['active_employees']
+    today_attendance = stats['today_attendance']
+    total_breaks = stats['today_breaks']
+    total_attendance = stats['total_attendance']
+    total_breaks_all = stats['total_breaks']
+    
+    stats_text = f"""👤 {format_message_with_mention(user, '').split(chr(10))[0]}
+📈 **STATISTIK SISTEM** 📈
+
+👥 **Data Karyawan:**
+• Total Karyawan: {total_employees}
+• Karyawan Aktif: {active_employees}
+• Karyawan Non-Aktif: {total_employees - active_employees}
+
+📊 **Absensi Hari Ini:**
+• Total Absensi: {today_attendance}
+
+⏰ **Aktivitas Hari Ini:**
+• Total Istirahat: {total_breaks}
+
+💾 **Database:**
+• Total Absensi: {total_attendance} records
+• Total Istirahat: {total_breaks_all} records
+• Total Karyawan: {total_employees} records
+
+🔄 **Status Sistem:**
+• Database: ✅ Normal
+• Scheduler: ✅ Berjalan
+• Bot: ✅ Online"""
+    
+    await query.edit_message_text(stats_text, parse_mode='Markdown', reply_markup=keyboards.owner_keyboard())
+
+async def manage_admins(query):
+    """Kelola admin"""
+    user = query.from_user
+    username = user.username
+    
+    roles = db.get_roles()
+    owner_lines = []
+    admin_lines = []
+    
+    for role_user_id, role, role_username, full_name in roles:
+        name = escape_markdown(full_name or "-")
+        handle = f" (@{escape_markdown(role_username)})" if role_username else ""
+        line = f"• {name}{handle} - ID: `{role_user_id}`"
+        if role == 'owner':
+            owner_lines.append(line)
+        else:
+            admin_lines.append(line)
+    
+    owner_list = "\n".join(owner_lines) or "• -"
+    admin_list = "\n".join(admin_lines) or "• -"
+    
+    admin_text = f"""👤 {format_message_with_mention(user, '').split(chr(10))[0]}
+👥 **PENGELOLAAN ADMINISTRATOR**
+
+**Owner saat ini:**
+{owner_list}
+
+**Admin saat ini:**
+{admin_list}
+
+**Total Akses: {len(roles)} user**
+
+**Perintah (khusus owner):**
+`/tambah_admin @username` - Tambah admin
+`/tambah_owner @username` - Tambah owner
+`/hapus_admin @username` - Cabut akses admin/owner
+
+**Catatan:**
+- Bisa juga menggunakan user ID sebagai pengganti @username
+- User harus sudah pernah menekan /start
+- Perubahan langsung berlaku tanpa restart bot"""
+    
+    await query.edit_message_text(admin_text, parse_mode='Markdown', reply_markup=keyboards.owner_keyboard())
+
+def resolve_target_user(arg):
+    """Ubah argumen perintah (@username atau user ID) menjadi user_id"""
+    arg = arg.strip().lstrip('@')
+    if arg.isdigit():
+        return int(arg)
+    
+    user_ids = db.get_user_ids_by_usernames([arg])
+    return user_ids[0] if user_ids else None
+
+async def deny_owner_access(update: Update):
+    """Kirim pesan akses ditolak untuk perintah khusus owner"""
+    notif_text = db.get_setting('notification_texts')
+    denied_msg = config.NOTIFICATION_TEXTS['owner_access_denied']
+    
+    try:
+        notif_texts = ast.literal_eval(notif_text)
+        denied_msg = notif_texts.get('owner_access_denied', denied_msg)
+    except:
+        pass
+    
+    message_with_mention = format_message_with_mention(update.effective_user, denied_msg)
+    await update.message.reply_text(message_with_mention)
+
+async def grant_role(update: Update, context: ContextTypes.DEFAULT_TYPE, role):
+    """Memberi role admin/owner ke user (khusus owner)"""
+    user = update.effective_user
+    
+    if not keyboards.is_owner(user.id):
+        await deny_owner_access(update)
+        return
+    
+    if not context.args:
+        message = f"❌ Format: /tambah_{role} @username atau /tambah_{role} user_id"
+    else:
+        target_id = resolve_target_user(context.args[0])
+        if target_id is None:
+            message = "❌ User tidak ditemukan. Pastikan user sudah pernah menekan /start."
+        else:
+            db.set_role(target_id, role, granted_by=user.id)
+            message = f"✅ User {context.args[0]} sekarang menjadi {role}."
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(message_with_mention)
+
+async def add_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /tambah_admin"""
+    await grant_role(update, context, 'admin')
+
+async def add_owner_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /tambah_owner"""
+    await grant_role(update, context, 'owner')
+
+async def remove_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /hapus_admin (khusus owner)"""
+    user = update.effective_user
+    
+    if not keyboards.is_owner(user.id):
+        await deny_owner_access(update)
+        return
+    
+    if not context.args:
+        message = "❌ Format: /hapus_admin @username atau /hapus_admin user_id"
+    else:
+        target_id = resolve_target_user(context.args[0])
+        if target_id is None:
+            message = "❌ User tidak ditemukan."
+        elif target_id == user.id:
+            message = "❌ Anda tidak dapat mencabut akses Anda sendiri."
+        elif db.revoke_role(target_id, revoked_by=user.id):
+            message = f"✅ Akses admin/owner untuk {context.args[0]} telah dicabut."
+        else:
+            message = f"❌ {context.args[0]} bukan admin atau owner."
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(message_with_mention)
+
+async def monthly_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /rekap_bulanan [YYYY-MM] (khusus owner)"""
+    user = update.effective_user
+    
+    if not keyboards.is_owner(user.id):
+        await deny_owner_access(update)
+        return
+    
+    try:
+        if context.args:
+            period = datetime.strptime(context.args[0], "%Y-%m")
+        else:
+            period = datetime.now()
+    except ValueError:
+        message_with_mention = format_message_with_mention(user, "❌ Format: /rekap_bulanan YYYY-MM (contoh: /rekap_bulanan 2025-09)")
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    message_with_mention = format_message_with_mention(user, f"⏳ Membuat rekap bulanan {period.strftime('%Y-%m')}...")
+    await update.message.reply_text(message_with_mention)
+    
+    try:
+        # Dijalankan di proses terpisah (dengan process pool) agar bot tetap responsif
+        tenant_id = tenants.current_tenant_id()
+        output_dir = os.path.join(config.PAYROLL_OUTPUT_DIR, tenant_id) if tenant_id else None
+        summary_filename, total = await asyncio.to_thread(
+            payroll.run_monthly_report, db.db_name, period.year, period.month, output_dir
+        )
+    except Exception as e:
+        logger.error("Gagal membuat rekap bulanan: %s", e, exc_info=e)
+        message_with_mention = format_message_with_mention(user, f"❌ Gagal membuat rekap bulanan: {str(e)}")
+        await update.message.reply_text(message_with_mention)
+        return
+    
+    with open(summary_filename, 'rb') as f:
+        await update.message.reply_document(
+            f,
+            caption=f"✅ Rekap bulanan {period.strftime('%Y-%m')}: {total} karyawan\n"
+                    f"📁 File per karyawan tersimpan di server: {os.path.dirname(summary_filename)}"
+        )
+
+async def rebuild_attendance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /bangun_ulang_absensi (khusus owner)"""
+    user = update.effective_user
+    
+    if not keyboards.is_owner(user.id):
+        await deny_owner_access(update)
+        return
+    
+    # Rebuild bisa memakan waktu pada journal besar; jangan blokir event loop
+    replayed = await asyncio.to_thread(db.rebuild_from_journal)
+    presence_board.load(db.get_presence_today())
+    message_with_mention = format_message_with_mention(user,
+        f"✅ Data absensi & istirahat dibangun ulang dari journal.\n📊 Total event: {replayed}"
+    )
+    await update.message.reply_text(message_with_mention)
+
+async def confirm_system_reset(query):
+    """Konfirmasi reset sistem"""
+    user = query.from_user
+    username = user.username
+    
+    keyboard = [
+        [InlineKeyboardButton("❌ Batalkan", callback_data="owner_back")],
+        [InlineKeyboardButton("🔥 RESET SEMUA DATA", callback_data="owner_confirm_reset")]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    message_with_mention = format_message_with_mention(user, 
+        "⚠️ **PERINGATAN: RESET SISTEM** ⚠️\n\n"
+        "Anda akan menghapus SEMUA data:\n"
+        "• Data absensi\n• Data karyawan\n• Data istirahat\n• Semua pengaturan\n\n"
+        "Tindakan ini TIDAK DAPAT DIBATALKAN!\n"
+        "Apakah Anda yakin?"
+    )
+    
+    await query.edit_message_text(
+        message_with_mention,
+        reply_markup=reply_markup,
+        parse_mode='Markdown'
+    )
+
+async def backup_data(query):
+    """Backup data"""
+    user = query.from_user
+    username = user.username
+    
+    # Simpan data ke file (contoh sederhana)
+    try:
+        # Backup data employees, attendance dan breaks dari satu snapshot
+        tables = await db.reports.get_backup_data()
+        employees = tables['employees']
+        attendance = tables['attendance']
+        breaks = tables['breaks']
+        
+        # Buat data backup
+        backup_data = {
+            'timestamp': datetime.now().isoformat(),
+            'employees': employees,
+            'attendance': attendance,
+            'breaks': breaks,
+            'total_records': len(employees) + len(attendance) + len(breaks)
+        }
+        
+        # Simpan ke file
+        backup_filename = f"{tenants.file_prefix()}backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(backup_filename, 'w') as f:
+            json.dump(backup_data, f, indent=2)
+        
+        message_with_mention = format_message_with_mention(user,
+            f"✅ Backup berhasil!\n"
+            f"📁 File: {backup_filename}\n"
+            f"📊 Total data: {backup_data['total_records']} records\n\n"
+            f"File backup telah disimpan di server."
+        )
+        
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.owner_keyboard()
+        )
+        
+    except Exception as e:
+        message_with_mention = format_message_with_mention(user, f"❌ Gagal melakukan backup: {str(e)}")
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.owner_keyboard()
+        )
+
+async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Callback untuk pengaturan"""
+    query = update.callback_query
+    await query.answer()
+    
+    user = query.from_user
+    username = user.username
+    
+    if not keyboards.has_admin_access(user.id):
+        message_with_mention = format_message_with_mention(user, "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses pengaturan.")
+        await query.edit_message_text(message_with_mention)
+        return
+    
+    action = query.data
+    
+    if action == "set_work_start":
+        user_settings_state[user.id] = {'action': 'set_work_start'}
+        message_with_mention = format_message_with_mention(user, "🕐 Masukkan jam mulai kerja (format: HH:MM):\nContoh: 08:00")
+        await query.edit_message_text(message_with_mention)
+    elif action == "set_work_end":
+        user_settings_state[user.id] = {'action': 'set_work_end'}
+        message_with_mention = format_message_with_mention(user, "🕔 Masukkan jam selesai kerja (format: HH:MM):\nContoh: 17:00")
+        await query.edit_message_text(message_with_mention)
+    elif action == "set_break_times":
+        user_settings_state[user.id] = {'action': 'set_break_times'}
+        message_with_mention = format_message_with_mention(user, 
+            "⏱️ Masukkan durasi istirahat (format JSON):\n"
+            'Contoh: {"toilet": 15, "makan": 30, "merokok": 10, "sholat": 15, "lainnya": 20}'
+        )
+        await query.edit_message_text(message_with_mention)
+    elif action == "set_break_quotas":
+        user_settings_state[user.id] = {'action': 'set_break_quotas'}
+        message_with_mention = format_message_with_mention(user,
+            "🔢 Masukkan kuota harian per jenis istirahat (format JSON, jumlah kali per hari):\n"
+            'Contoh: {"merokok": 3, "toilet": 5}\n'
+            "Jenis yang tidak disebut tidak dibatasi. Kirim {} untuk menghapus semua kuota."
+        )
+        await query.edit_message_text(message_with_mention)
+    elif action == "set_notif_texts":
+        user_settings_state[user.id] = {'action': 'set_notif_texts'}
+        message_with_mention = format_message_with_mention(user,
+            "📝 Masukkan teks notifikasi (format JSON):\n"
+            'Contoh: {"welcome": "Selamat datang!", "checkin_late": "Anda terlambat {0} menit"}'
+        )
+        await query.edit_message_text(message_with_mention)
+    elif action == "settings_back":
+        message_with_mention = format_message_with_mention(user, "⚙️ Admin Panel\nPilih menu:")
+        await query.edit_message_text(
+            message_with_mention,
+            reply_markup=keyboards.admin_keyboard(user.id)
+        )
+
+async def handle_settings_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk input pengaturan"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    text = update.message.text
+    
+    if user_id not in user_settings_state:
+        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
+        await update.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.main_keyboard(user_id)
+        )
+        return
+    
+    action = user_settings_state[user_id]['action']
+    success = False
+    
+    try:
+        if action == "set_work_start":
+            # Validasi format waktu
+            if len(text) == 5 and text[2] == ':':
+                hours, minutes = text.split(':')
+                if hours.isdigit() and minutes.isdigit() and 0 <= int(hours) <= 23 and 0 <= int(minutes) <= 59:
+                    db.update_setting('work_start', text)
+                    success = True
+                    message = f"✅ Jam mulai kerja diubah menjadi: {text}"
+                else:
+                    message = "❌ Format waktu tidak valid. Gunakan HH:MM (contoh: 08:00)"
+            else:
+                message = "❌ Format tidak valid. Gunakan HH:MM (contoh: 08:00)"
+                
+        elif action == "set_work_end":
+            if len(text) == 5 and text[2] == ':':
+                hours, minutes = text.split(':')
+                if hours.isdigit() and minutes.isdigit() and 0 <= int(hours) <= 23 and 0 <= int(minutes) <= 59:
+                    db.update_setting('work_end', text)
+                    schedule_auto_close(tenants.current_tenant_id())
+                    success = True
+                    message = f"✅ Jam selesai kerja diubah menjadi: {text}"
+                else:
+                    message = "❌ Format waktu tidak valid. Gunakan HH:MM (contoh: 17:00)"
+            else:
+                message = "❌ Format tidak valid. Gunakan HH:MM (contoh: 17:00)"
+                
+        elif action == "set_break_times":
+            try:
+                # Validasi JSON
+                break_times = json.loads(text)
+                if isinstance(break_times, dict):
+                    db.update_setting('break_times', text)
+                    success = True
+                    message = "✅ Durasi istirahat berhasil diubah"
+                else:
+                    message = "❌ Format JSON tidak valid. Harus berupa object/dictionary"
+            except json.JSONDecodeError:
+                message = "❌ Format JSON tidak valid. Gunakan format yang benar"
+                
+        elif action == "set_break_quotas":
+            try:
+                break_quotas = json.loads(text)
+                if isinstance(break_quotas, dict) and all(
+                    isinstance(quota, int) and not isinstance(quota, bool) and quota >= 0
+                    for quota in break_quotas.values()
+                ):
+                    db.update_setting('break_quotas', json.dumps(break_quotas))
+                    success = True
+                    message = "✅ Kuota istirahat berhasil diubah"
+                else:
+                    message = "❌ Format JSON tidak valid. Harus berupa object dengan nilai bilangan bulat"
+            except json.JSONDecodeError:
+                message = "❌ Format JSON tidak valid. Gunakan format yang benar"
+                
+        elif action == "set_notif_texts":
+            try:
+                notif_texts = json.loads(text)
+                if isinstance(notif_texts, dict):
+                    db.update_setting('notification_texts', text)
+                    success = True
+                    message = "✅ Teks notifikasi berhasil diubah"
+                else:
+                    message = "❌ Format JSON tidak valid. Harus berupa object/dictionary"
+            except json.JSONDecodeError:
+                message = "❌ Format JSON tidak valid. Gunakan format yang benar"
+                
+        else:
+            message = "❌ Aksi tidak dikenali"
+            
+    except Exception as e:
+        message = f"❌ Error: {str(e)}"
+    
+    # Hapus state pengaturan
+    if user_id in user_settings_state:
+        del user_settings_state[user_id]
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(message_with_mention)
+    
+    if success:
+        # Kembali ke menu pengaturan
+        message_with_mention = format_message_with_mention(user, "⚙️ Pengaturan Sistem\nPilih yang ingin diubah:")
+        await update.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.settings_keyboard()
+        )
+    else:
+        # Kembali ke menu utama
+        message_with_mention = format_message_with_mention(user, "Silakan pilih menu:")
+        await update.message.reply_text(
+            message_with_mention,
+            reply_markup=keyboards.main_keyboard(user_id)
+        )
+
+async def handle_import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk file import karyawan (CSV/JSON) dari admin"""
+    user = update.effective_user
+    user_id = user.id
+    
+    state = user_settings_state.get(user_id)
+    if not state or state['action'] != 'import_employees' or not keyboards.has_admin_access(user_id):
+        return
+    
+    del user_settings_state[user_id]
+    document = update.message.document
+    
+    try:
+        file = await document.get_file()
+        content = await file.download_as_bytearray()
+        employees, skipped = utils.parse_employee_import(document.file_name or "", bytes(content))
+        imported = db.import_employees(employees)
+        message = f"✅ Import selesai!\n👥 Diproses: {imported} karyawan"
+        if skipped:
+            message += f"\n⚠️ Dilewati (user_id tidak valid): {skipped} baris"
+    except Exception as e:
+        logger.error("Gagal import karyawan: %s", e)
+        message = f"❌ Gagal import karyawan: {str(e)}"
+    
+    message_with_mention = format_message_with_mention(user, message)
+    await update.message.reply_text(
+        message_with_mention,
+        reply_markup=keyboards.admin_keyboard(user_id)
+    )
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk perintah /help"""
+    user = update.effective_user
+    user_id = user.id
+    username = user.username
+    
+    help_text = """🆘 **BANTUAN SISTEM ABSENSI** 🆘
+
+**Fitur Utama:**
+🟢 **Masuk Kerja** - Absensi saat datang kerja
+💼 **Pulang Kerja** - Absensi saat pulang kerja  
+☕ **Istirahat** - Mulai istirahat (toilet, makan, dll)
+✅ **Selesai Istirahat** - Akhiri istirahat
+📊 **Lihat Absensi** - Lihat riwayat absensi pribadi
+
+**Jenis Istirahat:**
+🚽 **Toilet** - Keperluan toilet (15 menit)
+🍽️ **Makan** - Istirahat makan (30 menit)  
+🚬 **Merokok** - Istirahat merokok (10 menit)
+🕌 **Sholat** - Istirahat sholat (15 menit)
+📋 **Lainnya** - Keperluan lainnya (20 menit)
+
+**Perintah:**
+/start - Memulai bot
+/help - Menampilkan bantuan ini
+/selesai_istirahat - Menyelesaikan istirahat
+
+**Admin/Owner:**
+⚙️ **Admin Panel** - Menu khusus administrator
+
+**Tips:**
+- Pastikan terkoneksi internet saat absensi
+- Gunakan tombol sesuai urutan aktivitas
+- Hubungi admin jika ada kendala"""
+    
+    message_with_mention = format_message_with_mention(user, help_text)
+    await update.message.reply_text(message_with_mention, parse_mode='Markdown')
+
+async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk error"""
+    logger.error("Error: %s", context.error, exc_info=context.error)
+    
+    if isinstance(update, Update) and update.effective_user:
+        user = update.effective_user
+        # Lewat outbox agar gangguan jaringan tidak memicu error baru di sini;
+        # jika Markdown ditolak, outbox mengirim ulang sebagai teks biasa
+        message_with_mention = format_message_with_mention(user, "❌ Terjadi kesalahan sistem. Silakan coba lagi atau hubungi admin.")
+        try:
+            db.enqueue_messages([(user.id, message_with_mention, f"error:{update.update_id}", 'Markdown')])
+            outbox_sender.wake()
+        except Exception as e:
+            logger.error("Gagal memasukkan pesan error untuk user %s ke outbox: %s", user.id, e, extra={'user_id': user.id})
+
+def build_application(token=None, request=None):
+    """Membuat Application beserta semua handler (dipakai main() dan replay.py)
+    
+    `request` dapat diisi objek BaseRequest lain, mis. FakeRequest saat replay.
+    config.TELEGRAM_BASE_URL mengarahkan bot ke server Bot API lain (fake_telegram.py).
+    """
+    token = token or config.BOT_TOKEN
+    
+    # Setup bot - FIX: Gunakan approach yang lebih kompatibel
+    try:
+        # Cara yang lebih kompatibel untuk berbagai versi
+        builder = Application.builder().token(token).post_init(post_init)
+        if config.TELEGRAM_BASE_URL:
+            base_url = config.TELEGRAM_BASE_URL.rstrip('/')
+            builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+        if request is not None:
+            builder = builder.request(request).get_updates_request(request)
+        if config.MULTI_TENANT:
+            # Database tenant yang dipinjam sebuah update dilepas setelah update selesai
+            builder = builder.concurrent_updates(tenants.TenantUpdateProcessor(1))
+        application = builder.build()
+    except Exception as e:
+        logger.error("Error creating application: %s", e)
+        # Fallback untuk versi yang lebih lama
+        from telegram.ext import Updater
+        updater = Updater(token=token, use_context=True)
+        application = updater.application
+    
+    # Perekam update (opsional) dijalankan paling awal agar semua update terekam
+    if recorder.recorder is not None:
+        application.add_handler(TypeHandler(Update, recorder.record_update), group=-2)
+    
+    # Pre-handler: tolak update duplikat & tombol beruntun sebelum handler lain
+    application.add_handler(TypeHandler(Update, middleware.guard_update), group=-1)
+    
+    # Add handlers
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("selesai_istirahat", end_break_command))
+    application.add_handler(CommandHandler("tambah_admin", add_admin_command))
+    application.add_handler(CommandHandler("tambah_owner", add_owner_command))
+    application.add_handler(CommandHandler("hapus_admin", remove_admin_command))
+    application.add_handler(CommandHandler("rekap_bulanan", monthly_report_command))
+    application.add_handler(CommandHandler("cari", search_employees_command))
+    application.add_handler(CommandHandler("kehadiran", presence_command))
+    application.add_handler(CommandHandler("laporan_departemen", department_report_command))
+    application.add_handler(CommandHandler("bangun_ulang_absensi", rebuild_attendance_command))
+    
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.Document.ALL, handle_import_document))
+    
+    # Callback handlers
+    application.add_handler(CallbackQueryHandler(break_callback, pattern="^break_"))
+    application.add_handler(CallbackQueryHandler(attendance_callback, pattern="^attendance_"))
+    application.add_handler(CallbackQueryHandler(admin_callback, pattern="^admin_"))
+    application.add_handler(CallbackQueryHandler(owner_callback, pattern="^owner_"))
+    application.add_handler(CallbackQueryHandler(settings_callback, pattern="^set_"))
+    application.add_handler(CallbackQueryHandler(admin_callback, pattern="^back_"))
+    
+    # Post-handler: catat lama pemrosesan setiap update
+    application.add_handler(TypeHandler(Update, middleware.log_update_done), group=1)
+    
+    # Error handler
+    application.add_error_handler(error_handler)
+    return application
+
+def main():
+    """Fungsi utama untuk menjalankan bot"""
+    application = build_application()
+    
+    # Start scheduler (job penutupan otomatis dan pemeriksaan anomali untuk setiap tenant)
+    for tenant_id in tenants.tenant_ids():
+        schedule_tenant_jobs(tenant_id)
+    if config.MULTI_TENANT:
+        # Tenant yang ditambahkan saat bot berjalan (python tenants.py tambah ...)
+        scheduler.add_job(
+            sync_tenant_jobs,
+            'interval',
+            minutes=config.TENANT_SYNC_MINUTES,
+            id="tenant_sync",
+            replace_existing=True
+        )
+    prune_at = datetime.strptime(config.OUTBOX_PRUNE_TIME, "%H:%M")
+    scheduler.add_job(
+        outbox_sender.prune,
+        'cron',
+        hour=prune_at.hour,
+        minute=prune_at.minute,
+        id="outbox_prune",
+        replace_existing=True
+    )
+    if config.DIGEST_ENABLED:
+        scheduler.add_job(
+            send_admin_digest,
+            'interval',
+            minutes=config.DIGEST_INTERVAL_MINUTES,
+            id="admin_digest",
+            replace_existing=True
+        )
+    if live_dashboard.enabled:
+        live_dashboard.attach()
+        scheduler.add_job(
+            refresh_dashboard,
+            'interval',
+            minutes=config.DASHBOARD_REFRESH_MINUTES,
+            id="dashboard_refresh",
+            replace_existing=True
+        )
+    scheduler.start()
+    
+    if config.WATCHDOG_ENABLED:
+        try:
+            health.start_health_server(config.HEALTH_HOST, config.HEALTH_PORT)
+        except OSError as e:
+            logger.error("Health check tidak bisa dijalankan di port %s: %s", config.HEALTH_PORT, e)
+    
+    # Jalankan bot
+    print("🤖 Bot absensi sedang berjalan...")
+    if config.TELEGRAM_BASE_URL:
+        print(f"Memakai server Bot API: {config.TELEGRAM_BASE_URL}")
+    print("Tekan Ctrl+C untuk menghentikan")
+    
+    try:
+        application.run_polling()
+    except Exception as e:
+        logger.error("Error running bot: %s", e)
+
+if __name__ == "__main__":
+    # Setup logging (non-blocking: ditulis oleh thread listener). Tidak dijalankan saat
+    # modul ini di-import ulang sebagai __mp_main__ oleh worker spawn rekap bulanan.
+    logging_setup.setup_logging(logging.INFO)
+    main()
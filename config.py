@@ -1,43 +1,130 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Bot Token dari @BotFather
-BOT_TOKEN = os.getenv('BOT_TOKEN', '8145711855:AAFTWzhL-OYKX7zd2IBZaiEbzPoHvFIqaKU')
-
-# Daftar Admin berdasarkan username (tanpa @)
-ADMIN_USERNAMES = ['gasomset', 'bananaboat99']  # Ganti dengan username admin
-
-# Daftar Owner berdasarkan username (tanpa @) - memiliki akses penuh
-OWNER_USERNAMES = ['bananaboat99', 'ceo_company']  # Ganti dengan username owner
-
-# Konfigurasi default
-DEFAULT_WORK_START = "08:00"
-DEFAULT_WORK_END = "17:00"
-TOLERANCE_LATE = 15
-TOLERANCE_EARLY = 15
-
-ALLOWED_BREAK_TYPES = {
-    "toilet": 15,
-    "makan": 60,
-    "merokok": 10,
-    "sholat": 15,
-    "lainnya": 30
-}
-
-# Notifikasi default
-NOTIFICATION_TEXTS = {
-    "welcome": "Selamat datang di sistem absensi!",
-    "checkin_success": "Absensi masuk berhasil dicatat.",
-    "checkin_late": "Anda terlambat {} menit.",
-    "break_start": "Istirahat {} dimulai. Durasi: {} menit.",
-    "break_end": "Istirahat selesai. Durasi: {} menit {} detik.",
-    "break_overdue": "Waktu istirahat sudah habis!",
-    "checkout_success": "Absensi pulang berhasil dicatat.",
-    "checkout_early": "Anda pulang cepat {} menit.",
-    "overtime": "Lembur: {} menit.",
-    "action_blocked": "⛔ Anda belum bisa melakukan aktivitas lainnya sebelum menyelesaikan istirahat yang sedang berlangsung.",
-    "admin_access_denied": "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini.",
-    "owner_access_denied": "❌ Akses ditolak. Hanya owner yang dapat mengakses menu ini."
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bot Token dari @BotFather
+BOT_TOKEN = os.getenv('BOT_TOKEN', '8145711855:AAFTWzhL-OYKX7zd2IBZaiEbzPoHvFIqaKU')
+
+# Alamat server Bot API; isi mis. http://127.0.0.1:8082 untuk memakai fake_telegram.py
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL')  # None = api.telegram.org
+
+# Daftar Admin berdasarkan username (tanpa @)
+ADMIN_USERNAMES = ['gasomset', 'bananaboat99']  # Ganti dengan username admin
+
+# Daftar Owner berdasarkan username (tanpa @) - memiliki akses penuh
+OWNER_USERNAMES = ['bananaboat99', 'ceo_company']  # Ganti dengan username owner
+
+# Mode multi-tenant: satu proses melayani banyak perusahaan, masing-masing dengan
+# file database sendiri (kelola dengan `python tenants.py`)
+MULTI_TENANT = os.getenv('MULTI_TENANT', '0') == '1'
+TENANT_REGISTRY_DB = "tenants.db"
+TENANT_DB_DIR = "tenants"
+TENANT_POOL_SIZE = 32  # jumlah maksimum database tenant yang terbuka bersamaan
+TENANT_SYNC_MINUTES = 5  # interval pengecekan tenant baru/nonaktif untuk penjadwalan job per tenant
+
+# Konfigurasi default
+DEFAULT_WORK_START = "08:00"
+DEFAULT_WORK_END = "17:00"
+TOLERANCE_LATE = 15
+TOLERANCE_EARLY = 15
+
+# Penutupan otomatis absensi & istirahat yang lupa diselesaikan
+AUTO_CLOSE_DELAY_MINUTES = 120  # dijalankan sekian menit setelah jam selesai kerja
+
+# Pengiriman pesan massal (batas rate limit Telegram ~30 pesan/detik)
+BATCH_SEND_SIZE = 25
+
+# Pemeriksaan anomali malam hari (hanya data baru sejak pemeriksaan terakhir)
+ANOMALY_SCAN_ENABLED = True
+ANOMALY_SCAN_TIME = "23:30"
+ANOMALY_MIN_WORK_MINUTES = 120  # pulang kurang dari sekian menit setelah masuk
+# Masuk lebih dari sekian menit sebelum atau sesudah jam mulai kerja (settings work_start)
+# dianggap tidak wajar; rentangnya boleh melewati tengah malam (shift malam)
+ANOMALY_CHECK_IN_MARGIN_MINUTES = 180
+ANOMALY_OVERDUE_BREAK_MINUTES = 5  # istirahat lewat waktu jika melebihi jadwal sekian menit
+ANOMALY_OVERDUE_BREAKS_PER_DAY = 3  # jumlah istirahat lewat waktu per hari yang dilaporkan
+
+# Outbox pesan keluar: disimpan di database dan dikirim ulang dengan backoff jika gagal
+OUTBOX_POLL_SECONDS = 5  # jeda maksimum antar pemeriksaan jadwal (hanya tenant yang jatuh tempo dibuka)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8  # setelah itu pesan ditandai dead
+OUTBOX_BACKOFF_BASE_SECONDS = 5
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_RETENTION_DAYS = 7  # pesan terkirim dihapus setelah sekian hari
+OUTBOX_PRUNE_TIME = "03:00"  # job harian penghapusan pesan terkirim yang lama
+
+# Ringkasan keterlambatan/pulang cepat/istirahat lewat waktu untuk admin
+DIGEST_ENABLED = True
+DIGEST_INTERVAL_MINUTES = 60
+
+# Dashboard live: pesan yang di-pin di chat admin dan diperbarui otomatis
+DASHBOARD_CHAT_ID = os.getenv('DASHBOARD_CHAT_ID')  # None = dashboard nonaktif
+DASHBOARD_MIN_INTERVAL_SECONDS = 5  # jarak minimum antar edit pesan
+DASHBOARD_REFRESH_MINUTES = 1  # cek ulang berkala (istirahat lewat waktu)
+
+# Watchdog event loop & endpoint health check untuk process supervisor
+WATCHDOG_ENABLED = True
+WATCHDOG_INTERVAL_SECONDS = 0.5
+WATCHDOG_LAG_THRESHOLD_SECONDS = 1.0  # lag di atas ini dicatat beserta stack trace
+HEALTH_STALL_SECONDS = 10  # /healthz gagal jika event loop macet lebih lama dari ini
+HEALTH_HOST = "127.0.0.1"
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', '8081'))
+
+# Logging: ditulis lewat antrean oleh thread terpisah, file berformat JSON per baris
+LOG_FILE = "logs/bot.log"  # None = hanya ke konsol
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_SAMPLED_LOGGERS = ("httpx", "apscheduler", "middleware")  # log INFO logger ini diambil sebagian
+LOG_SAMPLE_RATE = 0.1
+SLOW_UPDATE_MS = 1000  # update yang lebih lama dari ini selalu dicatat sebagai warning
+
+# Perekaman update untuk replay.py (file .jsonl.gz), None = tidak merekam
+RECORD_UPDATES_FILE = os.getenv('RECORD_UPDATES')
+
+# Perlindungan update ganda & tombol yang ditekan beruntun
+DEBOUNCE_SECONDS = 2
+DEDUP_CACHE_SIZE = 10000
+
+# Rate limit per user (token bucket) dan mode overload global
+RATE_LIMIT_BURST = 5  # jumlah aksi beruntun yang diizinkan per user
+RATE_LIMIT_PER_SECOND = 1  # pengisian token per user per detik
+GLOBAL_RATE_LIMIT_BURST = 100
+GLOBAL_RATE_LIMIT_PER_SECOND = 30
+OVERLOAD_COOLDOWN_SECONDS = 10  # lama mode overload setelah kapasitas global habis
+
+# Jumlah worker thread (koneksi read-only) untuk query laporan admin
+REPORT_WORKERS = 2
+
+# Rekap bulanan (timesheet) semua karyawan
+PAYROLL_OUTPUT_DIR = "reports"
+PAYROLL_WORKERS = None  # None = sesuai jumlah CPU
+
+ALLOWED_BREAK_TYPES = {
+    "toilet": 15,
+    "makan": 60,
+    "merokok": 10,
+    "sholat": 15,
+    "lainnya": 30
+}
+
+# Kuota harian (jumlah kali per hari) per jenis istirahat; jenis yang tidak disebut tidak dibatasi
+# Contoh: {"merokok": 3, "toilet": 5}
+BREAK_QUOTAS = {}
+
+# Notifikasi default
+NOTIFICATION_TEXTS = {
+    "welcome": "Selamat datang di sistem absensi!",
+    "checkin_success": "Absensi masuk berhasil dicatat.",
+    "checkin_late": "Anda terlambat {} menit.",
+    "break_start": "Istirahat {} dimulai. Durasi: {} menit.",
+    "break_end": "Istirahat selesai. Durasi: {} menit {} detik.",
+    "break_overdue": "Waktu istirahat sudah habis!",
+    "checkout_success": "Absensi pulang berhasil dicatat.",
+    "checkout_early": "Anda pulang cepat {} menit.",
+    "overtime": "Lembur: {} menit.",
+    "action_blocked": "⛔ Anda belum bisa melakukan aktivitas lainnya sebelum menyelesaikan istirahat yang sedang berlangsung.",
+    "admin_access_denied": "❌ Akses ditolak. Hanya admin dan owner yang dapat mengakses menu ini.",
+    "owner_access_denied": "❌ Akses ditolak. Hanya owner yang dapat mengakses menu ini.",
+    "auto_closed": "⚠️ Absensi/istirahat Anda yang belum diselesaikan telah ditutup otomatis oleh sistem."
 }
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from telegram.error import BadRequest, TelegramError
+
+import config
+import database
+from presence import presence_board
+
+logger = logging.getLogger(__name__)
+
+db = database.db
+
+MAX_MESSAGE_LENGTH = 4000
+
+class LiveDashboard:
+    """Pesan dashboard yang di-pin di chat admin dan diedit saat kehadiran berubah
+
+    Perubahan digabung: paling banyak satu edit per `min_interval` detik, dan edit
+    dilewati jika isi dashboard tidak berubah.
+    """
+
+    def __init__(self, chat_id, min_interval):
+        # Mode multi-tenant belum didukung: satu dashboard hanya untuk satu perusahaan
+        self.chat_id = int(chat_id) if chat_id and not config.MULTI_TENANT else None
+        self.min_interval = min_interval
+        self.bot = None
+        self.message_id = None
+        self.last_body = None
+        self.last_edit = 0
+        self.dirty = False
+        self.pending = None
+
+    @property
+    def enabled(self):
+        return self.chat_id is not None
+
+    def attach(self):
+        """Dengarkan perubahan papan kehadiran (dipanggil dari main(); papan dimuat dari database)"""
+        if self.enabled:
+            presence_board.listeners.append(self.mark_dirty)
+
+    def start(self, bot):
+        """Aktifkan dashboard setelah bot siap (dipanggil dari event loop)"""
+        if not self.enabled:
+            return
+        self.bot = bot
+        message_id = db.get_setting('dashboard_message_id')
+        self.message_id = int(message_id) if message_id else None
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Tandai dashboard perlu diperbarui; edit dijadwalkan paling cepat setelah jeda minimum"""
+        if not self.enabled:
+            return
+        self.dirty = True
+        if self.bot is None or (self.pending and not self.pending.done()):
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # belum ada event loop; diperbarui saat start()
+        self.pending = loop.create_task(self.flush())
+
+    def render(self, now):
+        body = presence_board.format_body(now)
+        if len(body) > MAX_MESSAGE_LENGTH:
+            body = body[:MAX_MESSAGE_LENGTH] + "\n..."
+        return body
+
+    async def flush(self):
+        """Tunggu jeda minimum lalu kirim satu edit untuk semua perubahan yang terkumpul"""
+        delay = self.last_edit + self.min_interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self.dirty = False
+        now = datetime.now()
+        body = self.render(now)
+        if body == self.last_body:
+            return
+
+        text = f"📌 DASHBOARD ABSENSI\nDiperbarui: {now.strftime('%H:%M:%S')}\n{body}"
+        self.last_edit = time.monotonic()
+        try:
+            if self.message_id:
+                await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            else:
+                await self.create_message(text)
+            self.last_body = body
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                self.last_body = body
+            else:
+                # Pesan lama dihapus/tidak bisa diedit: buat pesan dashboard baru
+                logger.warning("Dashboard tidak bisa diedit (%s), membuat pesan baru", e)
+                self.message_id = None
+                self.dirty = True
+        except TelegramError as e:
+            logger.error("Gagal memperbarui dashboard: %s", e)
+            self.dirty = True
+
+        if self.dirty:
+            self.pending = asyncio.get_running_loop().create_task(self.flush())
+
+    async def create_message(self, text):
+        message = await self.bot.send_message(self.chat_id, text)
+        self.message_id = message.message_id
+        db.update_setting('dashboard_message_id', str(message.message_id), "ID pesan dashboard live")
+        try:
+            await self.bot.pin_chat_message(self.chat_id, message.message_id, disable_notification=True)
+        except TelegramError as e:
+            logger.warning("Dashboard tidak bisa di-pin: %s", e)
+
+# Instance global dashboard, diperbarui setiap papan kehadiran berubah (setelah attach())
+live_dashboard = LiveDashboard(config.DASHBOARD_CHAT_ID, config.DASHBOARD_MIN_INTERVAL_SECONDS)
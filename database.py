@@ -1,399 +1,1412 @@
-import sqlite3
-from datetime import datetime, date
-import config
-import ast
-
-class Database:
-    def __init__(self, db_name='absensi.db'):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
-        self.create_tables()
-        self.init_settings()
-    
-    def create_tables(self):
-        # Tabel karyawan
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                full_name TEXT,
-                department TEXT,
-                position TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabel absensi
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                date DATE,
-                check_in TIME,
-                check_out TIME,
-                status TEXT DEFAULT 'normal',
-                overtime_minutes INTEGER DEFAULT 0,
-                late_minutes INTEGER DEFAULT 0,
-                early_leave_minutes INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES employees (user_id),
-                UNIQUE(user_id, date)  -- Tambahkan constraint unik
-            )
-        ''')
-        
-        # Tabel istirahat
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS breaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                attendance_id INTEGER,
-                break_type TEXT,
-                start_time TIMESTAMP,
-                end_time TIMESTAMP,
-                scheduled_duration INTEGER,
-                actual_duration INTEGER,
-                is_approved INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES employees (user_id),
-                FOREIGN KEY (attendance_id) REFERENCES attendance (id)
-            )
-        ''')
-        
-        # Tabel pengaturan
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                description TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
-    
-    def init_settings(self):
-        """Inisialisasi settings default"""
-        default_settings = {
-            'work_start': config.DEFAULT_WORK_START,
-            'work_end': config.DEFAULT_WORK_END,
-            'break_times': str(config.ALLOWED_BREAK_TYPES),
-            'notification_texts': str(config.NOTIFICATION_TEXTS)
-        }
-        
-        for key, value in default_settings.items():
-            self.conn.execute('''
-                INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
-            ''', (key, value))
-        self.conn.commit()
-    
-    def get_setting(self, key):
-        """Mengambil nilai setting berdasarkan key"""
-        cursor = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        result = cursor.fetchone()
-        return result[0] if result else None
-    
-    def update_setting(self, key, value, description=""):
-        """Memperbarui setting"""
-        self.conn.execute('''
-            INSERT OR REPLACE INTO settings (key, value, description, updated_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (key, value, description))
-        self.conn.commit()
-    
-    def add_employee(self, user_id, username, full_name, department="", position=""):
-        """Menambah atau memperbarui data karyawan"""
-        self.conn.execute('''
-            INSERT OR REPLACE INTO employees (user_id, username, full_name, department, position)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, username, full_name, department, position))
-        self.conn.commit()
-    
-    def check_in(self, user_id, check_in_time):
-        """Mencatat absensi masuk"""
-        today = date.today()
-        
-        # Cek apakah sudah check in hari ini
-        cursor = self.conn.execute('''
-            SELECT id, check_in FROM attendance 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today))
-        
-        existing = cursor.fetchone()
-        if existing:
-            if existing[1]:  # Jika sudah check in
-                return False, "❌ Anda sudah melakukan absensi masuk hari ini."
-            else:
-                # Update check in yang sudah ada
-                self.conn.execute('''
-                    UPDATE attendance SET check_in = ? WHERE id = ?
-                ''', (check_in_time, existing[0]))
-                self.conn.commit()
-                return True, f"✅ Absensi masuk berhasil!\n⏰ Waktu: {check_in_time}"
-        
-        # Insert baru
-        self.conn.execute('''
-            INSERT INTO attendance (user_id, date, check_in, status)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, today, check_in_time, 'normal'))
-        self.conn.commit()
-        
-        return True, f"✅ Absensi masuk berhasil!\n⏰ Waktu: {check_in_time}"
-    
-    def check_out(self, user_id, check_out_time):
-        """Mencatat absensi pulang"""
-        today = date.today()
-        
-        # Cek apakah sudah check out hari ini
-        cursor = self.conn.execute('''
-            SELECT id, check_in, check_out FROM attendance 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today))
-        
-        record = cursor.fetchone()
-        if not record:
-            return False, "❌ Anda harus check in terlebih dahulu sebelum check out."
-        
-        att_id, check_in, existing_check_out = record
-        
-        if existing_check_out:
-            return False, "❌ Anda sudah melakukan absensi pulang hari ini."
-        
-        if not check_in:
-            return False, "❌ Anda harus check in terlebih dahulu sebelum check out."
-        
-        # Update check out
-        self.conn.execute('''
-            UPDATE attendance SET check_out = ? WHERE id = ?
-        ''', (check_out_time, att_id))
-        self.conn.commit()
-        
-        return True, f"✅ Absensi pulang berhasil!\n⏰ Waktu: {check_out_time}"
-    
-    def start_break(self, user_id, break_type, start_time):
-        """Memulai istirahat"""
-        today = date.today()
-        
-        # Cek apakah user sudah check in hari ini
-        cursor = self.conn.execute('''
-            SELECT id FROM attendance 
-            WHERE user_id = ? AND date = ? AND check_in IS NOT NULL
-        ''', (user_id, today))
-        
-        record = cursor.fetchone()
-        if not record:
-            return False, "❌ Anda harus check in terlebih dahulu sebelum istirahat."
-        
-        att_id = record[0]
-        
-        # Cek apakah sudah ada istirahat yang aktif
-        active_break = self.get_user_active_break(user_id)
-        if active_break:
-            return False, "❌ Anda masih dalam istirahat yang aktif. Selesaikan terlebih dahulu."
-        
-        # Dapatkan durasi istirahat dari settings
-        break_times_setting = self.get_setting('break_times')
-        scheduled_duration = 30  # default
-        
-        try:
-            if break_times_setting:
-                break_times = ast.literal_eval(break_times_setting)
-                scheduled_duration = break_times.get(break_type, 30)
-            else:
-                # Fallback ke config
-                scheduled_duration = config.ALLOWED_BREAK_TYPES.get(break_type, 30)
-        except:
-            scheduled_duration = config.ALLOWED_BREAK_TYPES.get(break_type, 30)
-        
-        # Insert break record
-        self.conn.execute('''
-            INSERT INTO breaks (user_id, attendance_id, break_type, start_time, scheduled_duration)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, att_id, break_type, start_time, scheduled_duration))
-        self.conn.commit()
-        
-        return True, "Istirahat dimulai"
-    
-    def end_break(self, user_id, end_time):
-        """Mengakhiri istirahat"""
-        # Cari break yang masih aktif
-        cursor = self.conn.execute('''
-            SELECT id, start_time, break_type FROM breaks 
-            WHERE user_id = ? AND end_time IS NULL 
-            ORDER BY start_time DESC LIMIT 1
-        ''', (user_id,))
-        
-        record = cursor.fetchone()
-        if not record:
-            return False, "❌ Tidak ada istirahat yang aktif."
-        
-        break_id, start_time, break_type = record
-        
-        # Hitung durasi aktual
-        start_dt = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
-        end_dt = datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S')
-        actual_duration = (end_dt - start_dt).total_seconds() / 60  # dalam menit
-        
-        # Update break record
-        self.conn.execute('''
-            UPDATE breaks SET end_time = ?, actual_duration = ? 
-            WHERE id = ?
-        ''', (end_time, actual_duration, break_id))
-        self.conn.commit()
-        
-        return True, "Istirahat selesai"
-    
-    def get_user_active_break(self, user_id):
-        """Cek apakah user sedang dalam istirahat"""
-        cursor = self.conn.execute('''
-            SELECT id, break_type, start_time FROM breaks 
-            WHERE user_id = ? AND end_time IS NULL
-        ''', (user_id,))
-        return cursor.fetchone()
-    
-    def get_today_breaks(self, user_id):
-        """Ambil semua istirahat hari ini untuk user tertentu"""
-        today = date.today()
-        cursor = self.conn.execute('''
-            SELECT break_type, start_time, end_time 
-            FROM breaks 
-            WHERE user_id = ? AND DATE(start_time) = ?
-            ORDER BY start_time
-        ''', (user_id, today))
-        return cursor.fetchall()
-    
-    def get_today_attendance(self, user_id):
-        """Ambil data absensi hari ini untuk user tertentu"""
-        today = date.today()
-        cursor = self.conn.execute('''
-            SELECT date, check_in, check_out, status 
-            FROM attendance 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today))
-        return cursor.fetchone()
-    
-    def get_attendance_records(self, user_id, start_date, end_date):
-        """Ambil data absensi dalam rentang tanggal"""
-        cursor = self.conn.execute('''
-            SELECT date, check_in, check_out, late_minutes, overtime_minutes, early_leave_minutes 
-            FROM attendance 
-            WHERE user_id = ? AND date BETWEEN ? AND ?
-            ORDER BY date DESC
-        ''', (user_id, start_date, end_date))
-        return cursor.fetchall()
-    
-    def get_all_employees(self):
-        """Ambil semua data karyawan"""
-        cursor = self.conn.execute('''
-            SELECT user_id, username, full_name, department, position, is_active
-            FROM employees
-            ORDER BY full_name
-        ''')
-        return cursor.fetchall()
-    
-    def get_today_attendance_all(self):
-        """Ambil semua absensi hari ini (untuk admin)"""
-        today = date.today()
-        cursor = self.conn.execute('''
-            SELECT e.full_name, a.check_in, a.check_out, a.status, a.late_minutes, a.overtime_minutes
-            FROM attendance a
-            JOIN employees e ON a.user_id = e.user_id
-            WHERE a.date = ?
-            ORDER BY e.full_name
-        ''', (today,))
-        return cursor.fetchall()
-    
-    def get_employee_by_username(self, username):
-        """Cari karyawan berdasarkan username"""
-        cursor = self.conn.execute('''
-            SELECT user_id, username, full_name, department, position, is_active
-            FROM employees
-            WHERE username = ?
-        ''', (username,))
-        return cursor.fetchone()
-    
-    def update_employee(self, user_id, department=None, position=None, is_active=None):
-        """Update data karyawan"""
-        query = 'UPDATE employees SET '
-        params = []
-        
-        if department is not None:
-            query += 'department = ?, '
-            params.append(department)
-        if position is not None:
-            query += 'position = ?, '
-            params.append(position)
-        if is_active is not None:
-            query += 'is_active = ?, '
-            params.append(is_active)
-        
-        # Hapus koma terakhir dan tambahkan WHERE clause
-        query = query.rstrip(', ') + ' WHERE user_id = ?'
-        params.append(user_id)
-        
-        self.conn.execute(query, params)
-        self.conn.commit()
-    
-    def delete_employee(self, user_id):
-        """Hapus karyawan (soft delete)"""
-        self.conn.execute('''
-            UPDATE employees SET is_active = 0 WHERE user_id = ?
-        ''', (user_id,))
-        self.conn.commit()
-    
-    def get_system_stats(self):
-        """Ambil statistik sistem"""
-        stats = {}
-        
-        # Total karyawan
-        cursor = self.conn.execute('SELECT COUNT(*) FROM employees')
-        stats['total_employees'] = cursor.fetchone()[0]
-        
-        # Karyawan aktif
-        cursor = self.conn.execute('SELECT COUNT(*) FROM employees WHERE is_active = 1')
-        stats['active_employees'] = cursor.fetchone()[0]
-        
-        # Absensi hari ini
-        today = date.today()
-        cursor = self.conn.execute('SELECT COUNT(*) FROM attendance WHERE date = ?', (today,))
-        stats['today_attendance'] = cursor.fetchone()[0]
-        
-        # Total absensi
-        cursor = self.conn.execute('SELECT COUNT(*) FROM attendance')
-        stats['total_attendance'] = cursor.fetchone()[0]
-        
-        # Istirahat hari ini
-        cursor = self.conn.execute('SELECT COUNT(*) FROM breaks WHERE DATE(start_time) = ?', (today,))
-        stats['today_breaks'] = cursor.fetchone()[0]
-        
-        # Total istirahat
-        cursor = self.conn.execute('SELECT COUNT(*) FROM breaks')
-        stats['total_breaks'] = cursor.fetchone()[0]
-        
-        return stats
-    
-    def export_attendance_data(self, start_date, end_date):
-        """Export data absensi untuk periode tertentu"""
-        cursor = self.conn.execute('''
-            SELECT e.full_name, a.date, a.check_in, a.check_out, a.late_minutes, a.overtime_minutes
-            FROM attendance a
-            JOIN employees e ON a.user_id = e.user_id
-            WHERE a.date BETWEEN ? AND ?
-            ORDER BY a.date, e.full_name
-        ''', (start_date, end_date))
-        
-        return cursor.fetchall()
-    
-    def reset_database(self):
-        """Reset semua data (hati-hati!)"""
-        # Hapus semua data tapi pertahankan struktur tabel
-        self.conn.execute('DELETE FROM breaks')
-        self.conn.execute('DELETE FROM attendance')
-        self.conn.execute('DELETE FROM employees')
-        self.conn.execute('DELETE FROM settings')
-        
-        # Re-initialize settings
-        self.init_settings()
-        self.conn.commit()
-
-# Inisialisasi database
-db = Database()
\ No newline at end of file
+import sqlite3
+import asyncio
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+import config
+import ast
+
+# Database tenant yang sedang aktif (mode multi-tenant), diisi oleh tenants.use_tenant()
+current_db = contextvars.ContextVar('current_db', default=None)
+
+class Database:
+    def __init__(self, db_name='absensi.db', config_roles=True):
+        self.db_name = db_name
+        # Role dari config.OWNER_USERNAMES/ADMIN_USERNAMES hanya untuk database default;
+        # owner database tenant diberikan lewat tenants.py saat tenant dibuat
+        self.config_roles = config_roles
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        # WAL: pembaca (laporan) tidak memblokir penulis (absensi) dan sebaliknya
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.reports = ReportingPool(db_name, config.REPORT_WORKERS)
+        self.settings_cache = {}
+        self.create_tables()
+        self.migrate_tables()
+        self.create_search_index()
+        self.init_settings()
+        self.init_roles()
+    
+    def create_tables(self):
+        # Tabel karyawan
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS employees (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                full_name TEXT,
+                department TEXT,
+                position TEXT,
+                is_active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Tabel absensi
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS attendance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                date DATE,
+                check_in TIME,
+                check_out TIME,
+                status TEXT DEFAULT 'normal',
+                overtime_minutes INTEGER DEFAULT 0,
+                late_minutes INTEGER DEFAULT 0,
+                early_leave_minutes INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES employees (user_id),
+                UNIQUE(user_id, date)  -- Tambahkan constraint unik
+            )
+        ''')
+        
+        # Tabel istirahat
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS breaks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                attendance_id INTEGER,
+                break_type TEXT,
+                start_time TIMESTAMP,
+                end_time TIMESTAMP,
+                scheduled_duration INTEGER,
+                actual_duration INTEGER,
+                is_approved INTEGER DEFAULT 1,
+                status TEXT DEFAULT 'normal',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES employees (user_id),
+                FOREIGN KEY (attendance_id) REFERENCES attendance (id)
+            )
+        ''')
+        
+        # Index laporan per tanggal/rentang tanggal
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)')
+        # Istirahat satu user pada satu hari (pemeriksaan anomali membaca ulang hari penuh)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_breaks_user_start ON breaks (user_id, start_time)')
+        
+        # Index pencarian username (tidak case-sensitive)
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_employees_username
+            ON employees (username COLLATE NOCASE)
+        ''')
+        
+        # Tabel role (admin/owner) berdasarkan Telegram user_id
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS roles (
+                user_id INTEGER PRIMARY KEY,
+                role TEXT NOT NULL,
+                is_active INTEGER DEFAULT 1,
+                granted_by INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Journal event absensi (append-only). Ditulis bersama proyeksinya (attendance & breaks)
+        # dalam satu transaksi, bukan satu-satunya tulisan; lihat journal_event()
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                event_type TEXT NOT NULL,
+                event_time TIMESTAMP NOT NULL,
+                data TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Penghitung istirahat per user, per hari, per jenis (diperbarui saat istirahat selesai)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS break_counters (
+                user_id INTEGER NOT NULL,
+                date DATE NOT NULL,
+                break_type TEXT NOT NULL,
+                count INTEGER DEFAULT 0,
+                minutes REAL DEFAULT 0,
+                PRIMARY KEY (user_id, date, break_type)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_break_counters_date ON break_counters (date)')
+        
+        # Outbox pesan keluar: dikirim oleh OutboxSender, dicoba ulang sampai berhasil atau dead
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                parse_mode TEXT,
+                dedup_key TEXT UNIQUE,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL,
+                last_error TEXT,
+                created_at TIMESTAMP NOT NULL,
+                sent_at TIMESTAMP
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (next_attempt_at) WHERE status = 'pending'
+        ''')
+        
+        # Temuan pemeriksaan anomali malam hari (satu temuan per aturan, user dan tanggal)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS anomaly_findings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rule TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                date DATE NOT NULL,
+                detail TEXT,
+                source_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (rule, user_id, date)
+            )
+        ''')
+        
+        # Tabel pengaturan
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                description TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        self.conn.commit()
+    
+    def migrate_tables(self):
+        """Menambahkan kolom baru pada database versi lama"""
+        break_columns = [row[1] for row in self.conn.execute('PRAGMA table_info(breaks)')]
+        if 'status' not in break_columns:
+            self.conn.execute("ALTER TABLE breaks ADD COLUMN status TEXT DEFAULT 'normal'")
+        
+        # Database lama belum punya UNIQUE(user_id, date); dibutuhkan untuk upsert absensi.
+        # Jika ada duplikat (race lama), pertahankan baris pertama.
+        has_unique = self.conn.execute('''
+            SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attendance'
+            AND (name = 'idx_attendance_user_date' OR name LIKE 'sqlite_autoindex_attendance_%')
+        ''').fetchone()
+        if not has_unique:
+            self.conn.execute('''
+                DELETE FROM attendance
+                WHERE id NOT IN (SELECT MIN(id) FROM attendance GROUP BY user_id, date)
+            ''')
+            self.conn.execute('CREATE UNIQUE INDEX idx_attendance_user_date ON attendance (user_id, date)')
+        
+        # Isi journal dari data lama agar attendance/breaks bisa dibangun ulang dari events
+        has_events = self.conn.execute('SELECT 1 FROM events LIMIT 1').fetchone()
+        has_attendance = self.conn.execute('SELECT 1 FROM attendance LIMIT 1').fetchone()
+        if not has_events and has_attendance:
+            self.backfill_events()
+        
+        # Maksimal satu istirahat aktif per user. Istirahat lama yang masih terbuka padahal
+        # sudah ada istirahat sesudahnya ditutup saat istirahat berikutnya dimulai, sama seperti
+        # projector saat rebuild (karena itu dijalankan setelah backfill journal).
+        has_open_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_breaks_one_open'"
+        ).fetchone()
+        if not has_open_index:
+            self.conn.execute('''
+                UPDATE breaks
+                SET end_time = (SELECT MIN(next.start_time) FROM breaks next
+                                WHERE next.user_id = breaks.user_id AND next.id > breaks.id),
+                    status = 'auto_closed'
+                WHERE end_time IS NULL AND EXISTS (
+                    SELECT 1 FROM breaks newer WHERE newer.user_id = breaks.user_id AND newer.id > breaks.id
+                )
+            ''')
+            self.conn.execute('''
+                UPDATE breaks SET actual_duration = (julianday(end_time) - julianday(start_time)) * 1440
+                WHERE status = 'auto_closed' AND actual_duration IS NULL AND end_time IS NOT NULL
+            ''')
+            self.conn.execute('''
+                CREATE UNIQUE INDEX idx_breaks_one_open ON breaks (user_id) WHERE end_time IS NULL
+            ''')
+        
+        # Isi penghitung istirahat dari data istirahat yang sudah ada
+        has_counters = self.conn.execute('SELECT 1 FROM break_counters LIMIT 1').fetchone()
+        has_breaks = self.conn.execute('SELECT 1 FROM breaks WHERE end_time IS NOT NULL LIMIT 1').fetchone()
+        if not has_counters and has_breaks:
+            self.rebuild_break_counters()
+        self.conn.commit()
+    
+    def backfill_events(self):
+        """Tulis journal events dari isi attendance/breaks (untuk data lama atau data hasil impor massal)"""
+        self.conn.execute('''
+            INSERT INTO events (user_id, event_type, event_time, data)
+            SELECT user_id, event_type, event_time, data FROM (
+                SELECT user_id, 'check_in' AS event_type, date || ' ' || check_in AS event_time,
+                       json_object('late_minutes', COALESCE(late_minutes, 0)) AS data, 1 AS seq
+                FROM attendance WHERE check_in IS NOT NULL
+                UNION ALL
+                SELECT user_id, 'break_start', start_time,
+                       json_object('break_type', break_type, 'scheduled_duration', scheduled_duration), 2
+                FROM breaks
+                UNION ALL
+                SELECT user_id, 'break_end', end_time, json_object('status', status), 3
+                FROM breaks WHERE end_time IS NOT NULL
+                UNION ALL
+                SELECT user_id, 'check_out', date || ' ' || check_out,
+                       json_object('date', date, 'overtime_minutes', COALESCE(overtime_minutes, 0),
+                                   'early_leave_minutes', COALESCE(early_leave_minutes, 0), 'status', status), 4
+                FROM attendance WHERE check_out IS NOT NULL
+            )
+            ORDER BY event_time, seq
+        ''')
+        self.conn.commit()
+    
+    def create_search_index(self):
+        """Membuat index FTS5 untuk pencarian karyawan, disinkronkan lewat trigger"""
+        exists = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'employees_fts'"
+        ).fetchone()
+        
+        if not exists:
+            try:
+                # trigram: pencarian substring dan tidak case-sensitive
+                self.conn.execute('''
+                    CREATE VIRTUAL TABLE employees_fts USING fts5(
+                        full_name, username, department, position,
+                        content='employees', content_rowid='user_id', tokenize='trigram'
+                    )
+                ''')
+            except sqlite3.OperationalError:
+                # SQLite lama tanpa tokenizer trigram: pencarian prefix per kata
+                self.conn.execute('''
+                    CREATE VIRTUAL TABLE employees_fts USING fts5(
+                        full_name, username, department, position,
+                        content='employees', content_rowid='user_id'
+                    )
+                ''')
+            
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+                    INSERT INTO employees_fts (rowid, full_name, username, department, position)
+                    VALUES (new.user_id, new.full_name, new.username, new.department, new.position);
+                END
+            ''')
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+                    INSERT INTO employees_fts (employees_fts, rowid, full_name, username, department, position)
+                    VALUES ('delete', old.user_id, old.full_name, old.username, old.department, old.position);
+                END
+            ''')
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS employees_fts_au
+                AFTER UPDATE OF full_name, username, department, position ON employees BEGIN
+                    INSERT INTO employees_fts (employees_fts, rowid, full_name, username, department, position)
+                    VALUES ('delete', old.user_id, old.full_name, old.username, old.department, old.position);
+                    INSERT INTO employees_fts (rowid, full_name, username, department, position)
+                    VALUES (new.user_id, new.full_name, new.username, new.department, new.position);
+                END
+            ''')
+            
+            # Isi index dari data karyawan yang sudah ada
+            self.conn.execute("INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')")
+            self.conn.commit()
+        
+        sql = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'employees_fts'"
+        ).fetchone()[0]
+        self.fts_trigram = 'trigram' in sql
+    
+    def init_settings(self):
+        """Inisialisasi settings default"""
+        default_settings = {
+            'work_start': config.DEFAULT_WORK_START,
+            'work_end': config.DEFAULT_WORK_END,
+            'break_times': str(config.ALLOWED_BREAK_TYPES),
+            'break_quotas': json.dumps(config.BREAK_QUOTAS),
+            'notification_texts': str(config.NOTIFICATION_TEXTS)
+        }
+        
+        for key, value in default_settings.items():
+            self.conn.execute('''
+                INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
+            ''', (key, value))
+        self.conn.commit()
+    
+    def init_roles(self):
+        """Bootstrap role dari config lalu muat cache role di memori"""
+        self.bootstrap_roles()
+        self.reload_roles()
+    
+    def bootstrap_roles(self, user_id=None):
+        """Memberi role awal dari config.OWNER_USERNAMES/ADMIN_USERNAMES
+        
+        Hanya berlaku untuk user yang belum pernah punya baris di tabel roles,
+        sehingga role yang sudah dicabut tidak akan diberikan ulang. Tidak berlaku
+        untuk database tenant (config_roles=False).
+        """
+        if not self.config_roles:
+            return
+        
+        granted = 0
+        for role, usernames in (('owner', config.OWNER_USERNAMES), ('admin', config.ADMIN_USERNAMES)):
+            if not usernames:
+                continue
+            
+            placeholders = ', '.join('?' for _ in usernames)
+            query = f'''
+                INSERT OR IGNORE INTO roles (user_id, role)
+                SELECT user_id, ? FROM employees
+                WHERE username COLLATE NOCASE IN ({placeholders})
+            '''
+            params = [role, *usernames]
+            if user_id is not None:
+                query += ' AND user_id = ?'
+                params.append(user_id)
+            
+            granted += self.conn.execute(query, params).rowcount
+        self.conn.commit()
+        
+        if granted and hasattr(self, '_role_cache'):
+            self.reload_roles()
+    
+    def reload_roles(self):
+        """Muat ulang cache role dari database"""
+        cursor = self.conn.execute('SELECT user_id, role FROM roles WHERE is_active = 1')
+        self._role_cache = dict(cursor.fetchall())
+    
+    def get_role(self, user_id):
+        """Ambil role user dari cache ('owner', 'admin' atau None)"""
+        return self._role_cache.get(user_id)
+    
+    def set_role(self, user_id, role, granted_by=None):
+        """Memberi atau mengubah role user, cache langsung diperbarui"""
+        self.conn.execute('''
+            INSERT INTO roles (user_id, role, is_active, granted_by, updated_at)
+            VALUES (?, ?, 1, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                role = excluded.role,
+                is_active = 1,
+                granted_by = excluded.granted_by,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (user_id, role, granted_by))
+        self.conn.commit()
+        self._role_cache[user_id] = role
+    
+    def revoke_role(self, user_id, revoked_by=None):
+        """Mencabut role user (soft delete), cache langsung diperbarui"""
+        cursor = self.conn.execute('''
+            UPDATE roles SET is_active = 0, granted_by = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND is_active = 1
+        ''', (revoked_by, user_id))
+        self.conn.commit()
+        self._role_cache.pop(user_id, None)
+        return cursor.rowcount > 0
+    
+    def get_role_user_ids(self):
+        """Ambil user_id semua admin/owner aktif (dari cache)"""
+        return list(self._role_cache)
+    
+    def get_roles(self):
+        """Ambil daftar admin/owner aktif beserta data karyawannya"""
+        cursor = self.conn.execute('''
+            SELECT r.user_id, r.role, e.username, e.full_name
+            FROM roles r
+            LEFT JOIN employees e ON r.user_id = e.user_id
+            WHERE r.is_active = 1
+            ORDER BY r.role DESC, e.full_name
+        ''')
+        return cursor.fetchall()
+    
+    def get_setting(self, key):
+        """Mengambil nilai setting berdasarkan key (di-cache per database)"""
+        cache = self.settings_cache
+        if cache is not None and key in cache:
+            return cache[key]
+        
+        cursor = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,))
+        result = cursor.fetchone()
+        value = result[0] if result else None
+        if cache is not None:
+            cache[key] = value
+        return value
+    
+    def update_setting(self, key, value, description=""):
+        """Memperbarui setting"""
+        self.conn.execute('''
+            INSERT OR REPLACE INTO settings (key, value, description, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (key, value, description))
+        self.conn.commit()
+        self.settings_cache.pop(key, None)
+    
+    def add_employee(self, user_id, username, full_name, department="", position=""):
+        """Menambah karyawan baru, atau memperbarui username/nama hanya jika berubah
+        
+        Data lain (departemen, posisi, status aktif, created_at) tidak ditimpa.
+        """
+        self.conn.execute('''
+            INSERT INTO employees (user_id, username, full_name, department, position)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = excluded.username,
+                full_name = excluded.full_name
+            WHERE employees.username IS NOT excluded.username
+               OR employees.full_name IS NOT excluded.full_name
+        ''', (user_id, username, full_name, department, position))
+        self.conn.commit()
+    
+    def import_employees(self, employees):
+        """Import/upsert banyak karyawan sekaligus dalam satu transaksi
+        
+        `employees` berisi dict dengan key user_id, username, full_name,
+        department, position, is_active. Nilai None berarti data lama dipertahankan.
+        """
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO employees (user_id, username, full_name, department, position, is_active)
+                VALUES (:user_id, :username, :full_name, :department, :position, COALESCE(:is_active, 1))
+                ON CONFLICT(user_id) DO UPDATE SET
+                    username = COALESCE(:username, employees.username),
+                    full_name = COALESCE(:full_name, employees.full_name),
+                    department = COALESCE(:department, employees.department),
+                    position = COALESCE(:position, employees.position),
+                    is_active = COALESCE(:is_active, employees.is_active)
+            ''', employees)
+        return len(employees)
+    
+    def journal_event(self, user_id, event_type, event_time, data=None):
+        """Menambah event ke journal
+        
+        Tidak melakukan commit; dipanggil di dalam transaksi yang sama dengan perubahan
+        attendance/breaks yang dicatatnya. Setiap aksi jadi menulis dua baris (event dan
+        proyeksi) dalam satu commit/fsync, kira-kira dua kali volume tulis dibanding
+        journal saja. Proyeksi sinkron sengaja dipilih daripada projector asinkron: cek
+        "sudah masuk", istirahat aktif dan kuota langsung membaca tabel yang konsisten,
+        dan tidak ada jeda antara event tercatat dan status yang terlihat user. Journal
+        menjadi sumber audit dan rebuild_from_journal(), bukan jalur baca.
+        """
+        self.conn.execute('''
+            INSERT INTO events (user_id, event_type, event_time, data)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, event_type, event_time, json.dumps(data or {})))
+    
+    def project_event(self, conn, user_id, event_type, event_time, data):
+        """Projector (rebuild): terapkan satu event dari journal ke tabel attendance/breaks
+        
+        Baris baru memakai id lamanya dari tabel sementara rebuild_attendance_ids /
+        rebuild_break_ids (lihat rebuild_from_journal) jika ada; selain itu id baru.
+        """
+        event_date, event_clock = event_time.split(' ')
+        
+        if event_type == 'check_in':
+            return conn.execute('''
+                INSERT INTO attendance (id, user_id, date, check_in, status, late_minutes)
+                VALUES ((SELECT id FROM rebuild_attendance_ids WHERE user_id = ?1 AND date = ?2),
+                        ?1, ?2, ?3, 'normal', ?4)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    check_in = excluded.check_in,
+                    late_minutes = excluded.late_minutes
+                WHERE attendance.check_in IS NULL
+            ''', (user_id, event_date, event_clock, data.get('late_minutes', 0)))
+        
+        if event_type == 'check_out':
+            return conn.execute('''
+                UPDATE attendance
+                SET check_out = ?, overtime_minutes = ?, early_leave_minutes = ?, status = COALESCE(?, status)
+                WHERE user_id = ? AND date = ? AND check_out IS NULL
+            ''', (event_clock, data.get('overtime_minutes', 0), data.get('early_leave_minutes', 0),
+                  data.get('status'), user_id, data.get('date', event_date)))
+        
+        if event_type == 'break_start':
+            # Istirahat lama yang masih terbuka (data lama) ditutup saat istirahat baru dimulai
+            conn.execute('''
+                UPDATE breaks
+                SET end_time = ?, actual_duration = (julianday(?) - julianday(start_time)) * 1440,
+                    status = 'auto_closed'
+                WHERE user_id = ? AND end_time IS NULL
+            ''', (event_time, event_time, user_id))
+            # Dua istirahat dengan user dan jam mulai sama masing-masing mendapat id lamanya sendiri
+            return conn.execute('''
+                INSERT INTO breaks (id, user_id, attendance_id, break_type, start_time, scheduled_duration)
+                VALUES ((SELECT MIN(r.id) FROM rebuild_break_ids r
+                         WHERE r.user_id = ?1 AND r.start_time = ?4
+                           AND NOT EXISTS (SELECT 1 FROM breaks b WHERE b.id = r.id)),
+                        ?1, (SELECT id FROM attendance WHERE user_id = ?1 AND date = ?2), ?3, ?4, ?5)
+            ''', (user_id, event_date, data.get('break_type'), event_time, data.get('scheduled_duration')))
+        
+        if event_type == 'break_end':
+            return conn.execute('''
+                UPDATE breaks
+                SET end_time = ?, actual_duration = (julianday(?) - julianday(start_time)) * 1440,
+                    status = COALESCE(?, status)
+                WHERE user_id = ? AND end_time IS NULL
+            ''', (event_time, event_time, data.get('status'), user_id))
+        
+        raise ValueError(f"Jenis event tidak dikenal: {event_type}")
+    
+    def rebuild_from_journal(self):
+        """Bangun ulang tabel attendance, breaks dan penghitung istirahat dari journal events
+        
+        Baris yang dibangun ulang memakai id lamanya, sehingga watermark pemeriksaan anomali
+        dan dedup_key outbox yang memuat id istirahat (pengingat) tetap berlaku. Memakai
+        koneksi sendiri agar aman dijalankan di thread lain (asyncio.to_thread) tanpa
+        bercampur dengan transaksi koneksi utama; selama rebuild, penulis lain menunggu lock.
+        """
+        conn = sqlite3.connect(self.db_name, timeout=30)
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE TEMP TABLE rebuild_attendance_ids AS
+                    SELECT id, user_id, date FROM attendance
+                ''')
+                conn.execute('''
+                    CREATE TEMP TABLE rebuild_break_ids AS
+                    SELECT id, user_id, start_time FROM breaks
+                ''')
+                conn.execute('CREATE INDEX temp.idx_rebuild_attendance_ids ON rebuild_attendance_ids (user_id, date)')
+                conn.execute('CREATE INDEX temp.idx_rebuild_break_ids ON rebuild_break_ids (user_id, start_time)')
+                
+                conn.execute('DELETE FROM breaks')
+                conn.execute('DELETE FROM attendance')
+                
+                events = conn.execute('''
+                    SELECT user_id, event_type, event_time, data FROM events ORDER BY id
+                ''')
+                replayed = 0
+                for user_id, event_type, event_time, data in events:
+                    self.project_event(conn, user_id, event_type, event_time, json.loads(data or '{}'))
+                    replayed += 1
+                
+                self.rebuild_break_counters(conn)
+                conn.execute('DROP TABLE temp.rebuild_attendance_ids')
+                conn.execute('DROP TABLE temp.rebuild_break_ids')
+        finally:
+            conn.close()
+        
+        return replayed
+    
+    def rebuild_break_counters(self, conn=None):
+        """Hitung ulang tabel break_counters dari istirahat yang sudah selesai (tanpa commit)"""
+        conn = conn or self.conn
+        conn.execute('DELETE FROM break_counters')
+        conn.execute('''
+            INSERT INTO break_counters (user_id, date, break_type, count, minutes)
+            SELECT user_id, DATE(start_time), break_type, COUNT(*), COALESCE(SUM(actual_duration), 0)
+            FROM breaks
+            WHERE end_time IS NOT NULL
+            GROUP BY user_id, DATE(start_time), break_type
+        ''')
+    
+    def check_in(self, user_id, check_in_time):
+        """Mencatat absensi masuk dalam satu transaksi
+        
+        Keterlambatan dihitung di statement upsert dari jam mulai kerja (settings); nama dan
+        departemen karyawan (untuk papan kehadiran) ikut dikembalikan oleh statement yang sama.
+        Mengembalikan (berhasil, pesan, menit_terlambat, (nama, departemen)).
+        """
+        today = date.today()
+        work_start = self.get_setting('work_start') or config.DEFAULT_WORK_START
+        
+        with self.conn:
+            row = self.conn.execute('''
+                INSERT INTO attendance (user_id, date, check_in, status, late_minutes)
+                VALUES (:user_id, :date, :time, 'normal',
+                        MAX(0, (strftime('%s', :time) - strftime('%s', :work_start) - :tolerance * 60) / 60))
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    check_in = excluded.check_in,
+                    late_minutes = excluded.late_minutes
+                WHERE attendance.check_in IS NULL
+                RETURNING late_minutes,
+                          (SELECT full_name FROM employees WHERE user_id = attendance.user_id),
+                          (SELECT department FROM employees WHERE user_id = attendance.user_id)
+            ''', {'user_id': user_id, 'date': today, 'time': check_in_time,
+                  'work_start': work_start, 'tolerance': config.TOLERANCE_LATE}).fetchone()
+            
+            if row is None:
+                return False, "❌ Anda sudah melakukan absensi masuk hari ini.", 0, None
+            
+            late_minutes, full_name, department = row
+            self.journal_event(user_id, 'check_in', f"{today} {check_in_time}", {'late_minutes': late_minutes})
+        
+        return True, f"✅ Absensi masuk berhasil!\n⏰ Waktu: {check_in_time}", late_minutes, (full_name, department)
+    
+    def check_out(self, user_id, check_out_time):
+        """Mencatat absensi pulang dalam satu transaksi
+        
+        Lembur dan pulang cepat dihitung di statement update dari jam selesai kerja (settings).
+        Mengembalikan (berhasil, pesan, menit_lembur, menit_pulang_cepat).
+        """
+        today = date.today()
+        work_end = self.get_setting('work_end') or config.DEFAULT_WORK_END
+        
+        with self.conn:
+            row = self.conn.execute('''
+                UPDATE attendance
+                SET check_out = :time,
+                    overtime_minutes = MAX(0, (strftime('%s', :time) - strftime('%s', :work_end)) / 60),
+                    early_leave_minutes = MAX(0, (strftime('%s', :work_end) - strftime('%s', :time) - :tolerance * 60) / 60)
+                WHERE user_id = :user_id AND date = :date AND check_in IS NOT NULL AND check_out IS NULL
+                RETURNING overtime_minutes, early_leave_minutes
+            ''', {'user_id': user_id, 'date': today, 'time': check_out_time,
+                  'work_end': work_end, 'tolerance': config.TOLERANCE_EARLY}).fetchone()
+            
+            if row is not None:
+                overtime_minutes, early_leave_minutes = row
+                self.journal_event(user_id, 'check_out', f"{today} {check_out_time}", {
+                    'date': str(today),
+                    'overtime_minutes': overtime_minutes,
+                    'early_leave_minutes': early_leave_minutes
+                })
+        
+        if row is None:
+            # Jalur gagal saja: cari tahu alasannya untuk pesan ke user
+            record = self.get_today_attendance(user_id)
+            if record and record[2]:
+                return False, "❌ Anda sudah melakukan absensi pulang hari ini.", 0, 0
+            return False, "❌ Anda harus check in terlebih dahulu sebelum check out.", 0, 0
+        
+        return True, f"✅ Absensi pulang berhasil!\n⏰ Waktu: {check_out_time}", overtime_minutes, early_leave_minutes
+    
+    def get_break_duration(self, break_type):
+        """Durasi istirahat (menit) dari settings, fallback ke config"""
+        try:
+            break_times = ast.literal_eval(self.get_setting('break_times'))
+            return break_times.get(break_type, 30)
+        except:
+            return config.ALLOWED_BREAK_TYPES.get(break_type, 30)
+    
+    def get_break_quota(self, break_type):
+        """Kuota harian (jumlah kali) untuk satu jenis istirahat, None jika tidak dibatasi"""
+        try:
+            break_quotas = json.loads(self.get_setting('break_quotas'))
+        except (TypeError, ValueError):
+            break_quotas = config.BREAK_QUOTAS
+        return break_quotas.get(break_type)
+    
+    def start_break(self, user_id, break_type, start_time):
+        """Memulai istirahat dalam satu transaksi
+        
+        Insert hanya terjadi jika user sudah check in hari ini dan kuota harian jenis
+        istirahat belum habis (satu lookup primary key di break_counters); index unik
+        parsial idx_breaks_one_open menolak istirahat kedua yang masih terbuka.
+        """
+        today = date.today()
+        scheduled_duration = self.get_break_duration(break_type)
+        quota = self.get_break_quota(break_type)
+        
+        try:
+            with self.conn:
+                row = self.conn.execute('''
+                    INSERT INTO breaks (user_id, attendance_id, break_type, start_time, scheduled_duration)
+                    SELECT user_id, id, :break_type, :start_time, :scheduled_duration
+                    FROM attendance
+                    WHERE user_id = :user_id AND date = :date AND check_in IS NOT NULL
+                      AND (:quota IS NULL OR COALESCE((
+                          SELECT count FROM break_counters
+                          WHERE user_id = :user_id AND date = :date AND break_type = :break_type
+                      ), 0) < :quota)
+                    RETURNING id
+                ''', {'user_id': user_id, 'date': today, 'break_type': break_type, 'start_time': start_time,
+                      'scheduled_duration': scheduled_duration, 'quota': quota}).fetchone()
+                
+                if row is None:
+                    if quota is not None and self.get_today_attendance(user_id):
+                        return False, f"❌ Kuota istirahat {break_type} hari ini sudah habis ({quota} kali)."
+                    return False, "❌ Anda harus check in terlebih dahulu sebelum istirahat."
+                
+                self.journal_event(user_id, 'break_start', start_time, {
+                    'break_type': break_type,
+                    'scheduled_duration': scheduled_duration
+                })
+        except sqlite3.IntegrityError:
+            return False, "❌ Anda masih dalam istirahat yang aktif. Selesaikan terlebih dahulu."
+        
+        return True, "Istirahat dimulai"
+    
+    def end_break(self, user_id, end_time):
+        """Mengakhiri istirahat dalam satu transaksi
+        
+        Durasi aktual dihitung di statement update dan penghitung harian ikut diperbarui.
+        Mengembalikan (berhasil, pesan, (jenis, mulai, durasi_menit)).
+        """
+        with self.conn:
+            row = self.conn.execute('''
+                UPDATE breaks
+                SET end_time = ?, actual_duration = (julianday(?) - julianday(start_time)) * 1440
+                WHERE user_id = ? AND end_time IS NULL
+                RETURNING break_type, start_time, actual_duration
+            ''', (end_time, end_time, user_id)).fetchone()
+            
+            if row is None:
+                return False, "❌ Tidak ada istirahat yang aktif.", None
+            
+            self.count_breaks([(user_id, *row)])
+            self.journal_event(user_id, 'break_end', end_time)
+        
+        return True, "Istirahat selesai", row
+    
+    def count_breaks(self, finished):
+        """Tambahkan istirahat yang selesai ke break_counters (tanpa commit)
+        
+        `finished`: daftar (user_id, break_type, start_time, actual_duration).
+        """
+        self.conn.executemany('''
+            INSERT INTO break_counters (user_id, date, break_type, count, minutes)
+            VALUES (?, DATE(?), ?, 1, COALESCE(?, 0))
+            ON CONFLICT (user_id, date, break_type) DO UPDATE SET
+                count = count + 1,
+                minutes = minutes + excluded.minutes
+        ''', [(user_id, start_time, break_type, duration) for user_id, break_type, start_time, duration in finished])
+    
+    def auto_close_open_records(self, close_date, work_end, now, notice=None):
+        """Menutup semua istirahat dan absensi yang belum diselesaikan (batch akhir hari)
+        
+        Istirahat ditutup pada akhir durasi terjadwal (maksimal waktu `now`),
+        absensi ditutup pada jam selesai kerja. Semua dalam satu transaksi,
+        dan setiap penutupan dicatat sebagai event di journal. Jika `notice` diisi,
+        pemberitahuan ke setiap user terdampak masuk outbox di transaksi yang sama.
+        Mengembalikan daftar user_id yang terdampak.
+        """
+        work_end_time = f"{work_end}:00" if len(work_end) == 5 else work_end
+        
+        with self.conn:
+            # Tutup istirahat yang lupa diselesaikan, durasi dihitung langsung di SQL
+            closed_breaks = self.conn.execute('''
+                UPDATE breaks
+                SET end_time = MIN(datetime(start_time, '+' || COALESCE(NULLIF(CAST(scheduled_duration AS INTEGER), 0), 30) || ' minutes'), ?),
+                    actual_duration = (julianday(MIN(datetime(start_time, '+' || COALESCE(NULLIF(CAST(scheduled_duration AS INTEGER), 0), 30) || ' minutes'), ?))
+                                       - julianday(start_time)) * 1440,
+                    status = 'auto_closed'
+                WHERE end_time IS NULL AND start_time <= ?
+                RETURNING user_id, end_time, break_type, start_time, actual_duration
+            ''', (now, now, now)).fetchall()
+            self.count_breaks([row[:1] + row[2:] for row in closed_breaks])
+            
+            # Tutup absensi yang belum check out sampai tanggal penutupan
+            closed_attendance = self.conn.execute('''
+                UPDATE attendance
+                SET check_out = MAX(check_in, ?),
+                    status = 'auto_closed',
+                    overtime_minutes = 0,
+                    early_leave_minutes = 0
+                WHERE check_out IS NULL AND check_in IS NOT NULL AND date <= ?
+                RETURNING user_id, date, check_out
+            ''', (work_end_time, close_date)).fetchall()
+            
+            auto_closed = json.dumps({'status': 'auto_closed'})
+            self.conn.executemany('''
+                INSERT INTO events (user_id, event_type, event_time, data) VALUES (?, 'break_end', ?, ?)
+            ''', [(row[0], row[1], auto_closed) for row in closed_breaks])
+            self.conn.executemany('''
+                INSERT INTO events (user_id, event_type, event_time, data) VALUES (?, 'check_out', ?, ?)
+            ''', [
+                (user_id, f"{att_date} {check_out}", json.dumps({'date': att_date, 'status': 'auto_closed'}))
+                for user_id, att_date, check_out in closed_attendance
+            ])
+            
+            user_ids = sorted({row[0] for row in closed_breaks + closed_attendance})
+            if notice:
+                self.outbox_insert([
+                    (user_id, notice, f"auto_closed:{user_id}:{close_date}", None) for user_id in user_ids
+                ], now)
+        
+        return user_ids
+    
+    def outbox_insert(self, messages, now):
+        """Masukkan pesan ke outbox (tanpa commit), dipanggil di transaksi perubahan yang memicunya
+        
+        `messages`: daftar (chat_id, teks, dedup_key, parse_mode). Pesan dengan dedup_key
+        yang sudah pernah masuk outbox diabaikan.
+        """
+        self.conn.executemany('''
+            INSERT INTO outbox (chat_id, text, dedup_key, parse_mode, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dedup_key) DO NOTHING
+        ''', [(chat_id, text, dedup_key, parse_mode, now, now) for chat_id, text, dedup_key, parse_mode in messages])
+    
+    def enqueue_messages(self, messages):
+        """Masukkan pesan ke outbox dalam transaksi sendiri (lihat outbox_insert)"""
+        with self.conn:
+            self.outbox_insert(messages, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    
+    def get_due_outbox(self, now, limit):
+        """Pesan outbox yang sudah waktunya dikirim: (id, chat_id, teks, parse_mode, attempts)"""
+        cursor = self.conn.execute('''
+            SELECT id, chat_id, text, parse_mode, attempts FROM outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, id
+            LIMIT ?
+        ''', (now, limit))
+        return cursor.fetchall()
+    
+    def get_next_outbox_due(self):
+        """Waktu percobaan paling awal dari pesan yang masih pending, atau None jika tidak ada"""
+        return self.conn.execute('''
+            SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'
+        ''').fetchone()[0]
+    
+    def finish_outbox(self, sent, retries, dead, now):
+        """Catat hasil satu batch pengiriman outbox dalam satu transaksi
+        
+        `sent`: daftar id; `retries`: daftar (id, next_attempt_at, error); `dead`: daftar (id, error).
+        """
+        with self.conn:
+            self.conn.executemany('''
+                UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL
+                WHERE id = ?
+            ''', [(now, message_id) for message_id in sent])
+            self.conn.executemany('''
+                UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            ''', [(next_attempt_at, error, message_id) for message_id, next_attempt_at, error in retries])
+            self.conn.executemany('''
+                UPDATE outbox SET status = 'dead', attempts = attempts + 1, last_error = ?
+                WHERE id = ?
+            ''', [(error, message_id) for message_id, error in dead])
+    
+    def prune_outbox(self, before):
+        """Hapus pesan outbox yang sudah terkirim sebelum waktu tertentu (pesan dead disimpan)"""
+        with self.conn:
+            cursor = self.conn.execute('''
+                DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?
+            ''', (before,))
+        return cursor.rowcount
+    
+    def get_user_active_break(self, user_id):
+        """Cek apakah user sedang dalam istirahat"""
+        cursor = self.conn.execute('''
+            SELECT id, break_type, start_time FROM breaks 
+            WHERE user_id = ? AND end_time IS NULL
+        ''', (user_id,))
+        return cursor.fetchone()
+    
+    def get_today_breaks(self, user_id):
+        """Ambil semua istirahat hari ini untuk user tertentu"""
+        today = date.today()
+        cursor = self.conn.execute('''
+            SELECT break_type, start_time, end_time 
+            FROM breaks 
+            WHERE user_id = ? AND DATE(start_time) = ?
+            ORDER BY start_time
+        ''', (user_id, today))
+        return cursor.fetchall()
+    
+    def get_break_counters(self, user_id, day=None):
+        """Penghitung istirahat user untuk satu hari: {jenis: (jumlah, total_menit)}"""
+        cursor = self.conn.execute('''
+            SELECT break_type, count, minutes FROM break_counters
+            WHERE user_id = ? AND date = ?
+        ''', (user_id, day or date.today()))
+        return {break_type: (count, minutes) for break_type, count, minutes in cursor}
+    
+    def get_break_counters_all(self, day=None):
+        """Penghitung istirahat semua karyawan untuk satu hari, untuk laporan admin"""
+        cursor = self.conn.execute('''
+            SELECT c.user_id, COALESCE(e.full_name, CAST(c.user_id AS TEXT)), c.break_type, c.count, c.minutes
+            FROM break_counters c
+            LEFT JOIN employees e ON c.user_id = e.user_id
+            WHERE c.date = ?
+            ORDER BY e.full_name, c.user_id, c.break_type
+        ''', (day or date.today(),))
+        return cursor.fetchall()
+    
+    def get_today_attendance(self, user_id):
+        """Ambil data absensi hari ini untuk user tertentu"""
+        today = date.today()
+        cursor = self.conn.execute('''
+            SELECT date, check_in, check_out, status 
+            FROM attendance 
+            WHERE user_id = ? AND date = ?
+        ''', (user_id, today))
+        return cursor.fetchone()
+    
+    def get_attendance_records(self, user_id, start_date, end_date):
+        """Ambil data absensi dalam rentang tanggal"""
+        cursor = self.conn.execute('''
+            SELECT date, check_in, check_out, late_minutes, overtime_minutes, early_leave_minutes 
+            FROM attendance 
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date DESC
+        ''', (user_id, start_date, end_date))
+        return cursor.fetchall()
+    
+    def get_all_employees(self):
+        """Ambil semua data karyawan"""
+        cursor = self.conn.execute('''
+            SELECT user_id, username, full_name, department, position, is_active
+            FROM employees
+            ORDER BY full_name
+        ''')
+        return cursor.fetchall()
+    
+    def get_today_attendance_all(self):
+        """Ambil semua absensi hari ini (untuk admin)"""
+        today = date.today()
+        cursor = self.conn.execute('''
+            SELECT e.full_name, a.check_in, a.check_out, a.status, a.late_minutes, a.overtime_minutes
+            FROM attendance a
+            JOIN employees e ON a.user_id = e.user_id
+            WHERE a.date = ?
+            ORDER BY e.full_name
+        ''', (today,))
+        return cursor.fetchall()
+    
+    def get_department_report(self, start_date, end_date):
+        """Rekap per departemen untuk rentang tanggal, dihitung seluruhnya di SQLite
+        
+        Mengembalikan (baris, total). Baris per departemen:
+        (departemen, karyawan, hadir, persen_kehadiran, hari_telat, rata2_telat, lembur, peringkat);
+        total berbentuk sama dengan departemen None dan peringkat None. Persen kehadiran
+        dihitung terhadap jumlah hari yang punya absensi dalam rentang tersebut.
+        """
+        rows = self.conn.execute('''
+            WITH emp AS (
+                SELECT user_id, COALESCE(NULLIF(department, ''), 'Tanpa Departemen') AS department
+                FROM employees WHERE is_active = 1
+            ),
+            days AS (
+                SELECT COUNT(DISTINCT date) AS n FROM attendance WHERE date BETWEEN :start AND :end
+            ),
+            headcount AS (
+                SELECT department, COUNT(*) AS employees FROM emp GROUP BY department
+            ),
+            att AS (
+                SELECT e.department,
+                       COUNT(*) AS present,
+                       SUM(a.late_minutes > 0) AS late_days,
+                       SUM(a.late_minutes) AS late_minutes,
+                       SUM(a.overtime_minutes) AS overtime
+                FROM attendance a
+                JOIN emp e ON e.user_id = a.user_id
+                WHERE a.date BETWEEN :start AND :end AND a.check_in IS NOT NULL
+                GROUP BY e.department
+            ),
+            per_department AS (
+                SELECT h.department, h.employees,
+                       COALESCE(att.present, 0) AS present,
+                       COALESCE(att.late_days, 0) AS late_days,
+                       COALESCE(att.late_minutes, 0) AS late_minutes,
+                       COALESCE(att.overtime, 0) AS overtime
+                FROM headcount h
+                LEFT JOIN att ON att.department = h.department
+            ),
+            totals AS (
+                SELECT NULL AS department, SUM(employees) AS employees, SUM(present) AS present,
+                       SUM(late_days) AS late_days, SUM(late_minutes) AS late_minutes, SUM(overtime) AS overtime
+                FROM per_department
+            ),
+            combined AS (
+                SELECT * FROM per_department
+                UNION ALL
+                SELECT * FROM totals WHERE employees IS NOT NULL
+            )
+            SELECT c.department, c.employees, c.present,
+                   ROUND(100.0 * c.present / NULLIF(c.employees * days.n, 0), 1) AS attendance_rate,
+                   c.late_days,
+                   ROUND(1.0 * c.late_minutes / NULLIF(c.present, 0), 1) AS avg_late,
+                   c.overtime,
+                   CASE WHEN c.department IS NOT NULL THEN RANK() OVER (
+                       PARTITION BY c.department IS NULL
+                       ORDER BY 1.0 * c.present / NULLIF(c.employees, 0) DESC
+                   ) END AS rank
+            FROM combined c, days
+            ORDER BY c.department IS NULL, rank, c.department
+        ''', {'start': start_date, 'end': end_date}).fetchall()
+        
+        totals = rows.pop() if rows and rows[-1][0] is None else None
+        return rows, totals
+    
+    def get_department_breaks(self, start_date, end_date):
+        """Jumlah dan total menit istirahat per departemen dan jenis (dari break_counters)
+        
+        Mengembalikan daftar (departemen, jenis, jumlah, menit); departemen None untuk total semua.
+        """
+        cursor = self.conn.execute('''
+            WITH per_type AS (
+                SELECT COALESCE(NULLIF(e.department, ''), 'Tanpa Departemen') AS department,
+                       c.break_type, SUM(c.count) AS count, SUM(c.minutes) AS minutes
+                FROM break_counters c
+                JOIN employees e ON e.user_id = c.user_id AND e.is_active = 1
+                WHERE c.date BETWEEN ? AND ?
+                GROUP BY 1, 2
+            )
+            SELECT * FROM (
+                SELECT department, break_type, count, ROUND(minutes) AS minutes FROM per_type
+                UNION ALL
+                SELECT NULL, break_type, SUM(count), ROUND(SUM(minutes)) FROM per_type GROUP BY break_type
+            )
+            ORDER BY department IS NULL, department, break_type
+        ''', (start_date, end_date))
+        return cursor.fetchall()
+    
+    def get_anomaly_watermark(self):
+        """Id attendance/breaks terakhir yang sudah diperiksa: {'attendance': id, 'breaks': id}
+        
+        Saat pertama kali dipakai, watermark diletakkan sebelum data kemarin agar riwayat
+        lama tidak ikut diperiksa.
+        """
+        try:
+            return ast.literal_eval(self.get_setting('anomaly_watermark'))
+        except:
+            pass
+        
+        since = date.today() - timedelta(days=1)
+        first_attendance = self.conn.execute(
+            'SELECT MIN(id) FROM attendance WHERE date >= ?', (since,)
+        ).fetchone()[0]
+        first_break = self.conn.execute(
+            'SELECT MIN(id) FROM breaks WHERE start_time >= ?', (since,)
+        ).fetchone()[0]
+        last_attendance, last_break = self.conn.execute(
+            'SELECT (SELECT MAX(id) FROM attendance), (SELECT MAX(id) FROM breaks)'
+        ).fetchone()
+        return {
+            'attendance': first_attendance - 1 if first_attendance else last_attendance or 0,
+            'breaks': first_break - 1 if first_break else last_break or 0
+        }
+    
+    def get_new_attendance(self, after_id):
+        """Baris attendance dengan id > after_id, berhenti sebelum baris hari ini yang belum check out
+        
+        Mengembalikan (baris, id_terakhir). Baris: (id, user_id, nama, tanggal, masuk, pulang, status, menit_kerja).
+        """
+        rows = self.conn.execute('''
+            SELECT a.id, a.user_id, COALESCE(e.full_name, CAST(a.user_id AS TEXT)), a.date,
+                   a.check_in, a.check_out, a.status,
+                   -- pulang lebih awal dari jam masuk berarti shift melewati tengah malam
+                   ((strftime('%s', a.check_out) - strftime('%s', a.check_in)) / 60 + 1440) % 1440
+            FROM attendance a
+            LEFT JOIN employees e ON e.user_id = a.user_id
+            WHERE a.id > :after AND a.id < COALESCE(
+                (SELECT MIN(id) FROM attendance WHERE id > :after AND check_out IS NULL AND date >= :today), 1e18
+            )
+            ORDER BY a.id
+        ''', {'after': after_id, 'today': date.today()}).fetchall()
+        return rows, rows[-1][0] if rows else after_id
+    
+    def get_new_overdue_breaks(self, after_id, tolerance, min_count):
+        """User yang dalam satu hari berulang kali istirahat lewat waktu, untuk setiap user/hari
+        yang punya breaks baru (id > after_id)
+        
+        Hari yang tersentuh dibaca ulang penuh (termasuk istirahat yang sudah diperiksa job
+        sebelumnya), sehingga hari yang terbagi di dua kali pemeriksaan tetap dihitung utuh.
+        Berhenti sebelum istirahat hari ini yang masih berjalan.
+        Mengembalikan (baris, id_terakhir). Baris: (user_id, nama, tanggal, jumlah, total_lewat_menit, id_terakhir).
+        """
+        cutoff, last_id = self.conn.execute('''
+            SELECT (SELECT MIN(id) FROM breaks WHERE id > :after AND end_time IS NULL AND start_time >= :today),
+                   (SELECT MAX(id) FROM breaks WHERE id > :after)
+        ''', {'after': after_id, 'today': str(date.today())}).fetchone()
+        if cutoff is not None:
+            last_id = cutoff - 1
+        if last_id is None or last_id <= after_id:
+            return [], after_id
+        
+        rows = self.conn.execute('''
+            WITH touched AS (
+                SELECT DISTINCT user_id, DATE(start_time) AS day
+                FROM breaks
+                WHERE id > :after AND id <= :last
+            )
+            SELECT t.user_id, COALESCE(e.full_name, CAST(t.user_id AS TEXT)), t.day,
+                   COUNT(*), ROUND(SUM(b.actual_duration - b.scheduled_duration)), MAX(b.id)
+            FROM touched t
+            JOIN breaks b ON b.user_id = t.user_id
+                         AND b.start_time >= t.day AND b.start_time < DATE(t.day, '+1 day')
+                         AND b.id <= :last
+            LEFT JOIN employees e ON e.user_id = t.user_id
+            WHERE b.status = 'auto_closed' OR b.actual_duration > b.scheduled_duration + :tolerance
+            GROUP BY t.user_id, t.day
+            HAVING COUNT(*) >= :min_count
+        ''', {'after': after_id, 'last': last_id, 'tolerance': tolerance, 'min_count': min_count}).fetchall()
+        return rows, last_id
+    
+    def save_anomaly_findings(self, findings, watermark):
+        """Simpan temuan dan majukan watermark dalam satu transaksi
+        
+        `findings`: daftar (aturan, user_id, tanggal, detail, source_id). Temuan yang sudah
+        pernah tercatat (mis. setelah rebuild journal) diabaikan; mengembalikan indeks temuan yang baru.
+        """
+        inserted = []
+        with self.conn:
+            for index, finding in enumerate(findings):
+                cursor = self.conn.execute('''
+                    INSERT OR IGNORE INTO anomaly_findings (rule, user_id, date, detail, source_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', finding)
+                if cursor.rowcount:
+                    inserted.append(index)
+            self.conn.execute('''
+                INSERT OR REPLACE INTO settings (key, value, description, updated_at)
+                VALUES ('anomaly_watermark', ?, 'Id terakhir yang diperiksa job anomali', CURRENT_TIMESTAMP)
+            ''', (str(watermark),))
+        if self.settings_cache is not None:
+            self.settings_cache.pop('anomaly_watermark', None)
+        return inserted
+    
+    def get_presence_today(self):
+        """Status kehadiran hari ini per user (untuk membangun papan kehadiran)"""
+        today = date.today()
+        cursor = self.conn.execute('''
+            SELECT a.user_id, COALESCE(e.full_name, a.user_id), e.department, a.check_in, a.check_out,
+                   b.break_type, b.start_time, b.scheduled_duration
+            FROM attendance a
+            LEFT JOIN employees e ON a.user_id = e.user_id
+            LEFT JOIN breaks b ON b.user_id = a.user_id AND b.end_time IS NULL AND DATE(b.start_time) = a.date
+            WHERE a.date = ? AND a.check_in IS NOT NULL
+            ORDER BY a.user_id, b.start_time
+        ''', (today,))
+        return cursor.fetchall()
+    
+    def get_employee_by_username(self, username):
+        """Cari karyawan berdasarkan username"""
+        cursor = self.conn.execute('''
+            SELECT user_id, username, full_name, department, position, is_active
+            FROM employees
+            WHERE username = ? COLLATE NOCASE
+        ''', (username,))
+        return cursor.fetchone()
+    
+    def get_employee(self, user_id):
+        """Ambil data karyawan berdasarkan user_id"""
+        cursor = self.conn.execute('''
+            SELECT user_id, username, full_name, department, position, is_active
+            FROM employees
+            WHERE user_id = ?
+        ''', (user_id,))
+        return cursor.fetchone()
+    
+    def search_employees(self, keyword, limit=20):
+        """Cari karyawan berdasarkan nama, username, departemen atau posisi (FTS5)
+        
+        Dengan tokenizer trigram kata kunci dicari sebagai substring (kata kunci 1-2 huruf
+        lewat LIKE '%kata%'); tanpa trigram setiap kata dicari sebagai prefix kata.
+        """
+        keyword = keyword.strip().lstrip('@')
+        if not keyword:
+            return []
+        
+        if self.fts_trigram and len(keyword) >= 3:
+            # Frasa trigram = pencarian substring
+            match = '"' + keyword.replace('"', '""') + '"'
+        elif not self.fts_trigram:
+            # Tokenizer unicode61: setiap kata dicari sebagai prefix
+            match = ' '.join('"' + word.replace('"', '""') + '"*' for word in keyword.split())
+        else:
+            # Kata kunci terlalu pendek untuk trigram: cari substring dengan LIKE (scan penuh),
+            # sama seperti frasa trigram, jadi "Tw" juga menemukan "B Two"
+            pattern = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            cursor = self.conn.execute('''
+                SELECT user_id, username, full_name, department, position, is_active
+                FROM employees
+                WHERE full_name LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\'
+                   OR department LIKE ? ESCAPE '\\' OR position LIKE ? ESCAPE '\\'
+                ORDER BY full_name
+                LIMIT ?
+            ''', (pattern, pattern, pattern, pattern, limit))
+            return cursor.fetchall()
+        
+        cursor = self.conn.execute('''
+            SELECT e.user_id, e.username, e.full_name, e.department, e.position, e.is_active
+            FROM employees_fts f
+            JOIN employees e ON e.user_id = f.rowid
+            WHERE employees_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        ''', (match, limit))
+        return cursor.fetchall()
+    
+    def get_user_ids_by_usernames(self, usernames):
+        """Ambil user_id karyawan berdasarkan daftar username (tidak case-sensitive)"""
+        if not usernames:
+            return []
+        
+        placeholders = ', '.join('?' for _ in usernames)
+        cursor = self.conn.execute(f'''
+            SELECT user_id FROM employees
+            WHERE username COLLATE NOCASE IN ({placeholders})
+        ''', list(usernames))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def update_employee(self, user_id, department=None, position=None, is_active=None):
+        """Update data karyawan"""
+        query = 'UPDATE employees SET '
+        params = []
+        
+        if department is not None:
+            query += 'department = ?, '
+            params.append(department)
+        if position is not None:
+            query += 'position = ?, '
+            params.append(position)
+        if is_active is not None:
+            query += 'is_active = ?, '
+            params.append(is_active)
+        
+        # Hapus koma terakhir dan tambahkan WHERE clause
+        query = query.rstrip(', ') + ' WHERE user_id = ?'
+        params.append(user_id)
+        
+        self.conn.execute(query, params)
+        self.conn.commit()
+    
+    def delete_employee(self, user_id):
+        """Hapus karyawan (soft delete)"""
+        self.conn.execute('''
+            UPDATE employees SET is_active = 0 WHERE user_id = ?
+        ''', (user_id,))
+        self.conn.commit()
+    
+    def get_system_stats(self):
+        """Ambil statistik sistem"""
+        stats = {}
+        
+        # Total karyawan
+        cursor = self.conn.execute('SELECT COUNT(*) FROM employees')
+        stats['total_employees'] = cursor.fetchone()[0]
+        
+        # Karyawan aktif
+        cursor = self.conn.execute('SELECT COUNT(*) FROM employees WHERE is_active = 1')
+        stats['active_employees'] = cursor.fetchone()[0]
+        
+        # Absensi hari ini
+        today = date.today()
+        cursor = self.conn.execute('SELECT COUNT(*) FROM attendance WHERE date = ?', (today,))
+        stats['today_attendance'] = cursor.fetchone()[0]
+        
+        # Total absensi
+        cursor = self.conn.execute('SELECT COUNT(*) FROM attendance')
+        stats['total_attendance'] = cursor.fetchone()[0]
+        
+        # Istirahat hari ini
+        cursor = self.conn.execute('SELECT COUNT(*) FROM breaks WHERE DATE(start_time) = ?', (today,))
+        stats['today_breaks'] = cursor.fetchone()[0]
+        
+        # Total istirahat
+        cursor = self.conn.execute('SELECT COUNT(*) FROM breaks')
+        stats['total_breaks'] = cursor.fetchone()[0]
+        
+        return stats
+    
+    def get_backup_data(self):
+        """Ambil seluruh isi tabel utama untuk backup"""
+        return {
+            'employees': self.conn.execute('SELECT * FROM employees').fetchall(),
+            'attendance': self.conn.execute('SELECT * FROM attendance').fetchall(),
+            'breaks': self.conn.execute('SELECT * FROM breaks').fetchall()
+        }
+    
+    def export_attendance_data(self, start_date, end_date):
+        """Export data absensi untuk periode tertentu"""
+        cursor = self.conn.execute('''
+            SELECT e.full_name, a.date, a.check_in, a.check_out, a.late_minutes, a.overtime_minutes
+            FROM attendance a
+            JOIN employees e ON a.user_id = e.user_id
+            WHERE a.date BETWEEN ? AND ?
+            ORDER BY a.date, e.full_name
+        ''', (start_date, end_date))
+        
+        return cursor.fetchall()
+    
+    def reset_database(self):
+        """Reset semua data (hati-hati!)"""
+        # Hapus semua data tapi pertahankan struktur tabel
+        self.conn.execute('DELETE FROM breaks')
+        self.conn.execute('DELETE FROM break_counters')
+        self.conn.execute('DELETE FROM attendance')
+        self.conn.execute('DELETE FROM events')
+        self.conn.execute('DELETE FROM employees')
+        self.conn.execute('DELETE FROM settings')
+        
+        # Re-initialize settings
+        self.init_settings()
+        self.conn.commit()
+        self.settings_cache.clear()
+    
+    def close(self):
+        """Tutup pool baca dan koneksi tulis (mis. saat database tenant dikeluarkan dari pool)"""
+        self.reports.close()
+        self.conn.close()
+
+class ReadOnlyDatabase(Database):
+    """Database dengan koneksi read-only, dipakai oleh worker thread laporan"""
+    
+    def __init__(self, db_name):
+        self.db_name = db_name
+        # Ditutup oleh ReportingPool.close() dari thread lain setelah worker berhenti
+        self.conn = sqlite3.connect(f'file:{db_name}?mode=ro', uri=True, check_same_thread=False)
+        self.settings_cache = None  # tidak di-cache: tidak ada invalidasi di koneksi baca
+
+class ReportingPool:
+    """Menjalankan method baca Database di worker thread dengan koneksi read-only
+    
+    Contoh: `records = await db.reports.get_today_attendance_all()`
+    Setiap panggilan berjalan dalam satu transaksi baca (snapshot WAL), sehingga
+    laporan konsisten dan tidak menahan proses tulis di koneksi utama.
+    """
+    
+    def __init__(self, db_name, workers):
+        self.db_name = db_name
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self.local = threading.local()
+        self.readers = []
+        self.lock = threading.Lock()
+    
+    def get_reader(self):
+        """Koneksi read-only milik worker thread saat ini"""
+        reader = getattr(self.local, 'reader', None)
+        if reader is None:
+            reader = ReadOnlyDatabase(self.db_name)
+            self.local.reader = reader
+            with self.lock:
+                self.readers.append(reader)
+        return reader
+    
+    def close(self):
+        """Hentikan worker thread lalu tutup semua koneksi read-only miliknya"""
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            for reader in self.readers:
+                reader.conn.close()
+            self.readers.clear()
+    
+    def run(self, method_name, args):
+        reader = self.get_reader()
+        reader.conn.execute('BEGIN')
+        try:
+            return getattr(reader, method_name)(*args)
+        finally:
+            reader.conn.rollback()
+    
+    def __getattr__(self, name):
+        if not callable(getattr(Database, name, None)):
+            raise AttributeError(name)
+        
+        async def call(*args):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.run, name, args)
+        return call
+
+class DatabaseProxy:
+    """Meneruskan akses `db.<method>` ke database tenant aktif, atau ke database default
+    jika mode multi-tenant tidak dipakai
+
+    Database default baru dibuka (dan dimigrasi) saat pertama kali diakses, sehingga
+    meng-import modul ini tidak membuat atau menyentuh absensi.db.
+    """
+    
+    def __init__(self, factory=None):
+        self.factory = factory
+        self.default = None
+        self.lock = threading.Lock()
+    
+    def current(self):
+        db = current_db.get()
+        if db is not None:
+            return db
+        if self.factory is None:
+            raise RuntimeError("Tidak ada tenant aktif untuk mengakses database")
+        if self.default is None:
+            with self.lock:
+                if self.default is None:
+                    self.default = self.factory()
+        return self.default
+    
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+# Inisialisasi database (mode multi-tenant: dibuka per tenant oleh tenants.tenant_pool)
+db = DatabaseProxy(None if config.MULTI_TENANT else Database)
\ No newline at end of file
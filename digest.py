@@ -0,0 +1,58 @@
+from datetime import datetime
+import config
+import tenants
+
+# Jenis kejadian yang dikumpulkan untuk ringkasan admin
+EVENT_TITLES = {
+    'late': "⏰ Terlambat",
+    'early_leave': "🚪 Pulang Cepat",
+    'overdue_break': "☕ Istirahat Melebihi Waktu"
+}
+
+MAX_LINES_PER_SECTION = 30
+
+class AdminDigest:
+    """Mengumpulkan kejadian selama satu jendela waktu untuk dikirim sebagai satu ringkasan"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+        self.window_start = datetime.now()
+
+    def add(self, kind, description):
+        """Mencatat satu kejadian (murah, tanpa akses database) untuk tenant yang aktif"""
+        if not self.enabled:
+            return
+        self.events.append((kind, description, tenants.current_tenant_id()))
+
+    def drain(self):
+        """Ambil semua kejadian pada jendela saat ini dan mulai jendela baru"""
+        events = self.events
+        window_start = self.window_start
+        self.events = []
+        self.window_start = datetime.now()
+        return window_start, events
+
+    def format(self, window_start, events):
+        """Format ringkasan kejadian menjadi satu pesan"""
+        window_end = datetime.now()
+        report = "📋 RINGKASAN ABSENSI (Admin)\n"
+        report += f"Periode: {window_start.strftime('%H:%M')} - {window_end.strftime('%H:%M')}\n"
+        report += "─" * 30 + "\n"
+
+        for kind, title in EVENT_TITLES.items():
+            section = [event for event in events if event[0] == kind]
+            if not section:
+                continue
+
+            report += f"\n{title} ({len(section)}):\n"
+            for _, description in section[:MAX_LINES_PER_SECTION]:
+                report += f"• {description}\n"
+
+            if len(section) > MAX_LINES_PER_SECTION:
+                report += f"• ... dan {len(section) - MAX_LINES_PER_SECTION} lainnya\n"
+
+        return report
+
+# Instance global pengumpul kejadian
+admin_digest = AdminDigest(config.DIGEST_ENABLED)
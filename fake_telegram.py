@@ -0,0 +1,255 @@
+"""Server Bot API palsu untuk uji beban/chaos end-to-end tanpa jaringan
+
+Contoh:
+    python fake_telegram.py --port 8082 --recording rekaman.jsonl.gz --speed 10 \\
+        --latency-ms 80 --error-rate 0.01 --retry-after-rate 0.02
+    TELEGRAM_BASE_URL=http://127.0.0.1:8082 python bot.py
+
+Method yang didukung: getMe, getUpdates (long polling), setWebhook, deleteWebhook,
+sendMessage, editMessageText, answerCallbackQuery, sendDocument; method lain
+dijawab `true`. Update dimasukkan dari rekaman recorder.py dan/atau lewat
+POST /inject (satu update atau list update dalam JSON). GET /stats berisi jumlah
+panggilan per method dan jumlah gangguan yang disuntikkan.
+"""
+import argparse
+import email.parser
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': "Bot Absensi", 'username': "fake_absensi_bot"}
+MESSAGE_METHODS = ('sendMessage', 'editMessageText', 'sendDocument')
+NO_CHAOS_METHODS = ('getMe', 'getUpdates', 'setWebhook', 'deleteWebhook')
+
+class FakeTelegram:
+    """Status server: antrean update, penghitung panggilan dan pengaturan gangguan"""
+
+    def __init__(self, latency_ms=0, error_rate=0.0, retry_after_rate=0.0, retry_after=5, seed=None):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.updates = []
+        self.next_update_id = 1
+        self.message_id = 0
+        self.webhook = ""
+        self.calls = Counter()
+        self.injected = Counter()
+        self.lock = threading.Condition()
+
+    def inject(self, update):
+        """Tambahkan satu update ke antrean getUpdates (update_id diberi nomor baru)"""
+        with self.lock:
+            update = dict(update, update_id=self.next_update_id)
+            self.next_update_id += 1
+            self.updates.append(update)
+            self.lock.notify_all()
+
+    def get_updates(self, offset, limit, timeout):
+        """Long polling: tunggu sampai ada update dengan id >= offset atau timeout habis"""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            if offset:
+                # Update sebelum offset sudah dikonfirmasi bot
+                self.updates = [update for update in self.updates if update['update_id'] >= offset]
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.lock.wait(remaining)
+            return self.updates[:limit]
+
+    def chaos(self, method):
+        """Respons gangguan yang disuntikkan untuk method ini, atau None"""
+        if method in NO_CHAOS_METHODS:
+            return None
+        roll = self.random.random()
+        if roll < self.retry_after_rate:
+            self.injected['retry_after'] += 1
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after}
+            }
+        if roll < self.retry_after_rate + self.error_rate:
+            self.injected['error'] += 1
+            return 500, {'ok': False, 'error_code': 500, 'description': "Internal Server Error"}
+        return None
+
+    def call(self, method, params):
+        """Jalankan satu method Bot API, kembalikan (status HTTP, body JSON)"""
+        with self.lock:
+            self.calls[method] += 1
+        if self.latency and method != 'getUpdates':
+            time.sleep(self.random.expovariate(1 / self.latency))
+
+        failure = self.chaos(method)
+        if failure:
+            return failure
+
+        if method == 'getMe':
+            result = BOT_USER
+        elif method == 'getUpdates':
+            result = self.get_updates(
+                int(params.get('offset') or 0), int(params.get('limit') or 100), float(params.get('timeout') or 0)
+            )
+        elif method == 'setWebhook':
+            self.webhook = params.get('url', '')
+            result = True
+        elif method == 'deleteWebhook':
+            self.webhook = ""
+            result = True
+        elif method in MESSAGE_METHODS and 'chat_id' in params:
+            result = self.message(params)
+        else:
+            result = True
+        return 200, {'ok': True, 'result': result}
+
+    def message(self, params):
+        with self.lock:
+            self.message_id += 1
+            message_id = self.message_id
+        chat_id = params['chat_id']
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        return {
+            'message_id': int(params.get('message_id') or message_id),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', '')
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': dict(self.calls.most_common()),
+                'injected': dict(self.injected),
+                'pending_updates': len(self.updates),
+                'webhook': self.webhook
+            }
+
+def parse_params(content_type, body):
+    """Parameter request: JSON, form url-encoded, atau multipart (sendDocument)"""
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    if content_type.startswith('multipart/form-data'):
+        message = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        params = {}
+        for part in message.get_payload():
+            name = part.get_param('name', header='content-disposition')
+            if name and not part.get_filename():
+                params[name] = part.get_payload(decode=True).decode('utf-8', 'replace')
+        return params
+    return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Routing /bot<token>/<method>, /inject dan /stats"""
+
+    server_version = "FakeTelegram/1.0"
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.respond(200, self.server.telegram.stats())
+        else:
+            self.handle_api()
+
+    def do_POST(self):
+        if self.path == '/inject':
+            updates = json.loads(self.read_body() or b'[]')
+            for update in updates if isinstance(updates, list) else [updates]:
+                self.server.telegram.inject(update)
+            self.respond(200, {'ok': True, 'result': True})
+        else:
+            self.handle_api()
+
+    def handle_api(self):
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            self.respond(404, {'ok': False, 'error_code': 404, 'description': "Not Found"})
+            return
+
+        query = self.path.split('?', 1)[1] if '?' in self.path else ''
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        params.update(parse_params(self.headers.get('Content-Type', ''), self.read_body()))
+        status, body = self.server.telegram.call(parts[1], params)
+        self.respond(status, body)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # ribuan request per detik; lihat /stats
+
+def feed_recording(telegram, path, speed):
+    """Masukkan update dari rekaman recorder.py sesuai jadwal aslinya (speed 0 = sekaligus)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        return
+
+    start = time.monotonic()
+    first_ts = entries[0]['ts']
+    for entry in entries:
+        if speed:
+            delay = start + (entry['ts'] - first_ts) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        telegram.inject(entry['update'])
+    print(f"{len(entries):,} update dari {path} sudah dimasukkan")
+
+def main():
+    parser = argparse.ArgumentParser(description="Server Bot API palsu untuk uji beban/chaos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Rata-rata latensi per request (eksponensial)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Peluang respons 500")
+    parser.add_argument('--retry-after-rate', type=float, default=0.0, help="Peluang respons 429 RetryAfter")
+    parser.add_argument('--retry-after', type=int, default=5, help="Detik retry_after pada respons 429")
+    parser.add_argument('--recording', default=None, help="Rekaman update (.jsonl.gz) untuk getUpdates")
+    parser.add_argument('--speed', type=float, default=1.0, help="Kecepatan rekaman, 0 = sekaligus")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    telegram = FakeTelegram(args.latency_ms, args.error_rate, args.retry_after_rate, args.retry_after, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), FakeTelegramHandler)
+    server.daemon_threads = True
+    server.telegram = telegram
+
+    if args.recording:
+        threading.Thread(
+            target=feed_recording, args=(telegram, args.recording, args.speed), daemon=True
+        ).start()
+
+    print(f"Bot API palsu berjalan di http://{args.host}:{args.port} (TELEGRAM_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(telegram.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Generator data absensi sintetis untuk pengujian skala besar
+
+Contoh:
+    python generate_data.py --output data_uji.db --employees 2000 --months 12 --seed 7
+
+Data dibuat deterministik berdasarkan seed: karyawan tersebar di beberapa
+departemen, hari kerja Senin-Jumat, keterlambatan dengan ekor panjang, puncak
+istirahat makan siang, sesekali lupa absen pulang. Skema dibuat oleh
+database.Database dan baris ditulis dengan insert massal dalam satu transaksi.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import config
+from database import Database
+
+DEPARTMENTS = ["Produksi", "Gudang", "Keuangan", "HRD", "IT", "Marketing", "Penjualan", "Logistik"]
+POSITIONS = ["Staff", "Staff", "Staff", "Operator", "Supervisor", "Manager"]
+FIRST_NAMES = ["Agus", "Budi", "Citra", "Dewi", "Eko", "Fitri", "Gilang", "Hendra", "Indah", "Joko",
+               "Kartika", "Lestari", "Made", "Nur", "Putri", "Rizky", "Sari", "Teguh", "Wahyu", "Yuni"]
+LAST_NAMES = ["Santoso", "Wijaya", "Saputra", "Hidayat", "Kurniawan", "Pratama", "Lestari", "Nugroho",
+              "Setiawan", "Rahmawati", "Siregar", "Simanjuntak", "Halim", "Susanto", "Utami"]
+
+BATCH_SIZE = 50_000
+
+def parse_time(value):
+    hours, minutes = map(int, value.split(':'))
+    return hours * 60 + minutes
+
+def fmt_time(minutes):
+    minutes = int(minutes) % (24 * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+def fmt_stamp(day, minutes):
+    return f"{day.isoformat()} {fmt_time(minutes)}"
+
+def make_employees(rng, count):
+    """Buat karyawan beserta 'kebiasaan' masing-masing (dipakai untuk distribusi data)"""
+    employees = []
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        employees.append({
+            'user_id': user_id,
+            'username': f"{first.lower()}{last.lower()}{user_id}",
+            'full_name': f"{first} {last}",
+            'department': rng.choice(DEPARTMENTS),
+            'position': rng.choice(POSITIONS),
+            # Peluang terlambat per karyawan: sebagian besar disiplin, sebagian kecil sering telat
+            'late_rate': min(0.6, rng.betavariate(1.2, 12)),
+            'forget_rate': rng.choice([0.0, 0.005, 0.01, 0.03]),
+            'smoker': rng.random() < 0.3,
+            'prays': rng.random() < 0.6
+        })
+    return employees
+
+def workdays(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def layout_breaks(candidates, check_in, check_out):
+    """Susun istirahat satu hari menjadi urutan tanpa tumpang tindih di antara masuk dan pulang
+
+    `candidates` berisi (jenis, menit mulai yang diinginkan, durasi). Istirahat
+    diurutkan menurut jam mulai lalu digeser agar mulai setelah istirahat
+    sebelumnya selesai; yang tidak muat sebelum jam pulang dibuang. Semua nilai
+    dibulatkan ke menit agar stempel waktu yang ditulis persis sama dengan yang
+    diputar ulang dari journal (break_end selalu menutup istirahat yang benar).
+    """
+    layout = []
+    cursor = check_in + 1
+    for break_type, start, duration in sorted(candidates, key=lambda item: item[1]):
+        start = max(int(round(start)), cursor)
+        end = start + max(1, int(round(duration)))
+        if end >= check_out:
+            continue
+        layout.append((break_type, start, end))
+        cursor = end + 1
+    return layout
+
+def generate_rows(rng, employees, days, work_start, work_end):
+    """Hasilkan baris attendance dan breaks (attendance_id berurutan mulai 1)"""
+    attendance_id = 0
+    attendance = []
+    breaks = []
+
+    for day in days:
+        for emp in employees:
+            if rng.random() < 0.03:  # tidak masuk (cuti/sakit)
+                continue
+
+            attendance_id += 1
+            user_id = emp['user_id']
+
+            # Masuk: kebanyakan sedikit sebelum jam kerja, keterlambatan berekor panjang
+            check_in = work_start - 12 + rng.gauss(0, 6)
+            if rng.random() < emp['late_rate']:
+                check_in = work_start + 1 + rng.expovariate(1 / 12)
+            late = max(0, int(check_in - work_start))
+
+            # Pulang: normal, pulang cepat, lembur, atau lupa absen pulang
+            check_out = work_end + abs(rng.gauss(5, 10))
+            roll = rng.random()
+            if roll < 0.03:
+                check_out = work_end - rng.randint(15, 120)
+            elif roll < 0.13:
+                check_out = work_end + rng.randint(30, 180)
+            early = max(0, int(work_end - check_out))
+            overtime = max(0, int(check_out - work_end))
+            forgot = rng.random() < emp['forget_rate']
+
+            attendance.append((
+                attendance_id, user_id, day.isoformat(), fmt_time(check_in),
+                None if forgot else fmt_time(check_out), 'normal', late,
+                0 if forgot else early, 0 if forgot else overtime
+            ))
+
+            # Istirahat makan siang memuncak sekitar jam 12:00
+            day_breaks = []
+            if rng.random() < 0.92:
+                day_breaks.append(('makan', 12 * 60 + rng.gauss(5, 15), max(15, rng.gauss(45, 12))))
+            if emp['prays']:
+                day_breaks.append(('sholat', 12 * 60 + 20 + rng.gauss(15, 10), rng.uniform(8, 18)))
+                if rng.random() < 0.7:
+                    day_breaks.append(('sholat', 15 * 60 + 15 + rng.gauss(10, 10), rng.uniform(8, 15)))
+            for _ in range(rng.choice([0, 1, 1, 2, 3])):
+                day_breaks.append(('toilet', rng.uniform(check_in + 30, work_end - 30), rng.uniform(3, 15)))
+            if emp['smoker']:
+                for _ in range(rng.randint(1, 4)):
+                    day_breaks.append(('merokok', rng.uniform(check_in + 60, work_end - 30), rng.uniform(5, 15)))
+            if rng.random() < 0.05:
+                day_breaks.append(('lainnya', rng.uniform(check_in + 30, work_end - 60), rng.uniform(10, 50)))
+
+            day_end = int(work_end if forgot else check_out)
+            for break_type, start, end in layout_breaks(day_breaks, int(check_in), day_end):
+                breaks.append((
+                    user_id, attendance_id, break_type, fmt_stamp(day, start),
+                    fmt_stamp(day, end), config.ALLOWED_BREAK_TYPES[break_type], 'normal'
+                ))
+
+            if len(breaks) >= BATCH_SIZE:
+                yield attendance, breaks
+                attendance, breaks = [], []
+
+    if attendance or breaks:
+        yield attendance, breaks
+
+def generate(db, employees=1000, months=6, seed=42, end_date=None, journal=True):
+    """Isi database dengan data sintetis, kembalikan jumlah (karyawan, attendance, breaks)"""
+    rng = random.Random(seed)
+    end_date = end_date or date.today() - timedelta(days=1)
+    start_date = end_date - timedelta(days=int(months * 30.4))
+    work_start = parse_time(config.DEFAULT_WORK_START)
+    work_end = parse_time(config.DEFAULT_WORK_END)
+
+    people = make_employees(rng, employees)
+    total_attendance = 0
+    total_breaks = 0
+
+    db.conn.execute('PRAGMA synchronous=OFF')
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO employees (user_id, username, full_name, department, position)
+            VALUES (:user_id, :username, :full_name, :department, :position)
+        ''', people)
+
+        rows = generate_rows(rng, people, workdays(start_date, end_date), work_start, work_end)
+        for attendance, breaks in rows:
+            db.conn.executemany('''
+                INSERT INTO attendance (id, user_id, date, check_in, check_out, status,
+                                        late_minutes, early_leave_minutes, overtime_minutes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', attendance)
+            db.conn.executemany('''
+                INSERT INTO breaks (user_id, attendance_id, break_type, start_time, end_time,
+                                    scheduled_duration, actual_duration, status)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, (julianday(?5) - julianday(?4)) * 1440, ?7)
+            ''', breaks)
+            total_attendance += len(attendance)
+            total_breaks += len(breaks)
+
+    with db.conn:
+        db.rebuild_break_counters()
+    if journal:
+        # Journal events ikut diisi agar /bangun_ulang_absensi menghasilkan data yang sama
+        db.backfill_events()
+    db.conn.execute('PRAGMA synchronous=FULL')
+
+    return employees, total_attendance, total_breaks
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator data absensi sintetis")
+    parser.add_argument('--output', default='data_uji.db', help="File database tujuan")
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--months', type=float, default=6)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', default=None, help="Tanggal terakhir (YYYY-MM-DD), default kemarin")
+    parser.add_argument('--no-journal', action='store_true', help="Jangan isi tabel events")
+    parser.add_argument('--force', action='store_true', help="Timpa file database yang sudah ada")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f"{args.output} sudah ada (gunakan --force untuk menimpa)")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.output + suffix):
+                os.remove(args.output + suffix)
+
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+
+    start = time.perf_counter()
+    db = Database(args.output)
+    employees, attendance, breaks = generate(
+        db, args.employees, args.months, args.seed, end_date, journal=not args.no_journal
+    )
+    db.conn.close()
+
+    print(f"{employees:,} karyawan, {attendance:,} absensi, {breaks:,} istirahat "
+          f"ditulis ke {args.output} dalam {time.perf_counter() - start:.1f} detik")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+logger = logging.getLogger(__name__)
+
+class LoopWatchdog:
+    """Mengukur lag event loop, antrean update dan backlog scheduler
+
+    Task di event loop memperbarui heartbeat; thread terpisah memeriksa heartbeat dan
+    mencatat stack trace event loop jika loop terblokir melewati ambang batas.
+    """
+
+    def __init__(self, interval, threshold):
+        self.interval = interval
+        self.threshold = threshold
+        self.application = None
+        self.scheduler = None
+        self.loop_thread_id = None
+        self.heartbeat = time.monotonic()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.ready = False
+        self.task = None
+
+    def start(self, application, scheduler):
+        """Mulai task pengukur di event loop dan thread pemeriksa (dipanggil dari event loop)"""
+        self.application = application
+        self.scheduler = scheduler
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self.measure())
+        threading.Thread(target=self.check, name="loop-watchdog", daemon=True).start()
+        self.ready = True
+
+    async def measure(self):
+        """Tidur selama `interval`; selisih waktu bangun dari yang diharapkan adalah lag"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(0.0, now - expected)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.heartbeat = now
+
+            if self.last_lag > self.threshold:
+                logger.warning("Event loop terlambat %.2f detik (antrean update: %s, backlog job: %s)",
+                               self.last_lag, self.update_queue_size(), self.scheduler_backlog())
+
+    def check(self):
+        """Thread pemeriksa: catat stack event loop sekali untuk setiap kejadian loop macet"""
+        reported = False
+        while True:
+            time.sleep(self.interval)
+            blocked = time.monotonic() - self.heartbeat - self.interval
+            if blocked <= self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(stack tidak tersedia)"
+            logger.error("Event loop terblokir %.2f detik, posisi saat ini:\n%s", blocked, stack)
+
+    def update_queue_size(self):
+        if self.application is None:
+            return 0
+        return self.application.update_queue.qsize()
+
+    def scheduler_backlog(self):
+        """Jumlah job scheduler yang sudah lewat jadwal tapi belum dijalankan"""
+        if self.scheduler is None:
+            return 0
+        now = datetime.now(self.scheduler.timezone)
+        return sum(1 for job in self.scheduler.get_jobs() if job.next_run_time and job.next_run_time < now)
+
+    def is_healthy(self):
+        return time.monotonic() - self.heartbeat - self.interval <= config.HEALTH_STALL_SECONDS
+
+    def is_ready(self):
+        running = self.application is not None and self.application.running
+        return self.ready and running and self.is_healthy()
+
+    def status(self):
+        return {
+            'healthy': self.is_healthy(),
+            'ready': self.is_ready(),
+            'loop_lag_seconds': round(self.last_lag, 4),
+            'max_loop_lag_seconds': round(self.max_lag, 4),
+            'seconds_since_heartbeat': round(time.monotonic() - self.heartbeat, 3),
+            'stalls': self.stalls,
+            'update_queue': self.update_queue_size(),
+            'scheduler_backlog': self.scheduler_backlog()
+        }
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Endpoint /healthz (loop hidup) dan /readyz (bot siap menerima update)"""
+
+    def do_GET(self):
+        if self.path == '/healthz':
+            ok = loop_watchdog.is_healthy()
+        elif self.path == '/readyz':
+            ok = loop_watchdog.is_ready()
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(loop_watchdog.status()).encode()
+        self.send_response(200 if ok else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # probe supervisor terlalu sering untuk dicatat
+
+def start_health_server(host, port):
+    """Jalankan server HTTP health check di thread terpisah"""
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    logger.info("Health check tersedia di http://%s:%s/healthz dan /readyz", host, port)
+    return server
+
+# Instance global watchdog
+loop_watchdog = LoopWatchdog(config.WATCHDOG_INTERVAL_SECONDS, config.WATCHDOG_LAG_THRESHOLD_SECONDS)
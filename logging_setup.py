@@ -0,0 +1,106 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import config
+
+# Konteks update yang sedang diproses, diisi oleh middleware dan ikut di setiap log
+current_update = contextvars.ContextVar('current_update', default=None)
+
+CONTEXT_FIELDS = ('update_id', 'user_id', 'chat_id', 'tenant', 'handler', 'latency_ms')
+
+class ContextFilter(logging.Filter):
+    """Tambahkan update_id/user_id/tenant/handler dari konteks update ke record log"""
+
+    def filter(self, record):
+        context = current_update.get()
+        if context:
+            for field in CONTEXT_FIELDS:
+                if field in context and not hasattr(record, field):
+                    setattr(record, field, context[field])
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Ambil sebagian saja log INFO/DEBUG dari logger yang sangat ramai (polling, scheduler)"""
+
+    def __init__(self, loggers, rate):
+        super().__init__()
+        self.loggers = tuple(loggers)
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not record.name.startswith(self.loggers):
+            return True
+        return random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    """Satu baris JSON per log"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler untuk antrean di dalam proses yang sama
+
+    QueueHandler bawaan memformat record di thread pemanggil (event loop) dan
+    melebur traceback ke `msg`. Di sini hanya pesan yang digabung dengan args;
+    exc_info tetap utuh sehingga traceback dan JSON diformat oleh thread listener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def setup_logging(level=logging.INFO):
+    """Pasang logging non-blocking: record masuk antrean, thread listener yang menulis ke konsol dan file
+
+    Mengembalikan QueueListener yang sudah berjalan (dihentikan otomatis saat proses selesai).
+    """
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    handlers = [console]
+
+    if config.LOG_FILE:
+        os.makedirs(os.path.dirname(config.LOG_FILE) or '.', exist_ok=True)
+        file_handler = RotatingFileHandler(
+            config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLED_LOGGERS, config.LOG_SAMPLE_RATE))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,211 @@
+import logging
+import time
+from collections import OrderedDict
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+import config
+import tenants
+from logging_setup import current_update
+
+logger = logging.getLogger(__name__)
+
+class UpdateDeduplicator:
+    """Mengingat update_id terakhir agar update yang dikirim ulang Telegram tidak diproses dua kali"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.seen = OrderedDict()
+
+    def is_duplicate(self, update_id):
+        if update_id in self.seen:
+            return True
+
+        self.seen[update_id] = None
+        if len(self.seen) > self.max_size:
+            self.seen.popitem(last=False)
+        return False
+
+class Debouncer:
+    """Menahan aksi yang sama dari user yang sama dalam jendela waktu singkat"""
+
+    def __init__(self, window_seconds):
+        self.window = window_seconds
+        self.last_accepted = {}
+
+    def is_repeat(self, user_id, action):
+        now = time.monotonic()
+        key = (user_id, action)
+        last = self.last_accepted.get(key)
+
+        if last is not None and now - last < self.window:
+            return True
+
+        self.last_accepted[key] = now
+        if len(self.last_accepted) > config.DEDUP_CACHE_SIZE:
+            self.prune(now)
+        return False
+
+    def prune(self, now):
+        """Buang entri yang jendelanya sudah lewat"""
+        self.last_accepted = {
+            key: accepted for key, accepted in self.last_accepted.items()
+            if now - accepted < self.window
+        }
+
+class TokenBucket:
+    """Token bucket sederhana: kapasitas `capacity`, terisi `rate` token per detik"""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity, rate, now):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def consume(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class RateLimiter:
+    """Rate limit per user dan deteksi overload global (load shedding)"""
+
+    def __init__(self):
+        now = time.monotonic()
+        self.user_buckets = {}
+        self.global_bucket = TokenBucket(config.GLOBAL_RATE_LIMIT_BURST, config.GLOBAL_RATE_LIMIT_PER_SECOND, now)
+        self.overloaded_until = 0
+
+    def is_overloaded(self):
+        return time.monotonic() < self.overloaded_until
+
+    def admit(self, user_id, essential):
+        """Putuskan apakah aksi diproses. Setiap aksi dihitung ke bucket user; aksi penting
+        (absensi/istirahat) hanya dikecualikan dari load shedding global."""
+        now = time.monotonic()
+
+        if not self.global_bucket.consume(now):
+            if not self.is_overloaded():
+                logger.warning("Beban tinggi: mode overload aktif, aksi non-penting ditunda")
+            self.overloaded_until = now + config.OVERLOAD_COOLDOWN_SECONDS
+
+        if not essential and now < self.overloaded_until:
+            return False
+
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            if len(self.user_buckets) > config.DEDUP_CACHE_SIZE:
+                self.prune(now)
+            bucket = self.user_buckets[user_id] = TokenBucket(config.RATE_LIMIT_BURST, config.RATE_LIMIT_PER_SECOND, now)
+        return bucket.consume(now)
+
+    def prune(self, now):
+        """Buang bucket user yang sudah penuh kembali (tidak aktif)"""
+        refill_seconds = config.RATE_LIMIT_BURST / config.RATE_LIMIT_PER_SECOND
+        self.user_buckets = {
+            user_id: bucket for user_id, bucket in self.user_buckets.items()
+            if now - bucket.updated < refill_seconds
+        }
+
+# Aksi yang selalu diterima walaupun sistem sedang overload
+ESSENTIAL_ACTIONS = {
+    "🟢 Masuk Kerja",
+    "💼 Pulang Kerja",
+    "☕ Istirahat",
+    "✅ Selesai Istirahat",
+    "/selesai_istirahat"
+}
+
+def is_essential_action(action):
+    return action in ESSENTIAL_ACTIONS or action.startswith("break_")
+
+# Dict state percakapan (user_id -> state) yang sedang menunggu balasan user, didaftarkan
+# oleh bot.py; balasan tersebut tidak boleh hilang karena debounce atau load shedding
+conversation_states = []
+
+def awaits_reply(user_id):
+    return any(user_id in states for states in conversation_states)
+
+update_deduplicator = UpdateDeduplicator(config.DEDUP_CACHE_SIZE)
+debouncer = Debouncer(config.DEBOUNCE_SECONDS)
+rate_limiter = RateLimiter()
+
+def get_update_action(update: Update):
+    """Ambil identitas aksi dari update (teks tombol/pesan atau data callback)"""
+    if update.callback_query:
+        return update.callback_query.data
+    if update.message and update.message.text:
+        return update.message.text
+    return None
+
+async def guard_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pre-handler (group -1): hentikan update duplikat, user yang membanjiri bot
+    dan tombol yang ditekan beruntun sebelum ada query database atau pesan keluar"""
+    user = update.effective_user
+    action = get_update_action(update)
+    current_update.set({
+        'update_id': update.update_id,
+        'user_id': user.id if user else None,
+        'handler': action[:64] if action else None,
+        'started': time.perf_counter()
+    })
+    
+    if update_deduplicator.is_duplicate(update.update_id):
+        logger.info("Update %s duplikat, diabaikan", update.update_id)
+        raise ApplicationHandlerStop
+
+    if config.MULTI_TENANT:
+        tenant_id = tenants.resolve_update(update)
+        if tenant_id is None:
+            if update.callback_query:
+                await update.callback_query.answer()
+            elif update.message:
+                await update.message.reply_text(
+                    "❌ Anda belum terdaftar di perusahaan mana pun. "
+                    "Gunakan tautan dari admin perusahaan Anda (/start <kode_perusahaan>)."
+                )
+            raise ApplicationHandlerStop
+        tenants.activate(tenant_id)
+        current_update.get()['tenant'] = tenant_id
+
+    # Update tanpa teks/callback (mis. dokumen /import) tidak dibatasi
+    if user is None or action is None:
+        return
+
+    # Balasan dalam percakapan (input pengaturan admin) selalu diproses
+    if update.message and awaits_reply(user.id):
+        return
+
+    essential = is_essential_action(action)
+    if not rate_limiter.admit(user.id, essential):
+        if update.callback_query:
+            # Selalu jawab callback agar tombol tidak terus menampilkan loading
+            if rate_limiter.is_overloaded() and not essential:
+                await update.callback_query.answer("⏳ Sistem sedang sibuk, coba lagi sebentar.")
+            else:
+                await update.callback_query.answer("⏳ Terlalu banyak permintaan, coba lagi sebentar.")
+        raise ApplicationHandlerStop
+
+    if debouncer.is_repeat(user.id, action):
+        if update.callback_query:
+            # Hentikan animasi loading tombol tanpa mengirim pesan
+            await update.callback_query.answer()
+        raise ApplicationHandlerStop
+
+async def log_update_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Post-handler (group terakhir): catat lama pemrosesan update; update lambat selalu dicatat"""
+    context_fields = current_update.get()
+    if not context_fields or context_fields['update_id'] != update.update_id:
+        return
+
+    latency_ms = round((time.perf_counter() - context_fields['started']) * 1000, 1)
+    if latency_ms >= config.SLOW_UPDATE_MS:
+        logger.warning("Update lambat diproses", extra={'latency_ms': latency_ms})
+    else:
+        logger.info("Update selesai", extra={'latency_ms': latency_ms})
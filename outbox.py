@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+import config
+import database
+import tenants
+
+logger = logging.getLogger(__name__)
+
+db = database.db
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class OutboxSender:
+    """Mengirim pesan dari tabel outbox di background
+
+    Pesan yang gagal karena jaringan/timeout/flood control dicoba ulang dengan
+    exponential backoff; pesan yang ditolak permanen (user memblokir bot, chat
+    tidak ada) atau melewati batas percobaan ditandai dead. Karena antrean ada
+    di database, pesan yang belum terkirim tetap dikirim setelah bot restart.
+    Hanya tenant yang punya pesan jatuh tempo yang dibuka: waktu pesan pending
+    paling awal setiap tenant disimpan di memori dan diperbarui setelah drain.
+    """
+
+    def __init__(self, poll_interval, batch_size, max_attempts, backoff_base, backoff_max, retention_days):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention_days = retention_days
+        self.bot = None
+        self.task = None
+        self.wakeup = None
+        # Waktu pesan pending paling awal per tenant; tenant tanpa pesan pending tidak dikunjungi
+        self.next_due = {}
+
+    def start(self, bot):
+        """Mulai task pengirim (dipanggil dari event loop setelah bot siap)"""
+        self.bot = bot
+        self.wakeup = asyncio.Event()
+        # Sekali saat start: periksa semua tenant untuk sisa antrean dari sebelum restart
+        self.next_due = {tenant_id: datetime.min for tenant_id in tenants.tenant_ids()}
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def wake(self):
+        """Minta outbox tenant aktif segera diproses (dipanggil setelah pesan masuk outbox)"""
+        self.next_due[tenants.current_tenant_id()] = datetime.min
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def seconds_until_due(self):
+        """Detik sampai tenant berikutnya jatuh tempo (dibatasi poll_interval sebagai pengaman)"""
+        if not self.next_due:
+            return self.poll_interval
+        wait = (min(self.next_due.values()) - datetime.now()).total_seconds()
+        return min(max(wait, 0), self.poll_interval)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.seconds_until_due())
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            now = datetime.now()
+            for tenant_id in [tenant_id for tenant_id, due in self.next_due.items() if due <= now]:
+                try:
+                    with tenants.use_tenant(tenant_id):
+                        await self.drain()
+                        next_due = db.get_next_outbox_due()
+                except Exception as e:
+                    logger.error("Gagal memproses outbox: %s", e, exc_info=e, extra={'tenant': tenant_id})
+                    next_due = (datetime.now() + timedelta(seconds=self.poll_interval)).strftime(TIME_FORMAT)
+
+                # Dibaca setelah drain tanpa await di antaranya: pesan yang masuk selama drain ikut terhitung
+                if next_due is None:
+                    self.next_due.pop(tenant_id, None)
+                else:
+                    self.next_due[tenant_id] = datetime.strptime(next_due, TIME_FORMAT)
+
+    async def drain(self):
+        """Kirim semua pesan yang sudah jatuh tempo untuk tenant aktif, per batch"""
+        while True:
+            now = datetime.now()
+            rows = db.get_due_outbox(now.strftime(TIME_FORMAT), self.batch_size)
+            if not rows:
+                return
+
+            sent, retries, dead = [], [], []
+            flood_wait = 0
+            for i in range(0, len(rows), config.BATCH_SEND_SIZE):
+                if i:
+                    await asyncio.sleep(1)  # batas rate limit Telegram
+                chunk = rows[i:i + config.BATCH_SEND_SIZE]
+                results = await asyncio.gather(
+                    *(self.send(chat_id, text, parse_mode) for _, chat_id, text, parse_mode, _ in chunk),
+                    return_exceptions=True
+                )
+
+                for (message_id, chat_id, _, _, attempts), result in zip(chunk, results):
+                    if result is None:
+                        sent.append(message_id)
+                    elif isinstance(result, (Forbidden, BadRequest)) or attempts + 1 >= self.max_attempts:
+                        logger.error("Pesan outbox %s ke %s gagal permanen: %s", message_id, chat_id, result,
+                                     extra={'chat_id': chat_id})
+                        dead.append((message_id, str(result)))
+                    else:
+                        if isinstance(result, RetryAfter):
+                            delay = result.retry_after
+                            flood_wait = max(flood_wait, delay)
+                        else:
+                            delay = min(self.backoff_max, self.backoff_base * 2 ** attempts) * random.uniform(0.5, 1)
+                        logger.warning("Pesan outbox %s ke %s dicoba lagi dalam %.0f detik: %s", message_id, chat_id, delay, result,
+                                       extra={'chat_id': chat_id})
+                        retries.append((message_id, (now + timedelta(seconds=delay)).strftime(TIME_FORMAT), str(result)))
+
+                if flood_wait:
+                    break  # kena flood control: sisa batch tetap pending untuk sapuan berikutnya
+
+            db.finish_outbox(sent, retries, dead, datetime.now().strftime(TIME_FORMAT))
+            if flood_wait or len(rows) < self.batch_size:
+                return
+
+    async def send(self, chat_id, text, parse_mode):
+        """Kirim satu pesan; jika format Markdown ditolak, kirim ulang sebagai teks biasa"""
+        try:
+            await self.bot.send_message(chat_id, text, parse_mode=parse_mode)
+        except BadRequest as e:
+            if not parse_mode or "parse" not in str(e).lower():
+                raise
+            await self.bot.send_message(chat_id, text)
+
+    async def prune(self):
+        """Job harian: hapus pesan terkirim yang lebih lama dari masa simpan, untuk setiap tenant"""
+        before = (datetime.now() - timedelta(days=self.retention_days)).strftime(TIME_FORMAT)
+        for tenant_id in tenants.tenant_ids():
+            try:
+                with tenants.use_tenant(tenant_id):
+                    removed = db.prune_outbox(before)
+                if removed:
+                    logger.info("%s pesan outbox lama dihapus", removed, extra={'tenant': tenant_id})
+            except Exception as e:
+                logger.error("Gagal menghapus pesan outbox lama: %s", e, extra={'tenant': tenant_id})
+
+# Instance global pengirim outbox
+outbox_sender = OutboxSender(
+    config.OUTBOX_POLL_SECONDS,
+    config.OUTBOX_BATCH_SIZE,
+    config.OUTBOX_MAX_ATTEMPTS,
+    config.OUTBOX_BACKOFF_BASE_SECONDS,
+    config.OUTBOX_BACKOFF_MAX_SECONDS,
+    config.OUTBOX_RETENTION_DAYS
+)
@@ -0,0 +1,192 @@
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import config
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payroll_worker.py')
+
+def month_range(year, month):
+    """Tanggal awal dan akhir bulan"""
+    start_date = date(year, month, 1)
+    if month == 12:
+        end_date = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    return start_date, end_date
+
+def load_month_data(db_name, start_date, end_date):
+    """Ambil data absensi dan total istirahat per jenis untuk satu bulan (satu snapshot)"""
+    conn = sqlite3.connect(f'file:{db_name}?mode=ro', uri=True)
+    try:
+        conn.execute('BEGIN')
+        employees = conn.execute('''
+            SELECT user_id, username, full_name, department, position
+            FROM employees
+            ORDER BY full_name
+        ''').fetchall()
+
+        attendance = conn.execute('''
+            SELECT user_id, date, check_in, check_out, status,
+                   late_minutes, early_leave_minutes, overtime_minutes
+            FROM attendance
+            WHERE date BETWEEN ? AND ?
+            ORDER BY user_id, date
+        ''', (start_date, end_date)).fetchall()
+
+        # Total istirahat per jenis dihitung langsung di SQLite
+        breaks = conn.execute('''
+            SELECT user_id, break_type, COUNT(*), COALESCE(SUM(actual_duration), 0)
+            FROM breaks
+            WHERE DATE(start_time) BETWEEN ? AND ?
+            GROUP BY user_id, break_type
+        ''', (start_date, end_date)).fetchall()
+    finally:
+        conn.close()
+
+    return employees, attendance, breaks
+
+def worked_hours(check_in, check_out):
+    """Jam kerja dari jam masuk dan pulang (format HH:MM:SS)"""
+    if not check_in or not check_out:
+        return 0.0
+
+    masuk = datetime.strptime(check_in, '%H:%M:%S')
+    pulang = datetime.strptime(check_out, '%H:%M:%S')
+    if pulang < masuk:  # shift melewati tengah malam
+        pulang += timedelta(days=1)
+    return (pulang - masuk).total_seconds() / 3600
+
+def safe_filename(text):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', text or '').strip('_') or 'karyawan'
+
+def process_employees(chunk, break_types, output_dir):
+    """Dijalankan di worker process: hitung rekap dan tulis file per karyawan"""
+    summaries = []
+
+    for employee, records, break_totals in chunk:
+        user_id, username, full_name, department, position = employee
+        total_hours = 0.0
+        days_present = 0
+        total_late = 0
+        total_early = 0
+        total_overtime = 0
+
+        filename = os.path.join(output_dir, f"{user_id}_{safe_filename(full_name)}.csv")
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Nama', full_name])
+            writer.writerow(['Departemen', department or '-'])
+            writer.writerow(['Posisi', position or '-'])
+            writer.writerow([])
+            writer.writerow(['Tanggal', 'Masuk', 'Pulang', 'Status', 'Jam Kerja',
+                             'Terlambat (menit)', 'Pulang Cepat (menit)', 'Lembur (menit)'])
+
+            for _, day, check_in, check_out, status, late, early, overtime in records:
+                hours = worked_hours(check_in, check_out)
+                total_hours += hours
+                if check_in:
+                    days_present += 1
+                total_late += late or 0
+                total_early += early or 0
+                total_overtime += overtime or 0
+
+                writer.writerow([day, check_in or '-', check_out or '-', status,
+                                 f"{hours:.2f}", late or 0, early or 0, overtime or 0])
+
+            writer.writerow([])
+            writer.writerow(['TOTAL', '', '', '', f"{total_hours:.2f}", total_late, total_early, total_overtime])
+            writer.writerow([])
+            writer.writerow(['Jenis Istirahat', 'Jumlah', 'Total (menit)'])
+            for break_type in break_types:
+                count, minutes = break_totals.get(break_type, (0, 0))
+                writer.writerow([break_type, count, round(minutes)])
+
+        summaries.append([
+            user_id, full_name, department or '-', days_present, round(total_hours, 2),
+            total_late, total_early, total_overtime,
+            *[round(break_totals.get(break_type, (0, 0))[1]) for break_type in break_types]
+        ])
+
+    return summaries
+
+def generate_monthly_report(db_name, year, month, output_dir=None, workers=None):
+    """Buat rekap bulanan semua karyawan: satu file per karyawan + satu file ringkasan
+
+    Perhitungan dan penulisan file per karyawan dibagi ke ProcessPoolExecutor.
+    Mengembalikan path file ringkasan dan jumlah karyawan.
+    """
+    start_date, end_date = month_range(year, month)
+    output_dir = os.path.join(output_dir or config.PAYROLL_OUTPUT_DIR, f"rekap_{year}-{month:02d}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    employees, attendance, breaks = load_month_data(db_name, start_date, end_date)
+
+    # Kelompokkan data per karyawan
+    records_by_user = {}
+    for row in attendance:
+        records_by_user.setdefault(row[0], []).append(row)
+
+    breaks_by_user = {}
+    break_types = list(config.ALLOWED_BREAK_TYPES)
+    for user_id, break_type, count, minutes in breaks:
+        breaks_by_user.setdefault(user_id, {})[break_type] = (count, minutes)
+        if break_type not in break_types:
+            break_types.append(break_type)
+
+    items = [
+        (employee, records_by_user.get(employee[0], []), breaks_by_user.get(employee[0], {}))
+        for employee in employees
+    ]
+
+    workers = workers or config.PAYROLL_WORKERS or os.cpu_count() or 1
+    chunk_size = max(1, len(items) // (workers * 4) + 1)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    summaries = []
+    if chunks:
+        # Worker dibuat dengan spawn: aman meski pemanggil punya thread lain, dan
+        # worker hanya meng-import modul utama proses ini (lihat run_monthly_report).
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(process_employees, chunk, break_types, output_dir) for chunk in chunks]
+            for future in futures:
+                summaries.extend(future.result())
+
+    summary_filename = os.path.join(output_dir, f"ringkasan_{year}-{month:02d}.csv")
+    with open(summary_filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['User ID', 'Nama', 'Departemen', 'Hari Hadir', 'Jam Kerja',
+                         'Terlambat (menit)', 'Pulang Cepat (menit)', 'Lembur (menit)',
+                         *[f"Istirahat {break_type} (menit)" for break_type in break_types]])
+        writer.writerows(summaries)
+
+    return summary_filename, len(summaries)
+
+def run_monthly_report(db_name, year, month, output_dir=None, workers=None):
+    """Jalankan generate_monthly_report di proses baru (payroll_worker.py)
+
+    Worker spawn meng-import ulang modul utama proses induknya; dengan proses
+    perantara ini worker tidak ikut meng-import bot.py (database, tenant registry,
+    recorder). Mengembalikan path file ringkasan dan jumlah karyawan.
+    """
+    command = [sys.executable, WORKER_SCRIPT, db_name, str(year), str(month)]
+    if output_dir:
+        command += ['--output-dir', output_dir]
+    if workers:
+        command += ['--workers', str(workers)]
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"payroll_worker keluar dengan kode {result.returncode}")
+
+    summary = json.loads(result.stdout.strip().splitlines()[-1])
+    return summary['summary_filename'], summary['total']
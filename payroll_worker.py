@@ -0,0 +1,30 @@
+"""Entry point proses terpisah untuk rekap bulanan
+
+Dijalankan oleh payroll.run_monthly_report sebagai proses baru, sehingga worker
+ProcessPoolExecutor (spawn) hanya meng-import modul ini, payroll dan config -
+bukan bot.py beserta database, tenant registry dan recorder-nya.
+
+Contoh:
+    python payroll_worker.py absensi.db 2025 9 --output-dir rekap
+"""
+import argparse
+import json
+
+import payroll
+
+def main():
+    parser = argparse.ArgumentParser(description="Buat rekap bulanan absensi")
+    parser.add_argument('db_name')
+    parser.add_argument('year', type=int)
+    parser.add_argument('month', type=int)
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    summary_filename, total = payroll.generate_monthly_report(
+        args.db_name, args.year, args.month, args.output_dir, args.workers
+    )
+    print(json.dumps({'summary_filename': summary_filename, 'total': total}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import logging
+from datetime import date, datetime, timedelta
+
+import database
+import tenants
+
+logger = logging.getLogger(__name__)
+
+# Status kehadiran per user
+PRESENT = 1
+ON_BREAK = 2
+CHECKED_OUT = 3
+
+STATE_LABELS = {
+    PRESENT: "🟢 Hadir",
+    ON_BREAK: "☕ Istirahat",
+    CHECKED_OUT: "🔴 Pulang"
+}
+
+NO_DEPARTMENT = "Tanpa Departemen"
+MAX_NAMES_PER_DEPARTMENT = 30
+
+class PresenceSlot:
+    """Status kehadiran satu user hari ini"""
+
+    __slots__ = ('name', 'department', 'state', 'break_type', 'break_due')
+
+    def __init__(self, name, department):
+        self.name = name
+        self.department = department or NO_DEPARTMENT
+        self.state = PRESENT
+        self.break_type = None
+        self.break_due = None
+
+class PresenceBoard:
+    """Papan kehadiran di memori: siapa yang hadir, istirahat atau sudah pulang hari ini
+
+    Diperbarui setiap ada perubahan status dan dibangun ulang dari database saat bot start,
+    sehingga admin bisa melihatnya tanpa query ke SQLite.
+    """
+
+    def __init__(self):
+        self.day = date.today()
+        self.slots = {}
+        self.listeners = []
+
+    def notify(self):
+        """Beri tahu pendengar (mis. dashboard) bahwa papan berubah"""
+        for listener in self.listeners:
+            listener()
+
+    def rollover(self):
+        """Kosongkan papan saat hari berganti"""
+        today = date.today()
+        if today != self.day:
+            self.day = today
+            self.slots = {}
+
+    def slot(self, user_id, name=None, department=None):
+        self.rollover()
+        slot = self.slots.get(user_id)
+        if slot is None:
+            slot = self.slots[user_id] = PresenceSlot(name or str(user_id), department)
+        return slot
+
+    def check_in(self, user_id, name, department):
+        slot = self.slot(user_id, name, department)
+        slot.state = PRESENT
+        self.notify()
+
+    def start_break(self, user_id, break_type, due, name=None):
+        slot = self.slot(user_id, name)
+        slot.state = ON_BREAK
+        slot.break_type = break_type
+        slot.break_due = due
+        self.notify()
+
+    def end_break(self, user_id):
+        # User yang tidak ada di papan hari ini (mis. masuk kemarin) tidak ditambahkan
+        self.rollover()
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return
+        if slot.state == ON_BREAK:
+            slot.state = PRESENT
+        slot.break_type = None
+        slot.break_due = None
+        self.notify()
+
+    def check_out(self, user_id):
+        self.rollover()
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return
+        slot.state = CHECKED_OUT
+        slot.break_type = None
+        slot.break_due = None
+        self.notify()
+
+    def load(self, rows):
+        """Bangun ulang papan dari baris Database.get_presence_today()"""
+        self.day = date.today()
+        self.slots = {}
+
+        for user_id, name, department, check_in, check_out, break_type, break_start, duration in rows:
+            slot = self.slot(user_id, name, department)
+            if check_out:
+                slot.state = CHECKED_OUT
+            elif break_type:
+                try:
+                    minutes = int(duration)
+                except (TypeError, ValueError):
+                    minutes = 30
+                slot.state = ON_BREAK
+                slot.break_type = break_type
+                slot.break_due = datetime.strptime(break_start, "%Y-%m-%d %H:%M:%S") + timedelta(minutes=minutes)
+
+        self.notify()
+        return len(self.slots)
+
+    def by_department(self):
+        """Kelompokkan slot per departemen, diurutkan berdasarkan status lalu nama"""
+        self.rollover()
+        departments = {}
+        for slot in self.slots.values():
+            departments.setdefault(slot.department, []).append(slot)
+
+        for slots in departments.values():
+            slots.sort(key=lambda slot: (slot.state, slot.name))
+        return dict(sorted(departments.items()))
+
+    def format(self, now=None):
+        """Format papan kehadiran menjadi pesan untuk admin"""
+        now = now or datetime.now()
+        report = "📋 KEHADIRAN SAAT INI\n"
+        report += f"Waktu: {now.strftime('%H:%M')}\n"
+        return report + self.format_body(now)
+
+    def format_body(self, now):
+        """Isi papan (jumlah dan daftar per departemen) tanpa jam pembuatan"""
+        departments = self.by_department()
+
+        totals = {state: 0 for state in STATE_LABELS}
+        for slot in self.slots.values():
+            totals[slot.state] += 1
+
+        report = " | ".join(f"{STATE_LABELS[state]}: {count}" for state, count in totals.items()) + "\n"
+        report += "─" * 30 + "\n"
+
+        if not departments:
+            report += "Belum ada yang absen hari ini."
+            return report
+
+        for department, slots in departments.items():
+            counts = {state: 0 for state in STATE_LABELS}
+            for slot in slots:
+                counts[slot.state] += 1
+
+            report += f"\n🏢 {department} — hadir {counts[PRESENT]}, istirahat {counts[ON_BREAK]}, pulang {counts[CHECKED_OUT]}\n"
+            listed = [slot for slot in slots if slot.state != CHECKED_OUT]
+            for slot in listed[:MAX_NAMES_PER_DEPARTMENT]:
+                if slot.state == ON_BREAK:
+                    late = " ⚠️" if slot.break_due and now > slot.break_due else ""
+                    due = slot.break_due.strftime('%H:%M') if slot.break_due else "-"
+                    report += f"   ☕ {slot.name} ({slot.break_type}, s/d {due}){late}\n"
+                else:
+                    report += f"   🟢 {slot.name}\n"
+            if len(listed) > MAX_NAMES_PER_DEPARTMENT:
+                report += f"   ... dan {len(listed) - MAX_NAMES_PER_DEPARTMENT} lainnya\n"
+
+        return report
+
+class PresenceBoards:
+    """Satu papan kehadiran per tenant; `presence_board.<method>` memakai papan tenant aktif
+
+    Papan dibangun dari database saat pertama kali dipakai.
+    """
+
+    def __init__(self):
+        self.boards = {}
+
+    def current(self):
+        tenant_id = tenants.current_tenant_id()
+        board = self.boards.get(tenant_id)
+        if board is None:
+            board = self.boards[tenant_id] = PresenceBoard()
+            loaded = board.load(database.db.get_presence_today())
+            logger.info("Papan kehadiran dimuat: %s user", loaded, extra={'tenant': tenant_id})
+        return board
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+# Instance global papan kehadiran
+presence_board = PresenceBoards()
@@ -0,0 +1,113 @@
+"""Perekam update Telegram untuk diputar ulang dengan replay.py
+
+Aktifkan dengan environment variable RECORD_UPDATES=<file.jsonl.gz>. Setiap update
+ditulis sebagai satu baris JSON (gzip) beserta waktu kedatangannya. Data pribadi
+dianonimkan: user/chat id diganti nomor urut, nama dan username diganti, dan
+teks bebas diganti placeholder. Perintah dan teks tombol keyboard dipertahankan
+agar update tetap diarahkan ke handler yang sama saat diputar ulang.
+"""
+import atexit
+import gzip
+import json
+import logging
+import re
+import time
+from telegram import Update
+from telegram.ext import ContextTypes
+
+import config
+import keyboards
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_ID_START = 1_000_001
+NAME_FIELDS = ('first_name', 'last_name', 'title')
+DROPPED_FIELDS = ('username', 'phone_number', 'document', 'photo', 'contact', 'location', 'caption',
+                  'reply_to_message')
+ID_SUFFIX = re.compile(r'(\d{5,})$')
+
+def keyboard_texts():
+    """Semua teks tombol keyboard utama (untuk semua status dan role)"""
+    texts = set()
+    for state in ('on_break', 'not_checked_in', 'working', 'done'):
+        for is_admin in (False, True):
+            for row in keyboards._main_markup(state, is_admin).keyboard:
+                texts.update(button.text for button in row)
+    return texts
+
+class UpdateRecorder:
+    """Menulis update yang masuk (sudah dianonimkan) ke file JSONL terkompresi"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        self.ids = {}
+        self.kept_texts = keyboard_texts()
+        self.recorded = 0
+        atexit.register(self.close)
+
+    def anonymous_id(self, real_id):
+        """Id pengganti yang konsisten selama perekaman (id negatif/grup tetap negatif)"""
+        key = abs(real_id)
+        if key not in self.ids:
+            self.ids[key] = ANONYMOUS_ID_START + len(self.ids)
+        return self.ids[key] if real_id >= 0 else -self.ids[key]
+
+    def anonymize_text(self, text):
+        if text in self.kept_texts:
+            return text
+        if text.startswith('/'):
+            command, _, args = text.partition(' ')
+            # Argumen /start adalah kode tenant (bukan data pribadi), argumen lain disamarkan
+            if command == '/start' or not args:
+                return text
+            return f"{command} {' '.join('x' * len(arg) for arg in args.split())}"
+        return 'x' * len(text)
+
+    def anonymize(self, data):
+        """Anonimkan dict hasil Update.to_dict() secara rekursif"""
+        if isinstance(data, list):
+            return [self.anonymize(item) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        result = {}
+        for key, value in data.items():
+            if key in DROPPED_FIELDS:
+                continue
+            if key in NAME_FIELDS and isinstance(value, str):
+                value = "Anonim"
+            elif key in ('id', 'user_id', 'chat_id') and isinstance(value, int) and key_is_person(data):
+                value = self.anonymous_id(value)
+            elif key == 'text' and isinstance(value, str):
+                value = self.anonymize_text(value)
+            elif key == 'data' and isinstance(value, str):
+                # callback_data seperti admin_emp_<user_id>
+                value = ID_SUFFIX.sub(lambda match: str(self.anonymous_id(int(match.group(1)))), value)
+            else:
+                value = self.anonymize(value)
+            result[key] = value
+        return result
+
+    def record(self, update):
+        entry = {'ts': time.time(), 'update': self.anonymize(update.to_dict())}
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.recorded += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            logger.info("Perekaman selesai: %s update ditulis ke %s", self.recorded, self.path)
+
+def key_is_person(data):
+    """True untuk dict user/chat (punya field nama), bukan message/callback yang juga punya 'id'"""
+    return any(field in data for field in ('first_name', 'is_bot', 'type'))
+
+recorder = UpdateRecorder(config.RECORD_UPDATES_FILE) if config.RECORD_UPDATES_FILE else None
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pre-handler (group -2): rekam update sebelum difilter middleware"""
+    try:
+        recorder.record(update)
+    except Exception as e:
+        logger.error("Gagal merekam update %s: %s", update.update_id, e)
@@ -0,0 +1,201 @@
+"""Putar ulang rekaman update (lihat recorder.py) ke Application bot untuk uji performa
+
+Contoh:
+    python replay.py rekaman.jsonl.gz                  # kecepatan asli
+    python replay.py rekaman.jsonl.gz --speed 10       # 10x lebih cepat
+    python replay.py rekaman.jsonl.gz --speed 0        # secepat mungkin
+    python replay.py rekaman.jsonl.gz --db salinan.db --owner 1000001
+
+Bot dijalankan dengan database sementara di folder kerja (salinan --db jika
+diberikan, database asli tidak disentuh). Semua request ke Bot API dijawab oleh
+FakeRequest di proses yang sama, jadi tidak ada pesan yang benar-benar terkirim.
+Update diproses berurutan seperti run_polling; latensi total dihitung dari
+waktu update seharusnya tiba sampai selesai diproses (termasuk waktu antre).
+Middleware tetap aktif: pada kecepatan tinggi debounce/rate limit ikut bekerja.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from telegram.request import BaseRequest
+
+REPLAY_TOKEN = "123456:REPLAY"
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': "Bot Absensi", 'username': "replay_absensi_bot"}
+
+class FakeRequest(BaseRequest):
+    """Menjawab semua method Bot API secara lokal dengan respons sukses minimal"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] += 1
+        params = request_data.parameters if request_data else {}
+        return 200, json.dumps({'ok': True, 'result': self.result(endpoint, params)}).encode()
+
+    def result(self, endpoint, params):
+        if endpoint == 'getMe':
+            return BOT_USER
+        if 'chat_id' in params and endpoint.startswith(('send', 'edit', 'copy', 'forward')):
+            self.message_id += 1
+            return {
+                'message_id': params.get('message_id', self.message_id),
+                'date': int(time.time()),
+                'chat': {'id': params['chat_id'], 'type': 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', '')
+            }
+        return True
+
+def load_recording(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def replay(bot_module, entries, speed):
+    """Kirim update ke Application sesuai jadwal rekaman, kembalikan statistik"""
+    from telegram import Update
+
+    request = FakeRequest()
+    application = bot_module.build_application(token=REPLAY_TOKEN, request=request)
+
+    errors = []
+    async def count_error(update, context):
+        errors.append(repr(context.error))
+    application.add_error_handler(count_error)
+
+    await application.initialize()
+    queue = asyncio.Queue()
+    total_latencies = []
+    process_latencies = []
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            arrival, update = item
+            started = time.perf_counter()
+            await application.process_update(update)
+            finished = time.perf_counter()
+            process_latencies.append(finished - started)
+            total_latencies.append(finished - arrival)
+
+    consumer = asyncio.create_task(worker())
+    start = time.perf_counter()
+    first_ts = entries[0]['ts']
+
+    for entry in entries:
+        if speed:
+            arrival = start + (entry['ts'] - first_ts) / speed
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            arrival = time.perf_counter()
+        await queue.put((arrival, Update.de_json(entry['update'], application.bot)))
+
+    await queue.put(None)
+    await consumer
+    elapsed = time.perf_counter() - start
+    await application.shutdown()
+
+    def summary(values):
+        return {
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(max(values, default=0) * 1000, 2)
+        }
+
+    return {
+        'updates': len(entries),
+        'seconds': round(elapsed, 3),
+        'updates_per_second': round(len(entries) / elapsed, 1) if elapsed else 0.0,
+        'recording_seconds': round(entries[-1]['ts'] - first_ts, 3),
+        'speed': speed,
+        'process': summary(process_latencies),
+        'total': summary(total_latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'api_calls': dict(request.calls.most_common())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Putar ulang rekaman update bot absensi")
+    parser.add_argument('recording', help="File rekaman (.jsonl.gz) dari RECORD_UPDATES")
+    parser.add_argument('--speed', type=float, default=1.0, help="Kelipatan kecepatan asli, 0 = secepat mungkin")
+    parser.add_argument('--db', default=None, help="Database awal (disalin, file asli tidak diubah)")
+    parser.add_argument('--owner', type=int, action='append', default=[], help="user_id (anonim) yang dijadikan owner")
+    parser.add_argument('--workdir', default=None, help="Folder database sementara")
+    parser.add_argument('--output', default=None, help="Simpan hasil sebagai JSON")
+    parser.add_argument('--verbose', action='store_true', help="Tampilkan log bot")
+    args = parser.parse_args()
+
+    recording = os.path.abspath(args.recording)
+    output = os.path.abspath(args.output) if args.output else None
+    entries = load_recording(recording)
+    if not entries:
+        parser.error(f"{args.recording} tidak berisi update")
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='absensi_replay_'))
+    os.makedirs(workdir, exist_ok=True)
+    if args.db:
+        shutil.copyfile(args.db, os.path.join(workdir, 'absensi.db'))
+
+    # Modul database membuat koneksi default ke absensi.db saat di-import;
+    # pindah ke folder kerja agar database produksi tidak tersentuh.
+    os.chdir(workdir)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    import config
+    config.MULTI_TENANT = False
+    config.RECORD_UPDATES_FILE = None
+    import bot
+
+    for owner_id in args.owner:
+        bot.db.set_role(owner_id, 'owner')
+
+    print(f"Memutar {len(entries):,} update dari {args.recording} "
+          f"({'secepat mungkin' if not args.speed else f'{args.speed:g}x'}), database di {workdir}")
+    result = asyncio.run(replay(bot, entries, args.speed))
+
+    print(f"Selesai dalam {result['seconds']:.1f} detik (rekaman {result['recording_seconds']:.1f} detik): "
+          f"{result['updates_per_second']:.1f} update/detik, {result['errors']} error")
+    for name, label in (('process', "Proses"), ('total', "Total (termasuk antre)")):
+        stats = result[name]
+        print(f"  {label:<24} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+              f"p99 {stats['p99_ms']:8.2f} ms  max {stats['max_ms']:8.2f} ms")
+    print("  Panggilan API: " + ", ".join(f"{method} {count}" for method, count in result['api_calls'].items()))
+
+    if output:
+        result['meta'] = {'timestamp': datetime.now().isoformat(), 'recording': recording}
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil disimpan di {output}")
+    return 1 if result['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
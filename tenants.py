@@ -0,0 +1,288 @@
+"""Mode multi-tenant: satu proses bot melayani banyak perusahaan
+
+Setiap tenant (perusahaan) punya file SQLite sendiri. Registry menyimpan daftar
+tenant dan pemetaan chat/user Telegram ke tenant. Karyawan bergabung lewat tautan
+/start <kode_tenant>.
+
+Kelola tenant dari command line:
+    python tenants.py tambah <kode> "<nama perusahaan>" [--owner <user_id>]
+    python tenants.py anggota <kode> <chat_id/user_id>
+    python tenants.py daftar
+"""
+import argparse
+import contextvars
+import logging
+import os
+import sqlite3
+import sys
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from telegram.ext import BaseUpdateProcessor
+
+import config
+import database
+
+logger = logging.getLogger(__name__)
+
+# Tenant yang sedang aktif untuk update/job saat ini
+current_tenant = contextvars.ContextVar('current_tenant', default=None)
+# Tenant yang dipinjam oleh update yang sedang diproses (dilepas oleh TenantUpdateProcessor)
+update_leases = contextvars.ContextVar('update_leases', default=None)
+
+class TenantRegistry:
+    """Daftar tenant dan pemetaan chat/user ke tenant (disimpan di database registry terpisah)"""
+
+    def __init__(self, db_name):
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tenants (
+                tenant_id TEXT PRIMARY KEY,
+                name TEXT,
+                db_name TEXT NOT NULL,
+                is_active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tenant_members (
+                chat_id INTEGER PRIMARY KEY,
+                tenant_id TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (tenant_id) REFERENCES tenants (tenant_id)
+            )
+        ''')
+        self.conn.commit()
+        self.reload()
+
+    def reload(self):
+        """Muat ulang cache tenant dan anggota dari database registry"""
+        self.tenants = {
+            tenant_id: (name, db_name) for tenant_id, name, db_name in self.conn.execute(
+                'SELECT tenant_id, name, db_name FROM tenants WHERE is_active = 1'
+            )
+        }
+        self.members = dict(self.conn.execute('SELECT chat_id, tenant_id FROM tenant_members'))
+
+    def add_tenant(self, tenant_id, name, db_name=None):
+        db_name = db_name or os.path.join(config.TENANT_DB_DIR, f"{tenant_id}.db")
+        self.conn.execute('''
+            INSERT INTO tenants (tenant_id, name, db_name) VALUES (?, ?, ?)
+            ON CONFLICT(tenant_id) DO UPDATE SET name = excluded.name, is_active = 1
+        ''', (tenant_id, name, db_name))
+        self.conn.commit()
+        self.reload()
+        return self.tenants[tenant_id][1]
+
+    def add_member(self, chat_id, tenant_id):
+        self.conn.execute('''
+            INSERT INTO tenant_members (chat_id, tenant_id) VALUES (?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET tenant_id = excluded.tenant_id
+        ''', (chat_id, tenant_id))
+        self.conn.commit()
+        self.members[chat_id] = tenant_id
+
+    def resolve(self, chat_id, user_id):
+        """Tenant untuk sebuah update: pemetaan chat (grup) didahulukan, lalu user"""
+        tenant_id = self.members.get(chat_id) or self.members.get(user_id)
+        return tenant_id if tenant_id in self.tenants else None
+
+    def get_tenant(self, tenant_id):
+        if tenant_id not in self.tenants:
+            self.reload()  # tenant baru ditambahkan dari command line
+        return self.tenants.get(tenant_id)
+
+class TenantPool:
+    """LRU pool Database per tenant sehingga jumlah file SQLite yang terbuka dibatasi
+
+    Database yang dikeluarkan dari pool ditutup (koneksi tulis, worker dan koneksi
+    read-only). Jika masih dipinjam update atau job (acquire/release), penutupan
+    ditunda sampai pinjaman terakhir dilepas.
+    """
+
+    def __init__(self, registry, max_size):
+        self.registry = registry
+        self.max_size = max_size
+        self.databases = OrderedDict()
+        self.leases = Counter()
+        self.retired = {}
+
+    def get(self, tenant_id):
+        db = self.databases.get(tenant_id)
+        if db is not None:
+            self.databases.move_to_end(tenant_id)
+            return db
+
+        db = self.retired.pop(tenant_id, None)
+        if db is None:
+            tenant = self.registry.get_tenant(tenant_id)
+            if tenant is None:
+                raise KeyError(f"Tenant tidak dikenal: {tenant_id}")
+
+            db_name = tenant[1]
+            os.makedirs(os.path.dirname(db_name) or '.', exist_ok=True)
+            db = database.Database(db_name, config_roles=False)
+        self.databases[tenant_id] = db
+
+        while len(self.databases) > self.max_size:
+            evicted, evicted_db = self.databases.popitem(last=False)
+            if self.leases[evicted]:
+                self.retired[evicted] = evicted_db
+                logger.info("Database tenant %s dikeluarkan dari pool, ditutup setelah selesai dipakai", evicted,
+                            extra={'tenant': evicted})
+            else:
+                self.close(evicted, evicted_db)
+        return db
+
+    def acquire(self, tenant_id):
+        """Ambil database tenant dan tandai sedang dipakai (pasangkan dengan release)"""
+        db = self.get(tenant_id)
+        self.leases[tenant_id] += 1
+        return db
+
+    def release(self, tenant_id):
+        self.leases[tenant_id] -= 1
+        if self.leases[tenant_id] <= 0:
+            del self.leases[tenant_id]
+            db = self.retired.pop(tenant_id, None)
+            if db is not None:
+                self.close(tenant_id, db)
+
+    def close(self, tenant_id, db):
+        try:
+            db.close()
+            logger.info("Database tenant %s dikeluarkan dari pool dan ditutup", tenant_id, extra={'tenant': tenant_id})
+        except Exception as e:
+            logger.error("Gagal menutup database tenant %s: %s", tenant_id, e, extra={'tenant': tenant_id})
+
+class TenantUpdateProcessor(BaseUpdateProcessor):
+    """Memproses update satu per satu (seperti default) dan melepas database tenant
+    yang dipinjam update tersebut setelah semua handler selesai"""
+
+    async def do_process_update(self, update, coroutine):
+        leases = []
+        leases_token = update_leases.set(leases)
+        tenant_token = current_tenant.set(None)
+        db_token = database.current_db.set(None)
+        try:
+            await coroutine
+        finally:
+            database.current_db.reset(db_token)
+            current_tenant.reset(tenant_token)
+            update_leases.reset(leases_token)
+            for tenant_id in leases:
+                tenant_pool.release(tenant_id)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+registry = TenantRegistry(config.TENANT_REGISTRY_DB) if config.MULTI_TENANT else None
+tenant_pool = TenantPool(registry, config.TENANT_POOL_SIZE) if config.MULTI_TENANT else None
+
+def current_tenant_id():
+    return current_tenant.get()
+
+def tenant_ids():
+    """Semua tenant aktif; [None] (database default) jika mode multi-tenant tidak dipakai"""
+    if not config.MULTI_TENANT:
+        return [None]
+    registry.reload()
+    return list(registry.tenants)
+
+def activate(tenant_id):
+    """Jadikan tenant aktif untuk sisa pemrosesan update saat ini"""
+    db = None
+    if tenant_id:
+        leases = update_leases.get()
+        if leases is None:
+            db = tenant_pool.get(tenant_id)
+        else:
+            db = tenant_pool.acquire(tenant_id)
+            leases.append(tenant_id)
+    current_tenant.set(tenant_id)
+    database.current_db.set(db)
+
+@contextmanager
+def use_tenant(tenant_id):
+    """Jalankan blok kode (mis. job scheduler) dengan database milik tenant tertentu"""
+    if tenant_id is None:
+        yield
+        return
+
+    db = tenant_pool.acquire(tenant_id)
+    tenant_token = current_tenant.set(tenant_id)
+    db_token = database.current_db.set(db)
+    try:
+        yield
+    finally:
+        database.current_db.reset(db_token)
+        current_tenant.reset(tenant_token)
+        tenant_pool.release(tenant_id)
+
+def file_prefix():
+    """Awalan nama file export/backup agar file antar tenant tidak tertukar"""
+    tenant_id = current_tenant.get()
+    return f"{tenant_id}_" if tenant_id else ""
+
+def resolve_update(update):
+    """Tentukan tenant sebuah update; user baru bergabung lewat /start <kode_tenant>"""
+    user = update.effective_user
+    chat = update.effective_chat
+    user_id = user.id if user else None
+    chat_id = chat.id if chat else None
+
+    tenant_id = registry.resolve(chat_id, user_id)
+    if tenant_id is not None:
+        return tenant_id
+
+    message = update.message
+    if user and message and message.text and message.text.startswith('/start '):
+        code = message.text.split(maxsplit=1)[1].strip()
+        if registry.get_tenant(code):
+            registry.add_member(user_id, code)
+            logger.info("User %s bergabung ke tenant %s", user_id, code, extra={'user_id': user_id, 'tenant': code})
+            return code
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola tenant bot absensi")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('tambah', help="Tambah/aktifkan tenant")
+    add.add_argument('tenant_id')
+    add.add_argument('name')
+    add.add_argument('--db', default=None, help="File database tenant")
+    add.add_argument('--owner', type=int, default=None, help="user_id Telegram owner tenant")
+
+    member = commands.add_parser('anggota', help="Petakan chat/user ke tenant")
+    member.add_argument('tenant_id')
+    member.add_argument('chat_id', type=int)
+
+    commands.add_parser('daftar', help="Tampilkan semua tenant")
+    args = parser.parse_args()
+
+    registry = TenantRegistry(config.TENANT_REGISTRY_DB)
+
+    if args.command == 'tambah':
+        db_name = registry.add_tenant(args.tenant_id, args.name, args.db)
+        os.makedirs(os.path.dirname(db_name) or '.', exist_ok=True)
+        tenant_db = database.Database(db_name, config_roles=False)
+        if args.owner:
+            registry.add_member(args.owner, args.tenant_id)
+            tenant_db.set_role(args.owner, 'owner')
+        print(f"Tenant {args.tenant_id} siap ({db_name}). Tautan bergabung: /start {args.tenant_id}")
+    elif args.command == 'anggota':
+        if not registry.get_tenant(args.tenant_id):
+            parser.error(f"Tenant tidak dikenal: {args.tenant_id}")
+        registry.add_member(args.chat_id, args.tenant_id)
+        print(f"{args.chat_id} dipetakan ke tenant {args.tenant_id}")
+    else:
+        for tenant_id, (name, db_name) in registry.tenants.items():
+            members = sum(1 for tenant in registry.members.values() if tenant == tenant_id)
+            print(f"{tenant_id}\t{name}\t{db_name}\t{members} anggota")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,104 @@
-from datetime import datetime, timedelta
-from config import DEFAULT_WORK_START, DEFAULT_WORK_END, TOLERANCE_LATE, TOLERANCE_EARLY
-import database
-
-def calculate_late_minutes(check_in_time):
-    work_start = datetime.strptime(DEFAULT_WORK_START, "%H:%M")
-    check_in = datetime.strptime(check_in_time, "%H:%M:%S")
-    
-    if check_in > work_start:
-        late_minutes = (check_in - work_start).total_seconds() / 60
-        if late_minutes > TOLERANCE_LATE:
-            return int(late_minutes - TOLERANCE_LATE)
-    return 0
-
-def calculate_early_leave(check_out_time):
-    work_end = datetime.strptime(DEFAULT_WORK_END, "%H:%M")
-    check_out = datetime.strptime(check_out_time, "%H:%M:%S")
-    
-    if check_out < work_end:
-        early_minutes = (work_end - check_out).total_seconds() / 60
-        if early_minutes > TOLERANCE_EARLY:
-            return int(early_minutes - TOLERANCE_EARLY)
-    return 0
-
-def calculate_overtime(check_out_time):
-    work_end = datetime.strptime(DEFAULT_WORK_END, "%H:%M")
-    check_out = datetime.strptime(check_out_time, "%H:%M:%S")
-    
-    if check_out > work_end:
-        overtime_minutes = (check_out - work_end).total_seconds() / 60
-        return int(overtime_minutes)
-    return 0
-
-def format_attendance_report(records):
-    if not records:
-        return "Tidak ada data absensi"
-    
-    report = "📊 **Laporan Absensi**\n\n"
-    for record in records:
-        date_str, check_in, check_out, status, overtime, late = record
-        report += f"📅 {date_str}\n"
-        report += f"🟢 Masuk: {check_in}\n"
-        report += f"🔴 Pulang: {check_out if check_out else 'Belum'}\n"
-        if late > 0:
-            report += f"⏰ Terlambat: {late} menit\n"
-        if overtime > 0:
-            report += f"💪 Lembur: {overtime} menit\n"
-        report += "─" * 20 + "\n"
-    
-    return report
-
-def get_break_time_limit(break_type):
-    break_limits = {
-        "toilet": 15, "makan": 60, "merokok": 10, 
-        "sholat": 15, "lainnya": 30
-    }
-    return break_limits.get(break_type, 30)
\ No newline at end of file
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from config import DEFAULT_WORK_START, DEFAULT_WORK_END, TOLERANCE_LATE, TOLERANCE_EARLY
+import database
+
+def calculate_late_minutes(check_in_time):
+    work_start = datetime.strptime(DEFAULT_WORK_START, "%H:%M")
+    check_in = datetime.strptime(check_in_time, "%H:%M:%S")
+    
+    if check_in > work_start:
+        late_minutes = (check_in - work_start).total_seconds() / 60
+        if late_minutes > TOLERANCE_LATE:
+            return int(late_minutes - TOLERANCE_LATE)
+    return 0
+
+def calculate_early_leave(check_out_time):
+    work_end = datetime.strptime(DEFAULT_WORK_END, "%H:%M")
+    check_out = datetime.strptime(check_out_time, "%H:%M:%S")
+    
+    if check_out < work_end:
+        early_minutes = (work_end - check_out).total_seconds() / 60
+        if early_minutes > TOLERANCE_EARLY:
+            return int(early_minutes - TOLERANCE_EARLY)
+    return 0
+
+def calculate_overtime(check_out_time):
+    work_end = datetime.strptime(DEFAULT_WORK_END, "%H:%M")
+    check_out = datetime.strptime(check_out_time, "%H:%M:%S")
+    
+    if check_out > work_end:
+        overtime_minutes = (check_out - work_end).total_seconds() / 60
+        return int(overtime_minutes)
+    return 0
+
+def format_attendance_report(records):
+    if not records:
+        return "Tidak ada data absensi"
+    
+    report = "📊 **Laporan Absensi**\n\n"
+    for record in records:
+        date_str, check_in, check_out, status, overtime, late = record
+        report += f"📅 {date_str}\n"
+        report += f"🟢 Masuk: {check_in}\n"
+        report += f"🔴 Pulang: {check_out if check_out else 'Belum'}\n"
+        if late > 0:
+            report += f"⏰ Terlambat: {late} menit\n"
+        if overtime > 0:
+            report += f"💪 Lembur: {overtime} menit\n"
+        report += "─" * 20 + "\n"
+    
+    return report
+
+def get_break_time_limit(break_type):
+    break_limits = {
+        "toilet": 15, "makan": 60, "merokok": 10, 
+        "sholat": 15, "lainnya": 30
+    }
+    return break_limits.get(break_type, 30)
+
+EMPLOYEE_IMPORT_FIELDS = ('user_id', 'username', 'full_name', 'department', 'position', 'is_active')
+
+def parse_employee_import(filename, content):
+    """Parse file import karyawan (CSV dengan header atau JSON list of object)
+    
+    Mengembalikan (daftar karyawan valid, jumlah baris yang dilewati).
+    """
+    text = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json'):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON harus berupa list of object")
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+    
+    employees = []
+    skipped = 0
+    for row in rows:
+        if not isinstance(row, dict):
+            skipped += 1
+            continue
+        
+        row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+        user_id = str(row.get('user_id') or '').strip()
+        if not user_id.isdigit():
+            skipped += 1
+            continue
+        
+        employee = {}
+        for field in EMPLOYEE_IMPORT_FIELDS:
+            value = row.get(field)
+            if isinstance(value, str):
+                value = value.strip() or None
+            employee[field] = value
+        
+        employee['user_id'] = int(user_id)
+        if employee['username']:
+            employee['username'] = employee['username'].lstrip('@')
+        if employee['is_active'] is not None:
+            employee['is_active'] = 1 if str(employee['is_active']).lower() in ('1', 'true', 'ya', 'aktif') else 0
+        employees.append(employee)
+    
+    return employees, skipped
\ No newline at end of file